@@ -0,0 +1,194 @@
+# 파일: chatbot/answer_cache.py
+# Description: 대화 맥락이 없는 첫 질문에 대한 답변을 질문 임베딩 유사도로 재사용하는 의미 기반 답변 캐시
+#              - "충정로 국밥 맛집 추천" / "충정로역 국밥집 추천해줘"처럼 코사인 유사도가 ANSWER_CACHE_THRESHOLD 이상이면 같은 질문으로 봅니다.
+#              - 가게 이름이 들어간 질문은 이름만 달라도 유사도가 높게 나오므로 호출하는 쪽(main_chain)에서 캐시를 쓰지 않습니다.
+#              - 크기 제한 LRU + TTL로 항목을 정리하고, 재시작 후에도 유지되도록 디스크에 저장합니다.
+#                질문/답변은 ANSWER_CACHE_PATH(JSON), 벡터는 같은 이름의 .npy에 두고,
+#                요청 경로에서 쓰지 않도록 변경 후 ANSWER_CACHE_FLUSH_DELAY초 뒤 백그라운드 타이머가 한 번에 저장합니다.
+#              - store_info.json / 가게 카탈로그 / Chroma 인덱스 버전이 바뀌면 전체를 무효화합니다.
+#              - hit/miss 횟수와, hit으로 생략한 원래 응답 시간의 합(saved_ms)을 stats()로 제공합니다.
+# Author: 통합버전
+# Date: 2025.04.29
+# Requirements: numpy
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))  # 상위 폴더 경로 추가
+
+import json
+import time
+import atexit
+import threading
+import numpy as np
+from config import (
+    ANSWER_CACHE_PATH, ANSWER_CACHE_SIZE, ANSWER_CACHE_TTL, ANSWER_CACHE_THRESHOLD, ANSWER_CACHE_FLUSH_DELAY,
+    STORE_INFO_JSON, STORE_CATALOG_DB,
+)
+from vectordb.cached_retriever import read_index_version
+
+def data_version() -> str:
+    """답변의 근거 데이터 버전. 가게 데이터 파일의 수정 시각/크기와 벡터 인덱스 버전을 이어 붙입니다."""
+    parts = []
+    for path in (STORE_INFO_JSON, STORE_CATALOG_DB):
+        try:
+            stat = os.stat(path)
+            parts.append(f"{stat.st_mtime_ns}:{stat.st_size}")
+        except FileNotFoundError:
+            parts.append("-")
+    parts.append(read_index_version() or "-")
+    return "|".join(parts)
+
+class SemanticAnswerCache:
+    """
+    Args:
+        embed (callable): 질문 → 정규화된 임베딩 벡터 (CachedRetriever.embed_query)
+        path (str): 저장 파일 경로. None이면 메모리에만 보관
+    """
+
+    def __init__(self, embed, path=ANSWER_CACHE_PATH, maxsize=ANSWER_CACHE_SIZE,
+                 ttl=ANSWER_CACHE_TTL, threshold=ANSWER_CACHE_THRESHOLD, flush_delay=ANSWER_CACHE_FLUSH_DELAY):
+        self.embed = embed
+        self.path = path
+        self.vectors_path = os.path.splitext(path)[0] + ".npy" if path else None
+        self.flush_delay = flush_delay
+        self.flush_timer = None
+        self.dirty = False
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.threshold = threshold
+        self.lock = threading.Lock()
+        self.save_lock = threading.Lock()  # 타이머와 종료 시 저장이 겹치지 않도록
+        self.entries = []  # {"query", "answer", "latency_ms", "created", "last_used"}
+        self.vectors = np.zeros((0, 0), dtype=np.float32)
+        self.version = data_version()
+        self.hits = 0
+        self.misses = 0
+        self.saved_ms = 0.0
+        self._load()
+        atexit.register(self.flush)
+
+    # ----------------------------
+    # 저장/로드
+    # ----------------------------
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path) or not os.path.exists(self.vectors_path):
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") != self.version:
+            print("[INFO] 데이터가 갱신되어 저장된 답변 캐시를 버립니다.")
+            return
+        vectors = np.load(self.vectors_path)
+        if len(vectors) != len(data["entries"]):  # 두 파일 중 하나만 교체된 상태
+            print("[WARN] 답변 캐시 파일이 서로 맞지 않아 버립니다.")
+            return
+        self.entries = data["entries"]
+        self.vectors = vectors.astype(np.float32, copy=False)
+        self._expire(time.time())
+
+    def _mark_dirty(self):
+        """(lock 안에서 호출) 저장 타이머가 없으면 flush_delay초 뒤 저장하도록 예약합니다."""
+        self.dirty = True
+        if self.path and self.flush_timer is None:
+            self.flush_timer = threading.Timer(self.flush_delay, self.flush)
+            self.flush_timer.daemon = True
+            self.flush_timer.start()
+
+    def flush(self):
+        """변경된 내용을 저장합니다. 스냅샷만 lock 안에서 뜨고, 파일 쓰기는 lock 밖에서 임시 파일 → 교체로 합니다."""
+        with self.lock:
+            self.flush_timer = None
+            if not self.path or not self.dirty:
+                return
+            snapshot = {"version": self.version, "entries": [dict(entry) for entry in self.entries]}
+            vectors = self.vectors
+            self.dirty = False
+
+        with self.save_lock:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_vectors = self.vectors_path + ".tmp.npy"
+            np.save(tmp_vectors, vectors)
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(snapshot, f, ensure_ascii=False)
+            os.replace(tmp_vectors, self.vectors_path)
+            os.replace(tmp_path, self.path)
+
+    # ----------------------------
+    # 정리
+    # ----------------------------
+
+    def _keep(self, rows):
+        self.entries = [self.entries[i] for i in rows]
+        self.vectors = self.vectors[rows] if rows else np.zeros((0, 0), dtype=np.float32)
+
+    def _expire(self, now):
+        rows = [i for i, entry in enumerate(self.entries) if now - entry["created"] <= self.ttl]
+        if len(rows) != len(self.entries):
+            self._keep(rows)
+
+    def _check_version(self):
+        version = data_version()
+        if version != self.version:
+            self.version = version
+            self._keep([])
+            self._mark_dirty()
+            print("[INFO] 가게 데이터/벡터 인덱스가 갱신되어 답변 캐시를 비웠습니다.")
+
+    # ----------------------------
+    # 조회/저장
+    # ----------------------------
+
+    def _vector(self, query):
+        return np.asarray(self.embed(query), dtype=np.float32)
+
+    def get(self, query: str):
+        """유사한 이전 질문의 답변. 없으면 None"""
+        vector = self._vector(query)
+        now = time.time()
+        with self.lock:
+            self._check_version()
+            self._expire(now)
+            if self.entries:
+                scores = self.vectors @ vector
+                best = int(np.argmax(scores))
+                if scores[best] >= self.threshold:
+                    entry = self.entries[best]
+                    entry["last_used"] = now
+                    self.hits += 1
+                    self.saved_ms += entry["latency_ms"]
+                    print(f"[INFO] 답변 캐시 hit (유사도 {scores[best]:.3f}): '{query}' ≈ '{entry['query']}'")
+                    return entry["answer"]
+            self.misses += 1
+            return None
+
+    def put(self, query: str, answer: str, latency_ms: float):
+        vector = self._vector(query)
+        now = time.time()
+        with self.lock:
+            self._check_version()
+            if len(self.entries) >= self.maxsize:
+                # 가장 오래 쓰지 않은 항목 제거
+                oldest = min(range(len(self.entries)), key=lambda i: self.entries[i]["last_used"])
+                self._keep([i for i in range(len(self.entries)) if i != oldest])
+            self.entries.append({
+                "query": query,
+                "answer": answer,
+                "latency_ms": latency_ms,
+                "created": now,
+                "last_used": now,
+            })
+            self.vectors = np.vstack([self.vectors, vector[None, :]]) if len(self.vectors) else vector[None, :]
+            self._mark_dirty()
+
+    def stats(self):
+        with self.lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self.entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "saved_ms": self.saved_ms,
+            }
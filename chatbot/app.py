@@ -17,20 +17,27 @@ load_dotenv()
 if not os.getenv("OPENAI_API_KEY"):
     raise EnvironmentError("OPENAI_API_KEY가 설정되어 있지 않습니다. .env 파일을 확인하세요.")
 
-from chatbot.main_chain import run_chatbot_query_with_memory, reset_chat_history
-
-# 사용자 질문에 응답
-def respond(message, chat_ui_history):
+from chatbot.main_chain import astream_chatbot_query_with_memory, reset_chat_history
+from config import GRADIO_CONCURRENCY_LIMIT, GRADIO_QUEUE_MAX_SIZE
+
+# 사용자 질문에 응답 (토큰이 생성되는 대로 말풍선을 갱신)
+# 대화 히스토리는 브라우저 탭마다 다른 Gradio session_hash별로 분리됩니다.
+# async 핸들러라 LLM 응답을 기다리는 동안 다른 사용자의 요청이 같은 이벤트 루프에서 함께 처리됩니다.
+async def respond(message, chat_ui_history, request: gr.Request):
+    chat_ui_history.append((message, ""))
+    answer = ""
     try:
-        answer = run_chatbot_query_with_memory(message)
+        async for token in astream_chatbot_query_with_memory(message, request.session_hash):
+            answer += token
+            chat_ui_history[-1] = (message, answer)
+            yield "", chat_ui_history
     except Exception as e:
-        answer = f"죄송합니다. 오류가 발생했어요: {str(e)}"
-    chat_ui_history.append((message, answer))
-    return "", chat_ui_history
+        chat_ui_history[-1] = (message, answer + f"\n\n죄송합니다. 오류가 발생했어요: {str(e)}")
+    yield "", chat_ui_history
 
 # 초기화 버튼 동작
-def reset():
-    reset_chat_history()
+def reset(request: gr.Request):
+    reset_chat_history(request.session_hash)
     return []  # 말풍선도 제거
 
 # Gradio UI 구성
@@ -39,8 +46,9 @@ with gr.Blocks() as demo:
     msg = gr.Textbox(label="질문해주세요!")
     clear = gr.Button("대화 초기화")
 
-    msg.submit(respond, [msg, chatbot], [msg, chatbot])
+    msg.submit(respond, [msg, chatbot], [msg, chatbot], concurrency_limit=GRADIO_CONCURRENCY_LIMIT)
     clear.click(reset, None, chatbot, queue=False)
 
 if __name__ == "__main__":
+    demo.queue(max_size=GRADIO_QUEUE_MAX_SIZE)  # 제너레이터 응답(스트리밍)은 큐를 통해 전달됩니다.
     demo.launch(share=True, debug=True)
@@ -0,0 +1,144 @@
+# 파일: chatbot/context_window.py
+# Description: 세션 대화 히스토리로부터 토큰 예산 안에 드는 프롬프트를 만드는 컨텍스트 관리 모듈
+#              - system prompt와 최근 CONTEXT_KEEP_TURNS개 턴은 그대로 보내고, 리뷰 검색 문맥(RAG 블록)은 현재 턴 것만 보냅니다.
+#              - 프롬프트가 CONTEXT_TOKEN_BUDGET을 넘으면 최근 턴보다 오래된 턴을 요약 하나로 접어 세션에 저장합니다.
+#              - 세션 메시지 수가 SESSION_MAX_MESSAGES를 넘을 때도 넘는 오래된 턴을 버리지 않고 같은 방식으로 요약에 접습니다.
+#              - 요청마다 프롬프트 토큰 수를 로그로 남깁니다.
+# Author: 통합버전
+# Date: 2025.04.29
+# Requirements: tiktoken (없으면 글자 수로 토큰 수를 추정)
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))  # 상위 폴더 경로 추가
+
+import asyncio
+from config import CONTEXT_TOKEN_BUDGET, CONTEXT_KEEP_TURNS, SESSION_MAX_MESSAGES
+
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("o200k_base")  # gpt-4o 계열 토크나이저
+except Exception:
+    _encoding = None
+
+# 매 턴 질문 뒤에 붙는 리뷰 검색 문맥 메시지의 머리말
+RAG_CONTEXT_PREFIX = "다음은 관련 리뷰입니다:"
+
+def count_tokens(text: str) -> int:
+    if not text:
+        return 0
+    if _encoding is not None:
+        return len(_encoding.encode(text))
+    return len(text) // 2 + 1  # 한국어는 대략 2글자당 1토큰
+
+def message_tokens(message: dict) -> int:
+    """메시지 하나의 토큰 수 (역할/구분자 오버헤드 4토큰 포함)"""
+    tokens = 4 + count_tokens(message.get("content") or "")
+    for call in message.get("tool_calls") or []:
+        tokens += count_tokens(call["function"]["name"]) + count_tokens(call["function"]["arguments"])
+    return tokens
+
+def is_rag_context(message: dict) -> bool:
+    return message["role"] == "assistant" and (message.get("content") or "").startswith(RAG_CONTEXT_PREFIX)
+
+def split_turns(messages: list) -> list:
+    """system prompt 이후의 메시지를 user 메시지 기준으로 턴 단위로 나눕니다."""
+    turns = []
+    for message in messages:
+        if message["role"] == "user" or not turns:
+            turns.append([])
+        turns[-1].append(message)
+    return turns
+
+def format_turns(turns: list) -> str:
+    """요약 모델에 넘길 대화 텍스트 (리뷰 문맥은 제외)"""
+    lines = []
+    for turn in turns:
+        for message in turn:
+            if is_rag_context(message) or not message.get("content"):
+                continue
+            speaker = "사용자" if message["role"] == "user" else "챗봇"
+            lines.append(f"{speaker}: {message['content']}")
+    return "\n".join(lines)
+
+class ContextWindow:
+    """
+    Args:
+        summarize (callable): (이전 요약, 접을 대화 텍스트) → 새 요약. None이면 요약하지 않고 오래된 턴을 버립니다.
+        asummarize (callable): summarize의 async 버전 (abuild에서 사용)
+        budget (int): 프롬프트 토큰 예산
+        keep_turns (int): 그대로 보낼 최근 턴 수
+        max_messages (int): 세션에 남길 최대 메시지 수 (system prompt 제외, 현재 턴은 항상 남김)
+    """
+
+    def __init__(self, summarize=None, budget=CONTEXT_TOKEN_BUDGET, keep_turns=CONTEXT_KEEP_TURNS,
+                 max_messages=SESSION_MAX_MESSAGES, asummarize=None):
+        self.summarize = summarize
+        self.asummarize = asummarize
+        self.budget = budget
+        self.keep_turns = keep_turns
+        self.max_messages = max_messages
+
+    def _render(self, system, summary, turns):
+        messages = [system]
+        if summary:
+            messages.append({"role": "system", "content": f"이전 대화 요약:\n{summary}"})
+        for turn in turns:
+            messages.extend(turn)
+        return messages
+
+    def _plan(self, session):
+        """
+        (session.lock 안에서 호출) 지난 턴의 리뷰 문맥을 지우고, 요약으로 접을 오래된 턴 수를 정합니다.
+        Returns:
+            (system, turns, fold, tokens): fold는 앞에서부터 접을 턴 수, tokens는 접기 전 프롬프트 토큰 수
+        """
+        system, turns = session.messages[0], split_turns(session.messages[1:])
+
+        # 지난 턴의 리뷰 문맥은 다시 보내지 않으므로 세션에서도 지웁니다.
+        turns = [[m for m in turn if not is_rag_context(m)] for turn in turns[:-1]] + turns[-1:]
+        session.messages[1:] = [m for turn in turns for m in turn]
+        tokens = sum(message_tokens(m) for m in self._render(system, session.summary, turns))
+
+        # 예산이나 메시지 수 상한을 넘으면 최근 keep_turns개만 남기고 접음 (그래도 상한을 넘으면 더 접되 현재 턴은 남김)
+        over_messages = sum(len(turn) for turn in turns) > self.max_messages
+        fold = len(turns) - self.keep_turns if (tokens > self.budget or over_messages) and len(turns) > self.keep_turns else 0
+        while fold < len(turns) - 1 and sum(len(turn) for turn in turns[fold:]) > self.max_messages:
+            fold += 1
+        return system, turns, fold, tokens
+
+    def _finish(self, session, system, turns, fold, tokens, summary) -> list:
+        """(session.lock 안에서 호출) 접은 턴을 세션에서 지우고 새 요약으로 프롬프트를 만듭니다."""
+        if fold:
+            session.summary = summary
+            turns = turns[fold:]
+            session.messages[1:] = [m for turn in turns for m in turn]
+
+        messages = self._render(system, session.summary, turns)
+        before, tokens = tokens, sum(message_tokens(m) for m in messages)
+        if fold:
+            print(f"[INFO] 오래된 턴 {fold}개를 요약으로 접음: {before} → {tokens} 토큰")
+        print(f"[INFO] 프롬프트 토큰 {tokens} / 예산 {self.budget} (메시지 {len(messages)}개)")
+        return messages
+
+    def build(self, session) -> list:
+        """
+        세션의 현재 히스토리로 이번 요청에 보낼 메시지 목록을 만듭니다. (session.lock 안에서 호출)
+        지난 턴의 리뷰 문맥은 지우고, 예산이나 메시지 수 상한을 넘으면 오래된 턴을 session.summary로 접고
+        session.messages에서 지웁니다.
+        """
+        system, turns, fold, tokens = self._plan(session)
+        summary = session.summary
+        if fold and self.summarize is not None:
+            summary = self.summarize(session.summary, format_turns(turns[:fold]))
+        return self._finish(session, system, turns, fold, tokens, summary)
+
+    async def abuild(self, session) -> list:
+        """build의 비동기 버전. 요약은 asummarize로 이벤트 루프에서 기다립니다. (없으면 summarize를 스레드에서 실행)"""
+        system, turns, fold, tokens = self._plan(session)
+        summary = session.summary
+        if fold and self.asummarize is not None:
+            summary = await self.asummarize(session.summary, format_turns(turns[:fold]))
+        elif fold and self.summarize is not None:
+            summary = await asyncio.to_thread(self.summarize, session.summary, format_turns(turns[:fold]))
+        return self._finish(session, system, turns, fold, tokens, summary)
@@ -0,0 +1,157 @@
+# 파일: chatbot/intent_router.py
+# Description: 질문을 LLM 호출 전에 로컬 규칙으로 분류해, 리뷰 검색(임베딩 + Chroma)이 필요한 경우에만 검색하도록 하는 라우터
+#              - structured: 가게 이름 + 전화번호/주소/영업시간/메뉴처럼 툴(가게 카탈로그)만으로 답할 수 있는 질문 → 검색 생략
+#                (툴은 모두 가게 이름이 필요하므로 가게 이름이 없으면 structured로 보지 않음)
+#              - review: 맛/분위기/후기/추천 등 리뷰가 필요한 질문, 가게 이름만 있는 질문 → 검색
+#              - mixed: 두 가지가 섞인 질문, 가게 이름 없이 가격/주차/음식 종류 등으로 가게를 찾는 질문 → 검색
+#              가게 이름이 들어 있는지는 가게 카탈로그의 정규화 이름 집합으로 확인합니다.
+#              refers_to_previous_store는 가게 이름 없는 질문이 이전 턴의 가게를 가리키는 후속 질문인지 판단합니다.
+#              검색을 생략한 비율과, 실제 검색 평균 지연으로 추정한 절약 시간을 집계합니다.
+# Author: 통합버전
+# Date: 2025.04.29
+# Requirements: 없음 (표준 라이브러리)
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))  # 상위 폴더 경로 추가
+
+import threading
+from chatbot.store_resolver import normalize
+
+# 툴로 답할 수 있는 항목을 묻는 표현
+STRUCTURED_KEYWORDS = [
+    "전화번호", "번호", "연락처", "예약전화",
+    "주소", "위치", "어디에있", "어디야", "가는길",
+    "영업시간", "몇시", "오픈", "마감", "브레이크", "라스트오더", "쉬는날", "휴무",
+    "메뉴", "가격", "얼마",
+    "주차", "와이파이", "포장", "배달", "시설", "단체석", "화장실",
+    "무슨음식", "음식종류", "어떤음식", "한식", "중식", "일식", "양식",
+]
+
+# 리뷰(맛/분위기/평가)가 있어야 답할 수 있는 표현
+REVIEW_KEYWORDS = [
+    "맛", "후기", "리뷰", "평가", "평점", "분위기", "추천", "어때", "어떤가", "괜찮", "좋아", "별로",
+    "친절", "서비스", "양많", "양이", "가성비", "웨이팅", "줄서", "데이트", "혼밥", "회식", "인기", "유명",
+]
+
+# 리뷰 검색을 긍정/부정 리뷰로 좁힐 표현 (sentiment 메타데이터: positive / neutral / negative)
+NEGATIVE_KEYWORDS = ["단점", "별로", "아쉬", "불만", "나쁜", "나빠", "최악", "실망", "불친절"]
+POSITIVE_KEYWORDS = ["장점", "좋은점", "칭찬", "만족", "좋았"]
+
+# 이전 턴의 가게를 가리키는 표현 / 새로 가게를 찾는 추천형 표현 (후자는 이전 가게로 검색 범위를 좁히지 않음)
+FOLLOW_UP_KEYWORDS = ["거기", "그집", "그가게", "그식당", "이집", "이가게", "여기", "그곳", "저기", "저집"]
+RECOMMEND_KEYWORDS = [
+    "추천", "맛집", "갈만한", "가볼만한곳", "다른곳", "다른집", "다른가게", "어디가", "어디있",
+    "한식", "중식", "일식", "양식", "국밥", "냉면", "고기집", "횟집", "카페", "술집", "분식", "치킨", "피자",
+    "파스타", "초밥", "라멘", "곱창", "족발", "짜장", "짬뽕", "돈까스",
+]
+
+INTENT_STRUCTURED = "structured"
+INTENT_REVIEW = "review"
+INTENT_MIXED = "mixed"
+
+MIN_NAME_LENGTH = 2  # 이보다 짧은 가게 이름은 오탐이 많아 언급 검사에서 제외
+FOLLOW_UP_MAX_LENGTH = 8  # "단점은?", "메뉴는?"처럼 이 길이 이하의 짧은 질문은 이전 가게에 대한 후속 질문으로 봄
+
+def detect_sentiment(query: str):
+    """질문이 부정/긍정 리뷰만 묻는 경우 'negative' / 'positive', 아니면 None"""
+    text = normalize(query or "")
+    if any(keyword in text for keyword in NEGATIVE_KEYWORDS):
+        return "negative"
+    if any(keyword in text for keyword in POSITIVE_KEYWORDS):
+        return "positive"
+    return None
+
+def refers_to_previous_store(query: str) -> bool:
+    """
+    가게 이름이 없는 질문이 이전 턴의 가게를 가리키는지. ("거기 주차돼?", "단점은?" → True)
+    "충정로 국밥집 추천해줘"처럼 새로 가게를 찾는 질문은 False
+    """
+    text = normalize(query or "")
+    if any(keyword in text for keyword in FOLLOW_UP_KEYWORDS) and "다른" not in text:
+        return True
+    if any(keyword in text for keyword in RECOMMEND_KEYWORDS):
+        return False
+    return len(text) <= FOLLOW_UP_MAX_LENGTH
+
+class IntentRouter:
+    """
+    Args:
+        get_store_names (callable): 정규화된 가게 이름 집합을 반환하는 함수 (첫 분류 때 한 번 호출)
+    """
+
+    def __init__(self, get_store_names=None):
+        self.get_store_names = get_store_names
+        self.source_names = None  # get_store_names가 마지막으로 반환한 집합 (바뀌면 다시 색인)
+        self.store_names = None
+        self.max_name_length = 0
+        self.lock = threading.Lock()
+        self.counts = {INTENT_STRUCTURED: 0, INTENT_REVIEW: 0, INTENT_MIXED: 0}
+        self.retrieval_ms_total = 0.0
+        self.retrievals = 0
+
+    def _names(self):
+        """가게 이름 집합. 카탈로그가 교체되어 다른 집합 객체가 오면 다시 만듭니다."""
+        names = self.get_store_names() if self.get_store_names else set()
+        with self.lock:
+            if self.store_names is None or names is not self.source_names:
+                self.source_names = names
+                self.store_names = {name for name in names if len(name) >= MIN_NAME_LENGTH}
+                self.max_name_length = max(map(len, self.store_names), default=0)
+            return self.store_names
+
+    def find_store_mention(self, query: str):
+        """정규화된 질문의 부분 문자열 중 가게 이름과 정확히 같은 가장 긴 것. 없으면 None (집합 조회만 사용)"""
+        names = self._names()
+        best = None
+        for start in range(len(query)):
+            for end in range(start + MIN_NAME_LENGTH, min(len(query), start + self.max_name_length) + 1):
+                if query[start:end] in names and (best is None or end - start > len(best)):
+                    best = query[start:end]
+        return best
+
+    def mentions_store(self, query: str) -> bool:
+        return self.find_store_mention(query) is not None
+
+    def classify(self, query: str) -> str:
+        text = normalize(query or "")
+        structured = any(keyword in text for keyword in STRUCTURED_KEYWORDS)
+        review = any(keyword in text for keyword in REVIEW_KEYWORDS)
+
+        if structured and review:
+            intent = INTENT_MIXED
+        elif structured:
+            # "주차 되는 식당 있어?"처럼 가게 이름 없이 조건으로 찾는 질문은 툴로 답할 수 없어 검색도 함께
+            intent = INTENT_STRUCTURED if self.mentions_store(text) else INTENT_MIXED
+        else:
+            intent = INTENT_REVIEW  # 리뷰 표현만 있거나, 가게 이름만 있거나, 판단이 어려우면 검색하는 쪽으로
+
+        with self.lock:
+            self.counts[intent] += 1
+        return intent
+
+    @staticmethod
+    def needs_retrieval(intent: str) -> bool:
+        return intent != INTENT_STRUCTURED
+
+    def record_retrieval(self, elapsed_ms: float):
+        with self.lock:
+            self.retrieval_ms_total += elapsed_ms
+            self.retrievals += 1
+
+    def stats(self):
+        with self.lock:
+            total = sum(self.counts.values())
+            skipped = self.counts[INTENT_STRUCTURED]
+            avg_ms = self.retrieval_ms_total / self.retrievals if self.retrievals else 0.0
+            return {
+                **self.counts,
+                "skip_rate": skipped / total if total else 0.0,
+                "avg_retrieval_ms": avg_ms,
+                "saved_ms": skipped * avg_ms,
+            }
+
+    def report(self) -> str:
+        s = self.stats()
+        return (f"검색 생략 {s['structured']}/{s['structured'] + s['review'] + s['mixed']} ({s['skip_rate']:.0%}), "
+                f"평균 검색 {s['avg_retrieval_ms']:.0f}ms, 절약 추정 {s['saved_ms']:.0f}ms")
@@ -2,7 +2,7 @@
 # Description: 사용자 질문과 리뷰 벡터 DB 문맥을 바탕으로 툴 호출 및 응답을 처리하는 RAG 기반 챗봇 로직 구현 (메모리 기반 대화 포함)
 # Author: 통합버전
 # Date: 2025.04.29
-# Requirements: openai, dotenv, json, 사용자 정의 툴 모듈 (tools.py), vectordb.retriever
+# Requirements: openai, dotenv, json, asyncio, concurrent.futures, 사용자 정의 툴 모듈 (tools.py), vectordb.retriever
 
 from dotenv import load_dotenv
 load_dotenv()  # .env 파일에 있는 환경변수들을 시스템 환경변수로 로드
@@ -13,9 +13,23 @@ sys.path.append(os.path.dirname(os.path.dirname(__file__)))  # 상위 폴더 경
 
 import os
 import json
-from openai import OpenAI
+import time
+import random
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from openai import OpenAI, AsyncOpenAI, RateLimitError, InternalServerError, APITimeoutError, APIConnectionError
+from chatbot.session_store import SessionStore
+from chatbot.intent_router import IntentRouter, detect_sentiment, refers_to_previous_store
+from chatbot.store_resolver import normalize
+from chatbot.answer_cache import SemanticAnswerCache
+from chatbot.context_window import ContextWindow, RAG_CONTEXT_PREFIX
+from config import (
+    CONTEXT_SUMMARY_MODEL, REVIEW_FILTER_LOOKBACK_TURNS, LLM_MODEL, LLM_TIMEOUT, LLM_MAX_RETRIES, LLM_RETRY_BASE_DELAY, LLM_MAX_CONCURRENCY,
+)
 from chatbot.tools import (
     tools,
+    get_store_catalog,
+    get_store_profile,
     get_menu_by_store_name,
     get_address_by_store_name,
     get_openhours_by_store_name,
@@ -29,11 +43,34 @@ from chatbot.tools import (
 from vectordb.load_retriever import get_retriever
 retriever = get_retriever()
 
-# 1. 대화 히스토리 초기화
-chat_history = [
-    {
-        "role": "system",
-        "content": """
+# 대화 맥락이 없는 첫 질문은 비슷한 이전 질문의 답변을 재사용 (질의 임베딩은 retriever 캐시와 공유)
+answer_cache = SemanticAnswerCache(embed=retriever.embed_query)
+
+# 툴 이름 → 실행 함수. 새 툴은 tools.py에 함수와 스키마를 추가한 뒤 여기에 등록합니다.
+TOOL_REGISTRY = {
+    "get_menu_by_store_name": get_menu_by_store_name,
+    "get_address_by_store_name": get_address_by_store_name,
+    "get_openhours_by_store_name": get_openhours_by_store_name,
+    "get_categories_by_store_name": get_categories_by_store_name,
+    "get_facilities_by_store_name": get_facilities_by_store_name,
+    "get_hashtags_by_store_name": get_hashtags_by_store_name,
+    "get_phone_by_store_name": get_phone_by_store_name,
+    "get_store_profile": get_store_profile,
+}
+
+# OpenAI 클라이언트는 프로세스에 하나씩만 만들어 HTTP 연결 풀을 재사용합니다.
+client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"), timeout=LLM_TIMEOUT, max_retries=LLM_MAX_RETRIES)
+async_client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"), timeout=LLM_TIMEOUT, max_retries=0)  # 재시도는 acreate_completion에서
+
+# 동시에 진행 중인 LLM 호출 수 제한 (넘는 요청은 슬롯이 빌 때까지 대기)
+llm_semaphore = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+RETRYABLE_ERRORS = (RateLimitError, InternalServerError, APITimeoutError, APIConnectionError)
+
+# 한 응답의 tool_calls를 동시에 실행할 스레드 풀 (요청마다 만들지 않고 재사용)
+tool_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="tool")
+
+# 1. 세션별 대화 히스토리 (모든 세션은 같은 system prompt로 시작)
+SYSTEM_PROMPT = """
             당신은 서울 충정로역 주변 맛집 정보를 제공합니다.
             정보를 바탕으로 맛집을 추천해주는 똑똑한 챗봇입니다.
 
@@ -47,86 +84,327 @@ chat_history = [
             7. 사용자가 가게 분위기나 특징을 물으면 반드시 get_hashtags_by_store_name 툴을 호출하세요.
             8. 사용자가 맛/분위기/후기 등을 물으면 vector DB에서 리뷰 검색 후 답변하세요.
             9. 툴 호출 시 store_name이 불명확하면 다시 요청하세요.
+            10. 한 가게의 정보를 두 가지 이상 물으면 get_store_profile 툴을 한 번 호출하고 fields에 필요한 항목을 모두 넣으세요.
 
             또한, 메뉴/가게 정보는 보기 좋게 목차처럼 정리해서 보여주세요.
             리뷰 정보는 말하듯 자연스럽게 풀어서 설명해주세요.
         """
+
+# session_id 없이 호출하면 (스크립트/테스트 등) 이 세션 하나를 공유합니다.
+DEFAULT_SESSION_ID = "default"
+session_store = SessionStore(SYSTEM_PROMPT)
+
+def summary_messages(previous_summary: str, conversation: str) -> list:
+    return [
+        {"role": "system", "content": "맛집 추천 챗봇과 사용자의 대화를 요약합니다. 사용자가 관심을 보인 가게 이름, 조건(메뉴, 위치, 분위기 등), 이미 안내한 정보를 중심으로 5문장 이내로 정리하세요."},
+        {"role": "user", "content": f"이전 요약:\n{previous_summary or '(없음)'}\n\n추가 대화:\n{conversation}"},
+    ]
+
+def summarize_history(previous_summary: str, conversation: str) -> str:
+    """예산을 넘은 오래된 턴을 이전 요약과 합쳐 짧은 요약으로 만듭니다."""
+    response = client.chat.completions.create(
+        model=CONTEXT_SUMMARY_MODEL, messages=summary_messages(previous_summary, conversation)
+    )
+    return response.choices[0].message.content
+
+async def asummarize_history(previous_summary: str, conversation: str) -> str:
+    """summarize_history의 비동기 버전. 다른 LLM 호출과 같은 동시 호출 제한/재시도를 따릅니다."""
+    async with llm_semaphore:
+        response = await acreate_completion(
+            model=CONTEXT_SUMMARY_MODEL, messages=summary_messages(previous_summary, conversation)
+        )
+    return response.choices[0].message.content
+
+context_window = ContextWindow(summarize=summarize_history, asummarize=asummarize_history)
+
+# 툴만으로 답할 수 있는 질문은 리뷰 검색(질의 임베딩 + Chroma)을 건너뜁니다.
+intent_router = IntentRouter(get_store_names=lambda: get_store_catalog().names())
+
+def reset_chat_history(session_id: str = DEFAULT_SESSION_ID):
+    """해당 세션의 대화 히스토리를 system prompt만 남기고 초기화합니다."""
+    session_store.reset(session_id)
+    print(f"대화 히스토리가 초기화되었습니다. (세션 {session_id})")
+
+def run_tool_call(call: dict) -> dict:
+    """tool_call 하나를 레지스트리에서 찾아 실행하고 tool 메시지로 반환합니다."""
+    func_name = call["function"]["name"]
+    func = TOOL_REGISTRY.get(func_name)
+    if func is None:
+        tool_result = f"정의되지 않은 함수입니다: {func_name}"
+    else:
+        try:
+            args = json.loads(call["function"]["arguments"] or "{}")
+            tool_result = func(**args)
+        except Exception as e:
+            tool_result = f"툴 실행 중 오류가 발생했습니다: {e}"
+
+    return {
+        "role": "tool",
+        "tool_call_id": call["id"],
+        "name": func_name,
+        "content": tool_result
     }
-]
 
-def reset_chat_history():
-    """chat_history를 system prompt만 남기고 초기화합니다."""
-    global chat_history
-    chat_history = chat_history[:1]
-    print("대화 히스토리가 초기화되었습니다.")
+def run_tool_calls(tool_calls) -> list:
+    """한 응답의 모든 tool_calls를 동시에 실행합니다. 결과는 호출 순서대로 반환됩니다."""
+    if len(tool_calls) == 1:
+        return [run_tool_call(tool_calls[0])]
+    return list(tool_executor.map(run_tool_call, tool_calls))
 
-def run_chatbot_query_with_memory(query: str) -> str:
-    client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+class StreamTimer:
+    """요청 시작부터 첫 토큰까지의 시간(TTFT)과 전체 응답 시간을 기록합니다."""
 
-    # Step 1: 리뷰 검색 (RAG)
-    docs = retriever.get_relevant_documents(query)
-    context = "\n".join([doc.page_content for doc in docs])
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.first_token = None
 
-    # Step 2: 히스토리에 질문 + context 추가
-    chat_history.append({"role": "user", "content": query})
-    chat_history.append({"role": "assistant", "content": f"다음은 관련 리뷰입니다:\n{context}"})
+    def mark_token(self):
+        if self.first_token is None:
+            self.first_token = time.perf_counter()
+            print(f"[INFO] TTFT {(self.first_token - self.start) * 1000:.0f}ms")
 
-    # Step 3: GPT 호출 (1차)
-    response = client.chat.completions.create(
-        model="gpt-4o",
-        messages=chat_history,
-        tools=tools,
-        tool_choice="auto"
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self.start) * 1000
+
+    def report(self, tool_calls: int):
+        print(f"[INFO] 응답 완료 {self.elapsed_ms():.0f}ms (툴 호출 {tool_calls}회)")
+
+def consume_chunk(chunk, tool_calls: list, timer: StreamTimer):
+    """
+    스트림 청크 하나를 처리해 텍스트 조각(없으면 None)을 반환합니다.
+    스트림으로 나뉘어 오는 툴 호출 조각은 index별로 tool_calls에 이어 붙입니다.
+    """
+    if chunk.usage:
+        print(f"[INFO] OpenAI usage: prompt {chunk.usage.prompt_tokens} / completion {chunk.usage.completion_tokens} 토큰")
+    if not chunk.choices:
+        return None
+    delta = chunk.choices[0].delta
+
+    for part in delta.tool_calls or []:
+        while len(tool_calls) <= part.index:
+            tool_calls.append({"id": "", "type": "function", "function": {"name": "", "arguments": ""}})
+        call = tool_calls[part.index]
+        if part.id:
+            call["id"] = part.id
+        if part.function and part.function.name:
+            call["function"]["name"] += part.function.name
+        if part.function and part.function.arguments:
+            call["function"]["arguments"] += part.function.arguments
+
+    if delta.content:
+        timer.mark_token()
+        return delta.content
+    return None
+
+def stream_completion(messages, timer: StreamTimer, tool_calls: list = None, **kwargs):
+    """chat.completions를 stream=True로 호출해 텍스트 조각을 yield 합니다. (툴 호출 조각은 tool_calls에 채움)"""
+    tool_calls = tool_calls if tool_calls is not None else []
+    stream = client.chat.completions.create(
+        model=LLM_MODEL, messages=messages, stream=True, stream_options={"include_usage": True}, **kwargs
     )
+    for chunk in stream:
+        token = consume_chunk(chunk, tool_calls, timer)
+        if token:
+            yield token
+
+async def acreate_completion(**kwargs):
+    """429/5xx/타임아웃/연결 오류면 지수 백오프 + 지터로 LLM_MAX_RETRIES번까지 다시 시도합니다."""
+    for attempt in range(LLM_MAX_RETRIES + 1):
+        try:
+            return await async_client.chat.completions.create(**kwargs)
+        except RETRYABLE_ERRORS as e:
+            if attempt == LLM_MAX_RETRIES:
+                raise
+            delay = LLM_RETRY_BASE_DELAY * 2 ** attempt * random.uniform(0.5, 1.5)
+            print(f"[WARN] OpenAI 호출 실패 ({type(e).__name__}), {delay:.1f}초 후 재시도 ({attempt + 1}/{LLM_MAX_RETRIES})")
+            await asyncio.sleep(delay)
 
-    tool_calls = response.choices[0].message.tool_calls
-    if tool_calls:
-        tool_messages = []
-
-        for call in tool_calls:
-            func_name = call.function.name
-            args = json.loads(call.function.arguments)
-            store_name = args.get("store_name", "")
-
-            if func_name == "get_menu_by_store_name":
-                tool_result = get_menu_by_store_name(store_name)
-            elif func_name == "get_address_by_store_name":
-                tool_result = get_address_by_store_name(store_name)
-            elif func_name == "get_openhours_by_store_name":
-                tool_result = get_openhours_by_store_name(store_name)
-            elif func_name == "get_categories_by_store_name":
-                tool_result = get_categories_by_store_name(store_name)
-            elif func_name == "get_facilities_by_store_name":
-                tool_result = get_facilities_by_store_name(store_name)
-            elif func_name == "get_hashtags_by_store_name":
-                tool_result = get_hashtags_by_store_name(store_name)
-            elif func_name == "get_phone_by_store_name":
-                tool_result = get_phone_by_store_name(store_name)
-            else:
-                tool_result = f"정의되지 않은 함수입니다: {func_name}"
-
-            tool_messages.append({
-                "role": "tool",
-                "tool_call_id": call.id,
-                "name": func_name,
-                "content": tool_result
-            })
-
-        follow_up_messages = chat_history + [
-            {"role": "assistant", "content": None, "tool_calls": tool_calls},
-            *tool_messages
-        ]
-
-        final_response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=follow_up_messages
+async def astream_completion(messages, timer: StreamTimer, tool_calls: list = None, **kwargs):
+    """stream_completion의 비동기 버전. 스트림을 다 읽을 때까지 LLM 동시 호출 슬롯 하나를 차지합니다."""
+    tool_calls = tool_calls if tool_calls is not None else []
+    async with llm_semaphore:  # 진행 중인 호출이 LLM_MAX_CONCURRENCY개면 빈 슬롯이 날 때까지 대기
+        stream = await acreate_completion(
+            model=LLM_MODEL, messages=messages, stream=True, stream_options={"include_usage": True}, **kwargs
         )
+        async for chunk in stream:
+            token = consume_chunk(chunk, tool_calls, timer)
+            if token:
+                yield token
+
+def resolve_store_name(text: str):
+    """
+    질문에 언급된 가게 이름. 어휘 색인이 있으면 리뷰 메타데이터 표기로 바로 찾고,
+    없으면(Chroma만 쓰는 경우) 라우터의 이름 매칭 + 가게 카탈로그로 찾습니다. 없으면 None
+    """
+    resolve_store = getattr(retriever, "resolve_store", None)
+    if resolve_store is not None:
+        return resolve_store(text)
+    mention = intent_router.find_store_mention(normalize(text or ""))
+    store = get_store_catalog().find(mention) if mention else None
+    return store.store_name if store else None
+
+def resolve_review_filter(session, query: str):
+    """
+    리뷰 검색을 좁힐 메타데이터 조건. 질문에 언급된 가게로 store_name을,
+    "단점", "장점" 같은 표현이 있으면 sentiment를 지정합니다. 가게를 못 찾으면 None (전체 검색)
+    질문에 가게 이름이 없으면 "거기", "단점은?" 같은 후속 질문일 때만 최근 사용자 질문의 가게를 씁니다.
+    """
+    store_name = resolve_store_name(query)
+    if store_name is None and refers_to_previous_store(query):
+        recent = [m["content"] for m in session.messages[1:] if m["role"] == "user"][-REVIEW_FILTER_LOOKBACK_TURNS:]
+        for previous in reversed(recent):
+            store_name = resolve_store_name(previous)
+            if store_name is not None:
+                break
+    if store_name is None:
+        return None
+
+    where = {"store_name": store_name}
+    sentiment = detect_sentiment(query)
+    if sentiment:
+        where["sentiment"] = sentiment
+    return where
+
+def retrieve_reviews(session, query: str) -> list:
+    """가게로 범위를 좁혀 리뷰를 검색합니다. 감성 조건까지 걸어 결과가 없으면 가게 조건만으로 다시 검색합니다."""
+    where = resolve_review_filter(session, query)
+    if where is None:
+        return retriever.get_relevant_documents(query)
+
+    print(f"[INFO] 리뷰 검색 범위: {where}")
+    docs = retriever.get_relevant_documents(query, filter=where)
+    if not docs and "sentiment" in where:
+        docs = retriever.get_relevant_documents(query, filter={"store_name": where["store_name"]})
+    return docs
+
+def prepare_turn(session, query: str):
+    """
+    (세션 lock 안에서 호출) 의도 분류 → 답변 캐시 확인 → 리뷰 검색 → 히스토리 추가.
+    토큰 예산 프롬프트는 호출하는 쪽에서 context_window.build / abuild로 만듭니다. (요약 호출을 동기/비동기로 나누기 위해)
+
+    Returns:
+        (cacheable, cached_answer): 캐시 hit이면 히스토리에 답변까지 추가된 상태
+    """
+    chat_history = session.messages
+
+    # Step 0: 의도 분류 후, 가게 이름이 없는 첫 질문만 답변 캐시 확인
+    # ("A집 전화번호" / "B집 전화번호"는 이름만 달라 유사도가 높으므로 다른 가게의 답변이 나갈 수 있음)
+    intent = intent_router.classify(query)
+    first_turn = len(chat_history) == 1 and not session.summary
+    cacheable = first_turn and not intent_router.mentions_store(normalize(query))
+    if cacheable:
+        cached_answer = answer_cache.get(query)
+        if cached_answer is not None:
+            chat_history.append({"role": "user", "content": query})
+            chat_history.append({"role": "assistant", "content": cached_answer})
+            stats = answer_cache.stats()
+            print(f"[INFO] 답변 캐시 hit rate {stats['hit_rate']:.0%}, 절약 {stats['saved_ms']:.0f}ms")
+            return cacheable, cached_answer
+
+    # Step 1: 리뷰 검색 (RAG) - 전화번호/주소처럼 툴로 답할 질문이면 생략
+    context = None
+    if intent_router.needs_retrieval(intent):
+        started = time.perf_counter()
+        docs = retrieve_reviews(session, query)
+        context = "\n".join([doc.page_content for doc in docs])
+        intent_router.record_retrieval((time.perf_counter() - started) * 1000)
+    print(f"[INFO] intent={intent} | {intent_router.report()}")
+
+    # Step 2: 히스토리에 질문 + context 추가
+    chat_history.append({"role": "user", "content": query})
+    if context is not None:
+        chat_history.append({"role": "assistant", "content": f"{RAG_CONTEXT_PREFIX}\n{context}"})
+
+    return cacheable, None
+
+def follow_up_prompt(prompt: list, answer: list, tool_calls: list, tool_messages: list) -> list:
+    return prompt + [
+        {"role": "assistant", "content": "".join(answer) or None, "tool_calls": tool_calls},
+        *tool_messages
+    ]
+
+def finish_turn(session, query: str, answer: str, cacheable: bool, timer: StreamTimer):
+    """
+    (세션 lock 안에서 호출) 답변을 히스토리에 추가하고, 캐시 가능한 첫 질문이면 답변 캐시에 저장합니다.
+    호출하는 쪽은 툴을 쓴 답변(특정 가게 정보)이면 cacheable=False로 넘깁니다.
+    """
+    session.messages.append({"role": "assistant", "content": answer})
+    if cacheable and answer:
+        answer_cache.put(query, answer, timer.elapsed_ms())
+
+def stream_chatbot_query_with_memory(query: str, session_id: str = DEFAULT_SESSION_ID):
+    """
+    run_chatbot_query_with_memory의 스트리밍 버전. 답변 텍스트 조각을 생성되는 대로 yield 합니다.
+    툴을 호출한 경우에는 툴 실행 뒤 2차 호출의 토큰을 이어서 yield 합니다.
+    대화 히스토리는 session_id별로 따로 보관되며, 같은 세션의 요청은 순서대로 처리됩니다.
+    """
+    timer = StreamTimer()
+    session = session_store.get(session_id)
+    tool_calls = []
+
+    with session.lock:
+        cacheable, cached_answer = prepare_turn(session, query)
+        if cached_answer is not None:
+            timer.mark_token()
+            yield cached_answer
+            return
+
+        # 토큰 예산 안의 프롬프트 (이전 턴의 리뷰 문맥 제외, 오래된 턴은 요약)
+        prompt = context_window.build(session)
+
+        # Step 3: GPT 호출 (1차) - 툴 없이 바로 답하면 이 스트림이 곧 답변
+        answer = []  # UI로 보낸 텍스트 전체 (1차 + 2차)
+        for token in stream_completion(prompt, timer, tool_calls, tools=tools, tool_choice="auto"):
+            answer.append(token)
+            yield token
+
+        # Step 4: 툴 실행 후 GPT 호출 (2차)
+        if tool_calls:
+            tool_messages = run_tool_calls(tool_calls)
+            follow_up_messages = follow_up_prompt(prompt, answer, tool_calls, tool_messages)
+
+            # 1차에서 이미 보낸 텍스트도 사용자가 본 답변이므로 이어 붙여 저장합니다.
+            for token in stream_completion(follow_up_messages, timer):
+                answer.append(token)
+                yield token
+
+        finish_turn(session, query, "".join(answer), cacheable and not tool_calls, timer)
+    timer.report(len(tool_calls))
+
+async def astream_chatbot_query_with_memory(query: str, session_id: str = DEFAULT_SESSION_ID):
+    """
+    stream_chatbot_query_with_memory의 비동기 버전. (Gradio async 핸들러용)
+    OpenAI 호출은 공유 AsyncOpenAI 클라이언트로 이벤트 루프에서 기다리고,
+    검색/툴처럼 블로킹되는 단계는 스레드로 넘기고, 오래된 턴 요약은 비동기 클라이언트로 호출해 다른 사용자의 요청을 막지 않습니다.
+    """
+    timer = StreamTimer()
+    session = session_store.get(session_id)
+    tool_calls = []
+
+    async with session.alocked():
+        cacheable, cached_answer = await asyncio.to_thread(prepare_turn, session, query)
+        if cached_answer is not None:
+            timer.mark_token()
+            yield cached_answer
+            return
+
+        prompt = await context_window.abuild(session)
+
+        answer = []
+        async for token in astream_completion(prompt, timer, tool_calls, tools=tools, tool_choice="auto"):
+            answer.append(token)
+            yield token
+
+        if tool_calls:
+            tool_messages = await asyncio.to_thread(run_tool_calls, tool_calls)
+            follow_up_messages = follow_up_prompt(prompt, answer, tool_calls, tool_messages)
+
+            async for token in astream_completion(follow_up_messages, timer):
+                answer.append(token)
+                yield token
 
-        final_content = final_response.choices[0].message.content
-        chat_history.append({"role": "assistant", "content": final_content})
-        return final_content
+        await asyncio.to_thread(finish_turn, session, query, "".join(answer), cacheable and not tool_calls, timer)
+    timer.report(len(tool_calls))
 
-    # 툴 없이 응답했을 경우
-    assistant_response = response.choices[0].message.content
-    chat_history.append({"role": "assistant", "content": assistant_response})
-    return assistant_response
+def run_chatbot_query_with_memory(query: str, session_id: str = DEFAULT_SESSION_ID) -> str:
+    return "".join(stream_chatbot_query_with_memory(query, session_id))
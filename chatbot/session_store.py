@@ -0,0 +1,108 @@
+# 파일: chatbot/session_store.py
+# Description: Gradio 세션별로 대화 히스토리를 분리해 보관하는 세션 저장소
+#              - 세션 수는 SESSION_MAX_COUNT로 제한하고, 넘으면 가장 오래 사용하지 않은 세션부터 제거합니다.
+#              - SESSION_IDLE_TTL 동안 요청이 없던 세션은 다음 접근 때 정리됩니다.
+#              - 세션마다 메시지 수는 SESSION_MAX_MESSAGES로 제한됩니다. (context_window.ContextWindow가 넘는 오래된 턴을 요약으로 접음)
+#              - 같은 세션의 요청(동기/비동기 체인, 초기화)은 모두 세션 lock 하나로 순서대로 처리되고, 서로 다른 세션은 동시에 처리됩니다.
+#                비동기 체인은 alocked()로 같은 lock을 이벤트 루프를 막지 않고 잡습니다.
+# Author: 통합버전
+# Date: 2025.04.29
+# Requirements: 없음 (표준 라이브러리)
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))  # 상위 폴더 경로 추가
+
+import time
+import asyncio
+import threading
+from contextlib import asynccontextmanager
+from collections import OrderedDict
+from config import SESSION_MAX_COUNT, SESSION_IDLE_TTL
+
+class Session:
+    """세션 하나의 대화 상태. messages[0]은 항상 system prompt이고, summary는 접힌 오래된 턴의 요약입니다."""
+
+    def __init__(self, system_prompt: str):
+        self.messages = [{"role": "system", "content": system_prompt}]
+        self.summary = ""
+        self.last_access = time.monotonic()
+        self.lock = threading.Lock()     # 동기/비동기 체인, 초기화가 모두 이 lock 하나를 씀
+
+    @asynccontextmanager
+    async def alocked(self):
+        """
+        비동기 체인용: 동기 체인/초기화와 같은 self.lock을 잡습니다.
+        바로 잡을 수 없으면 스레드에서 기다려 이벤트 루프를 막지 않고,
+        기다리는 중에 요청이 취소되면 lock을 잡는 즉시 풀어 다른 요청이 막히지 않게 합니다.
+        """
+        if not self.lock.acquire(blocking=False):
+            waiter = asyncio.ensure_future(asyncio.to_thread(self.lock.acquire))
+            try:
+                await asyncio.shield(waiter)
+            except asyncio.CancelledError:
+                waiter.add_done_callback(lambda _: self.lock.release())
+                raise
+        try:
+            yield
+        finally:
+            self.lock.release()
+
+    def reset(self):
+        del self.messages[1:]
+        self.summary = ""
+
+class SessionStore:
+    """
+    session_id → Session을 보관하는 스레드 안전한 저장소.
+
+    Args:
+        system_prompt (str): 새 세션의 첫 메시지로 넣을 system prompt
+        max_sessions (int): 보관할 최대 세션 수
+        idle_ttl (float): 마지막 요청 후 세션을 유지할 시간(초)
+    """
+
+    def __init__(self, system_prompt, max_sessions=SESSION_MAX_COUNT, idle_ttl=SESSION_IDLE_TTL):
+        self.system_prompt = system_prompt
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self.sessions = OrderedDict()  # 가장 오래 사용하지 않은 세션이 앞쪽
+        self.lock = threading.Lock()
+        self.evicted = 0
+
+    def _evict(self, now):
+        """(lock 안에서 호출) 만료된 세션과 최대 개수를 넘는 세션을 제거합니다."""
+        while self.sessions:
+            session_id, session = next(iter(self.sessions.items()))
+            if now - session.last_access <= self.idle_ttl and len(self.sessions) <= self.max_sessions:
+                break
+            del self.sessions[session_id]
+            self.evicted += 1
+
+    def get(self, session_id: str) -> Session:
+        """세션을 가져옵니다. 없거나 만료되었으면 새로 만듭니다."""
+        now = time.monotonic()
+        with self.lock:
+            session = self.sessions.get(session_id)
+            if session is None:
+                session = Session(self.system_prompt)
+                self.sessions[session_id] = session
+            session.last_access = now
+            self.sessions.move_to_end(session_id)
+            self._evict(now)
+            return session
+
+    def reset(self, session_id: str):
+        with self.lock:
+            session = self.sessions.pop(session_id, None)
+        if session is not None:
+            with session.lock:
+                session.reset()
+
+    def stats(self):
+        with self.lock:
+            return {
+                "sessions": len(self.sessions),
+                "messages": sum(len(s.messages) for s in self.sessions.values()),
+                "evicted": self.evicted,
+            }
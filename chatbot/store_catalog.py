@@ -0,0 +1,169 @@
+# 파일: chatbot/store_catalog.py
+# Description: stores_menus_to_json.py가 만든 SQLite 가게 카탈로그(store_catalog.db)를 필요한 만큼만 읽는 조회 모듈
+#              - 첫 조회 때 읽기 전용 + mmap으로 DB를 열고, 가게 하나를 찾을 때 그 가게의 행과 메뉴 행만 읽어 StoreRecord로 만듭니다.
+#              - 정확히 일치하는 이름은 name_norm 인덱스로 바로 찾고, 퍼지 매칭이 필요할 때만 (store_id, 이름) 목록으로 색인을 만듭니다.
+#              - 최근 조회한 레코드는 크기 제한 LRU로 보관합니다.
+#              - stores_menus_to_json.py가 DB 파일을 교체하면(inode/수정 시각 변경, 최대 RELOAD_CHECK_INTERVAL초마다 확인)
+#                연결을 다시 열고 레코드 캐시와 이름 색인을 버립니다.
+#              카탈로그가 없으면 예전처럼 store_info.json 전체를 읽는 JsonStoreCatalog를 씁니다.
+# Author: 통합버전
+# Date: 2025.04.29
+# Requirements: sqlite3 (표준 라이브러리)
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))  # 상위 폴더 경로 추가
+
+import json
+import time
+import sqlite3
+import threading
+from functools import lru_cache
+from config import STORE_CATALOG_DB, STORE_INFO_JSON, STORE_CATALOG_CACHE_SIZE
+from chatbot.store_resolver import StoreNameResolver, normalize, MIN_CONFIDENCE
+from chatbot.store_records import StoreRecord, MenuRecord, format_openhours, load_store_records
+
+MMAP_SIZE = 256 * 1024 * 1024  # SQLite가 파일을 mmap으로 읽을 최대 크기
+RELOAD_CHECK_INTERVAL = 1.0    # DB 파일 교체 여부를 확인하는 최소 간격(초)
+
+def file_signature(path):
+    """파일 교체(os.replace) 여부를 판단할 (inode, 수정 시각, 크기). 파일이 없으면 None"""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+class StoreCatalog:
+    """
+    SQLite 카탈로그에서 가게 레코드를 지연 로드합니다.
+    연결은 스레드마다 하나씩 첫 조회 때 엽니다. (Gradio 요청은 여러 스레드에서 들어옴)
+    DB 파일이 교체되면 generation을 올려, 각 스레드가 다음 조회 때 연결을 다시 열고 이전 세대의 캐시 항목은 쓰지 않습니다.
+    """
+
+    def __init__(self, db_path=STORE_CATALOG_DB, cache_size=STORE_CATALOG_CACHE_SIZE):
+        self.db_path = db_path
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.resolver = None
+        self.name_set = None
+        self.generation = 0
+        self.signature = file_signature(db_path)
+        self.next_check = time.monotonic() + RELOAD_CHECK_INTERVAL
+        self.cached_record = lru_cache(maxsize=cache_size)(self._load_record)
+
+    def _check_reload(self):
+        """DB 파일이 교체되었으면 세대를 올리고 레코드 캐시와 이름 색인을 버립니다."""
+        now = time.monotonic()
+        if now < self.next_check:
+            return
+        with self.lock:
+            if now < self.next_check:
+                return
+            self.next_check = now + RELOAD_CHECK_INTERVAL
+            signature = file_signature(self.db_path)
+            if signature is None or signature == self.signature:
+                return
+            self.signature = signature
+            self.generation += 1
+            self.resolver = None
+            self.name_set = None
+            self.cached_record.cache_clear()
+        print(f"[INFO] 가게 카탈로그가 갱신되어 다시 엽니다: {self.db_path}")
+
+    def _connection(self):
+        conn = getattr(self.local, "conn", None)
+        if conn is None or self.local.generation != self.generation:
+            if conn is not None:
+                conn.close()
+            conn = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True)
+            conn.execute(f"PRAGMA mmap_size={MMAP_SIZE}")
+            self.local.conn = conn
+            self.local.generation = self.generation
+        return conn
+
+    def get(self, store_id):
+        """store_id로 레코드를 가져옵니다. (세대별 LRU 캐시)"""
+        self._check_reload()
+        return self.cached_record(store_id, self.generation)
+
+    def _load_record(self, store_id, generation):
+        conn = self._connection()
+        row = conn.execute(
+            "SELECT store_id, store_name, address, phone, openhours, categories, facilities, hashtags, main_image_url "
+            "FROM stores WHERE store_id = ?",
+            (store_id,),
+        ).fetchone()
+        if row is None:
+            return None
+
+        openhours = json.loads(row[4])
+        menus = conn.execute(
+            "SELECT menu_name, price, description, image_url FROM menus WHERE store_id = ? ORDER BY position",
+            (store_id,),
+        ).fetchall()
+        return StoreRecord(
+            store_id=row[0],
+            store_name=row[1],
+            address=row[2],
+            phone=row[3],
+            openhours=openhours,
+            openhours_text=format_openhours(openhours),
+            categories=json.loads(row[5]),
+            facilities=json.loads(row[6]),
+            hashtags=json.loads(row[7]),
+            main_image_url=row[8],
+            menus=[MenuRecord(*menu) for menu in menus],
+        )
+
+    def _get_resolver(self):
+        """퍼지 매칭용 이름 색인. 정확 일치가 실패했을 때 처음 한 번만 (store_id, 이름) 열만 읽어 만듭니다."""
+        with self.lock:
+            if self.resolver is None:
+                rows = self._connection().execute("SELECT store_id, store_name FROM stores ORDER BY store_id").fetchall()
+                self.resolver = StoreNameResolver(rows, get_name=lambda row: row[1])
+            return self.resolver
+
+    def names(self) -> set:
+        """
+        정규화된 가게 이름 집합. 질문에 가게 이름이 들어 있는지 확인할 때 씁니다. (name_norm 열만 읽음)
+        DB가 교체되기 전까지는 같은 집합 객체를 반환합니다.
+        """
+        self._check_reload()
+        with self.lock:
+            if self.name_set is None:
+                self.name_set = {row[0] for row in self._connection().execute("SELECT name_norm FROM stores")}
+            return self.name_set
+
+    def find(self, store_name: str, min_confidence: float = MIN_CONFIDENCE):
+        """가게 이름으로 레코드를 찾습니다. 신뢰도가 min_confidence보다 낮으면 None"""
+        query = normalize(store_name or "")
+        if not query:
+            return None
+
+        self._check_reload()
+        row = self._connection().execute(
+            "SELECT store_id FROM stores WHERE name_norm = ? ORDER BY store_id LIMIT 1", (query,)
+        ).fetchone()
+        if row is None:
+            row = self._get_resolver().find(store_name, min_confidence)
+        return self.get(row[0]) if row else None
+
+class JsonStoreCatalog:
+    """카탈로그 DB가 없을 때 쓰는 대체 구현. store_info.json 전체를 읽어 메모리에 색인합니다."""
+
+    def __init__(self, json_path=STORE_INFO_JSON):
+        self.resolver = StoreNameResolver(load_store_records(json_path), get_name=lambda store: store.store_name)
+        self.name_set = set(self.resolver.names)
+
+    def names(self) -> set:
+        return self.name_set
+
+    def find(self, store_name: str, min_confidence: float = MIN_CONFIDENCE):
+        return self.resolver.find(store_name, min_confidence)
+
+def open_store_catalog(db_path=STORE_CATALOG_DB, json_path=STORE_INFO_JSON):
+    if os.path.exists(db_path):
+        return StoreCatalog(db_path)
+    print(f"[WARN] 가게 카탈로그가 없어 store_info.json을 읽습니다: {db_path}")
+    return JsonStoreCatalog(json_path)
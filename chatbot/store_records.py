@@ -0,0 +1,90 @@
+# 파일: chatbot/store_records.py
+# Description: store_info.json을 한 번만 읽어 필드가 미리 파싱된 __slots__ 데이터클래스 레코드로 변환하는 모듈
+#              - facilities, categories, hashtags는 list, openhours는 dict로 보관하고 영업시간 문장도 미리 만들어 둡니다.
+#              - 예전 형식(문자열로 저장된 리스트/딕셔너리)의 store_info.json도 로드 시 한 번만 변환해 읽습니다.
+# Author: 통합버전
+# Date: 2025.04.29
+# Requirements: json, ast, dataclasses
+
+import json
+from ast import literal_eval
+from dataclasses import dataclass, field
+
+@dataclass(slots=True)
+class MenuRecord:
+    menu_name: str
+    price: str
+    description: str = ""
+    image_url: str = ""
+
+@dataclass(slots=True)
+class StoreRecord:
+    store_id: int
+    store_name: str
+    address: str = ""
+    phone: str = ""
+    openhours: dict = field(default_factory=dict)
+    openhours_text: str = ""
+    categories: list = field(default_factory=list)
+    facilities: list = field(default_factory=list)
+    hashtags: list = field(default_factory=list)
+    main_image_url: str = ""
+    menus: list = field(default_factory=list)
+
+def _as_text(value) -> str:
+    return "" if value is None else str(value).strip()
+
+def _as_literal(value, expected_type):
+    """이미 파싱된 값은 그대로, 예전 형식의 문자열이면 한 번만 literal_eval 합니다."""
+    if isinstance(value, expected_type):
+        return value
+    if isinstance(value, str) and value.strip():
+        try:
+            parsed = literal_eval(value)
+        except (ValueError, SyntaxError):
+            return expected_type()
+        if isinstance(parsed, expected_type):
+            return parsed
+    return expected_type()
+
+def format_openhours(openhours: dict) -> str:
+    """{'월': {'영업시간': '11:00 ~ 21:00', '브레이크타임': ..., '라스트오더': ...}} → 사람이 읽는 문장"""
+    lines = []
+    for day, info in openhours.items():
+        if not isinstance(info, dict):
+            lines.append(f"{day}: {info}")
+            continue
+        line = f"{day}: {info.get('영업시간') or '정보 없음'}"
+        extras = [f"{key} {info[key]}" for key in ("브레이크타임", "라스트오더") if info.get(key)]
+        if extras:
+            line += f" ({', '.join(extras)})"
+        lines.append(line)
+    return "\n".join(lines)
+
+def to_store_record(raw: dict) -> StoreRecord:
+    openhours = _as_literal(raw.get("openhours"), dict)
+    return StoreRecord(
+        store_id=raw.get("store_id"),
+        store_name=_as_text(raw.get("store_name")),
+        address=_as_text(raw.get("address")),
+        phone=_as_text(raw.get("phone")),
+        openhours=openhours,
+        openhours_text=format_openhours(openhours),
+        categories=_as_literal(raw.get("categories"), list),
+        facilities=_as_literal(raw.get("facilities"), list),
+        hashtags=_as_literal(raw.get("hashtags"), list),
+        main_image_url=_as_text(raw.get("main_image_url")),
+        menus=[
+            MenuRecord(
+                menu_name=_as_text(menu.get("menu_name")),
+                price=_as_text(menu.get("price")),
+                description=_as_text(menu.get("description")),
+                image_url=_as_text(menu.get("image_url")),
+            )
+            for menu in raw.get("menus", [])
+        ],
+    )
+
+def load_store_records(json_path: str) -> list[StoreRecord]:
+    with open(json_path, "r", encoding="utf-8") as f:
+        return [to_store_record(raw) for raw in json.load(f)]
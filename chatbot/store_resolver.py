@@ -0,0 +1,119 @@
+# 파일: chatbot/store_resolver.py
+# Description: 가게 이름 질의를 store_info의 가게로 연결하는 색인 기반 퍼지 매칭 모듈
+#              - 로드 시 한 번: 정규화 이름 → 가게 해시맵, 한글 자모 3-gram 역색인을 만들어 두고
+#              - 질의마다 정확히 일치하면 바로 반환, 아니면 n-gram 후보만 골라 편집거리로 순위를 매깁니다.
+#              - 가장 잘 맞는 가게와 신뢰도(0~1)를 함께 반환합니다.
+# Author: 통합버전
+# Date: 2025.04.29
+# Requirements: 없음 (표준 라이브러리)
+
+from collections import Counter, defaultdict
+
+# 한글 자모 분해용 테이블 (유니코드 한글 음절 = 0xAC00 + (초성*21 + 중성)*28 + 종성)
+CHOSEONG = "ㄱㄲㄴㄷㄸㄹㅁㅂㅃㅅㅆㅇㅈㅉㅊㅋㅌㅍㅎ"
+JUNGSEONG = "ㅏㅐㅑㅒㅓㅔㅕㅖㅗㅘㅙㅚㅛㅜㅝㅞㅟㅠㅡㅢㅣ"
+JONGSEONG = " ㄱㄲㄳㄴㄵㄶㄷㄹㄺㄻㄼㄽㄾㄿㅀㅁㅂㅄㅅㅆㅇㅈㅊㅋㅌㅍㅎ"
+
+MIN_CONFIDENCE = 0.5   # 이보다 낮으면 '가게를 찾을 수 없음'으로 처리
+MAX_CANDIDATES = 20    # 편집거리를 계산할 n-gram 후보 수
+
+def normalize(text: str) -> str:
+    return text.replace(" ", "").lower().strip()
+
+def to_jamo(text: str) -> str:
+    """한글 음절을 초성/중성/종성 자모로 풀어 씁니다. (예: '국밥' → 'ㄱㅜㄱㅂㅏㅂ')"""
+    chars = []
+    for ch in text:
+        code = ord(ch) - 0xAC00
+        if 0 <= code < 11172:
+            chars.append(CHOSEONG[code // 588])
+            chars.append(JUNGSEONG[(code % 588) // 28])
+            if code % 28:
+                chars.append(JONGSEONG[code % 28])
+        else:
+            chars.append(ch)
+    return "".join(chars)
+
+def ngrams(text: str, n: int = 3):
+    if len(text) < n:
+        return {text} if text else set()
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+def edit_distance(a: str, b: str) -> int:
+    """레벤슈타인 편집거리"""
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        previous = current
+    return previous[-1]
+
+def similarity(query: str, name: str) -> float:
+    """
+    두 정규화 이름의 유사도(0~1).
+    자모 편집거리 기반 점수와, 한쪽이 다른 쪽을 포함할 때의 점수 중 큰 값을 씁니다.
+    """
+    jq, jn = to_jamo(query), to_jamo(name)
+    score = 1 - edit_distance(jq, jn) / max(len(jq), len(jn), 1)
+    if query in name or name in query:
+        shorter, longer = sorted((len(query), len(name)))
+        score = max(score, 0.6 + 0.4 * shorter / longer)
+    return score
+
+class StoreNameResolver:
+    """
+    가게 목록으로 한 번 색인을 만들어 두고, 가게 이름 질의를 (가게, 신뢰도)로 해석합니다.
+
+    Args:
+        stores (list): store_name 속성(또는 키)을 가진 가게 레코드 목록
+        get_name (callable): 레코드에서 가게 이름을 꺼내는 함수
+    """
+
+    def __init__(self, stores, get_name=lambda store: store["store_name"]):
+        self.stores = list(stores)
+        self.names = [normalize(get_name(store) or "") for store in self.stores]
+        self.exact = {}
+        self.index = defaultdict(list)  # 자모 3-gram → 가게 순번 목록
+        for idx, name in enumerate(self.names):
+            self.exact.setdefault(name, idx)
+            for gram in ngrams(to_jamo(name)):
+                self.index[gram].append(idx)
+
+    def resolve(self, store_name: str):
+        """
+        Returns:
+            (store, confidence): 가장 잘 맞는 가게와 신뢰도. 후보가 없으면 (None, 0.0)
+        """
+        query = normalize(store_name or "")
+        if not query:
+            return None, 0.0
+
+        idx = self.exact.get(query)
+        if idx is not None:
+            return self.stores[idx], 1.0
+
+        # n-gram을 많이 공유하는 가게만 후보로
+        overlap = Counter()
+        for gram in ngrams(to_jamo(query)):
+            for idx in self.index.get(gram, ()):
+                overlap[idx] += 1
+        candidates = [idx for idx, _ in overlap.most_common(MAX_CANDIDATES)]
+        if not candidates:
+            return None, 0.0
+
+        scored = sorted(((similarity(query, self.names[idx]), idx) for idx in candidates), reverse=True)
+        best_score, best_idx = scored[0]
+
+        # '국밥'처럼 여러 가게 이름에 들어 있거나 2등과 점수가 거의 같은 질의는 신뢰도를 낮춤
+        containing = sum(1 for idx in candidates if query in self.names[idx])
+        if containing > 1 or (len(scored) > 1 and scored[1][0] >= best_score - 0.02):
+            best_score *= 0.5
+        return self.stores[best_idx], round(best_score, 3)
+
+    def find(self, store_name: str, min_confidence: float = MIN_CONFIDENCE):
+        """신뢰도가 min_confidence 이상일 때만 가게를 반환합니다."""
+        store, confidence = self.resolve(store_name)
+        return store if confidence >= min_confidence else None
@@ -2,147 +2,145 @@
 # Description: store_info.json 기반으로 가게 이름으로부터 메뉴, 주소, 영업시간, 전화번호, 편의시설, 음식 종류, 해시태그를 반환하는 Function Calling 유틸리티 함수 및 OpenAI Tool 스키마 정의
 # Author: 통합버전
 # Date: 2025.04.29
-# Requirements: json, ast, langchain, store_info.json
+# Requirements: store_catalog.db (없으면 store_info.json)
 
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))  # 상위 폴더 경로 추가
 
-import os
-import json
-from typing import List
-from ast import literal_eval
-from langchain.tools import tool
+import threading
+from config import STORE_CATALOG_DB
+from chatbot.store_catalog import open_store_catalog, JsonStoreCatalog
 
 # ----------------------------
 # 1. 데이터 로드
 # ----------------------------
 
-BASE_DIR = os.path.dirname(os.path.dirname(__file__))
-STORE_JSON_PATH = os.path.join(BASE_DIR, "data", "store_info.json")
-
-with open(STORE_JSON_PATH, "r", encoding="utf-8") as f:
-    store_info_json = json.load(f)
+# 가게 카탈로그는 임포트 시점이 아니라 첫 툴 호출 때 엽니다.
+# SQLite 카탈로그는 찾는 가게의 행만 읽으므로 가게 수가 늘어도 시작 시간과 메모리가 거의 일정합니다.
+_store_catalog = None
+_store_catalog_lock = threading.Lock()
+
+def get_store_catalog():
+    """
+    가게 카탈로그. DB가 교체되면 StoreCatalog가 스스로 다시 열고,
+    DB가 없어 store_info.json으로 열었는데 나중에 DB가 생기면 카탈로그를 새로 엽니다.
+    """
+    global _store_catalog
+    with _store_catalog_lock:
+        if _store_catalog is None or (isinstance(_store_catalog, JsonStoreCatalog) and os.path.exists(STORE_CATALOG_DB)):
+            _store_catalog = open_store_catalog()
+        return _store_catalog
 
 # ----------------------------
 # 2. 공통 유틸 함수
 # ----------------------------
 
-def normalize(text: str) -> str:
-    return text.replace(" ", "").lower().strip()
-
 def find_store(store_name: str):
-    query = normalize(store_name)
-    for store in store_info_json:
-        name = normalize(store["store_name"])
-        if query in name or name in query:
-            return store
-    return None
+    """가게 이름을 카탈로그에서 찾습니다. 신뢰도가 낮으면(여러 가게에 걸치는 일반 명사 등) None"""
+    return get_store_catalog().find(store_name)
 
 # ----------------------------
 # 3. Function Calling 함수들
 # ----------------------------
 
-def get_menu_by_store_name(store_name: str) -> str:
-    store = find_store(store_name)
-    if not store:
-        return "해당 가게를 찾을 수 없습니다."
+# 각 항목을 이미 찾은 가게 레코드로부터 문장으로 만드는 함수들 (단일 항목 툴과 get_store_profile이 함께 사용)
 
-    menus = store.get("menus", [])
-    if not menus:
+def format_menu(store) -> str:
+    if not store.menus:
         return "해당 가게의 메뉴 정보가 없습니다."
 
     return "\n".join([
-        f"{m.get('menu_name', '메뉴명 없음')} ({m.get('price', '가격 정보 없음')})"
-        for m in menus
+        f"{m.menu_name or '메뉴명 없음'} ({m.price or '가격 정보 없음'})"
+        for m in store.menus
     ])
 
-def get_address_by_store_name(store_name: str) -> str:
-    store = find_store(store_name)
-    if not store:
-        return "해당 가게를 찾을 수 없습니다."
-
-    address = store.get("address", "").strip()
+def format_address(store) -> str:
     return (
-        f"{store['store_name']}의 주소는 다음과 같습니다: {address}"
-        if address else f"{store['store_name']}의 주소 정보는 등록되어 있지 않습니다."
+        f"{store.store_name}의 주소는 다음과 같습니다: {store.address}"
+        if store.address else f"{store.store_name}의 주소 정보는 등록되어 있지 않습니다."
     )
 
-def get_openhours_by_store_name(store_name: str) -> str:
-    store = find_store(store_name)
-    if not store:
-        return "해당 가게를 찾을 수 없습니다."
-
-    openhours = store.get("openhours", "").strip()
+def format_openhours(store) -> str:
     return (
-        f"{store['store_name']}의 영업시간은 {openhours}입니다."
-        if openhours else f"{store['store_name']}의 영업시간 정보는 등록되어 있지 않습니다."
+        f"{store.store_name}의 영업시간은 다음과 같습니다:\n{store.openhours_text}"
+        if store.openhours_text else f"{store.store_name}의 영업시간 정보는 등록되어 있지 않습니다."
     )
 
-def get_phone_by_store_name(store_name: str) -> str:
-    store = find_store(store_name)
-    if not store:
-        return "해당 가게를 찾을 수 없습니다."
-
-    phone = store.get("phone", "").strip()
+def format_phone(store) -> str:
     return (
-        f"{store['store_name']}의 전화번호는 {phone}입니다."
-        if phone else f"{store['store_name']}의 전화번호 정보는 등록되어 있지 않습니다."
+        f"{store.store_name}의 전화번호는 {store.phone}입니다."
+        if store.phone else f"{store.store_name}의 전화번호 정보는 등록되어 있지 않습니다."
     )
 
-def get_facilities_by_store_name(store_name: str) -> str:
+def format_facilities(store) -> str:
+    if not store.facilities:
+        return f"{store.store_name}의 시설 정보는 등록되어 있지 않습니다."
+    return f"{store.store_name}에서는 다음 시설들을 이용할 수 있어요: {', '.join(store.facilities)}"
+
+def format_categories(store) -> str:
+    if not store.categories:
+        return f"{store.store_name}의 음식 종류 정보는 등록되어 있지 않습니다."
+    return f"{store.store_name}은(는) {', '.join(store.categories)}을(를) 전문으로 하는 음식점이에요."
+
+def format_hashtags(store) -> str:
+    if not store.hashtags:
+        return f"{store.store_name}에 대한 분위기나 특징 정보는 등록되어 있지 않습니다."
+    return f"{store.store_name}은(는) {', '.join(store.hashtags)} 등의 해시태그로 소개되는 곳이에요."
+
+# get_store_profile의 fields 값 → (제목, 포맷 함수)
+PROFILE_FIELDS = {
+    "menu": ("메뉴", format_menu),
+    "address": ("주소", format_address),
+    "openhours": ("영업시간", format_openhours),
+    "phone": ("전화번호", format_phone),
+    "facilities": ("편의시설", format_facilities),
+    "categories": ("음식 종류", format_categories),
+    "hashtags": ("분위기/특징", format_hashtags),
+}
+
+def lookup_store_field(store_name: str, formatter) -> str:
     store = find_store(store_name)
     if not store:
         return "해당 가게를 찾을 수 없습니다."
+    return formatter(store)
 
-    raw = store.get("facilities", "")
-    if not raw or raw in ("[]", "", None):
-        return f"{store['store_name']}의 시설 정보는 등록되어 있지 않습니다."
-
-    try:
-        facilities = literal_eval(raw)
-        if isinstance(facilities, list) and facilities:
-            return f"{store['store_name']}에서는 다음 시설들을 이용할 수 있어요: {', '.join(facilities)}"
-    except:
-        return f"{store['store_name']}의 시설 정보 형식이 올바르지 않아 제공이 어렵습니다."
+def get_menu_by_store_name(store_name: str) -> str:
+    return lookup_store_field(store_name, format_menu)
 
-    return f"{store['store_name']}의 시설 정보는 등록되어 있지 않습니다."
+def get_address_by_store_name(store_name: str) -> str:
+    return lookup_store_field(store_name, format_address)
 
-def get_categories_by_store_name(store_name: str) -> str:
-    store = find_store(store_name)
-    if not store:
-        return "해당 가게를 찾을 수 없습니다."
+def get_openhours_by_store_name(store_name: str) -> str:
+    return lookup_store_field(store_name, format_openhours)
 
-    raw = store.get("categories", "")
-    if not raw or raw in ("[]", "", None):
-        return f"{store['store_name']}의 음식 종류 정보는 등록되어 있지 않습니다."
+def get_phone_by_store_name(store_name: str) -> str:
+    return lookup_store_field(store_name, format_phone)
 
-    try:
-        categories = literal_eval(raw)
-        if isinstance(categories, list) and categories:
-            return f"{store['store_name']}은(는) {', '.join(categories)}을(를) 전문으로 하는 음식점이에요."
-    except:
-        return f"{store['store_name']}의 음식 종류 정보 형식이 올바르지 않아 제공이 어렵습니다."
+def get_facilities_by_store_name(store_name: str) -> str:
+    return lookup_store_field(store_name, format_facilities)
 
-    return f"{store['store_name']}의 음식 종류 정보는 등록되어 있지 않습니다."
+def get_categories_by_store_name(store_name: str) -> str:
+    return lookup_store_field(store_name, format_categories)
 
 def get_hashtags_by_store_name(store_name: str) -> str:
+    return lookup_store_field(store_name, format_hashtags)
+
+def get_store_profile(store_name: str, fields: list = None) -> str:
+    """
+    가게 하나의 여러 항목을 한 번에 조회합니다. (가게 검색은 한 번만 수행)
+    fields가 비어 있으면 모든 항목을 반환합니다.
+    """
     store = find_store(store_name)
     if not store:
         return "해당 가게를 찾을 수 없습니다."
 
-    raw = store.get("hashtags", "")
-    if not raw or raw in ("[]", "", None):
-        return f"{store['store_name']}에 대한 분위기나 특징 정보는 등록되어 있지 않습니다."
-
-    try:
-        hashtags = literal_eval(raw)
-        if isinstance(hashtags, list) and hashtags:
-            return f"{store['store_name']}은(는) {', '.join(hashtags)} 등의 해시태그로 소개되는 곳이에요."
-    except:
-        return f"{store['store_name']}의 해시태그 정보 형식이 올바르지 않아 제공이 어렵습니다."
-
-    return f"{store['store_name']}의 해시태그 정보는 등록되어 있지 않습니다."
+    fields = [f for f in (fields or PROFILE_FIELDS) if f in PROFILE_FIELDS] or list(PROFILE_FIELDS)
+    sections = []
+    for f in dict.fromkeys(fields):
+        title, formatter = PROFILE_FIELDS[f]
+        sections.append(f"[{title}]\n{formatter(store)}")
+    return f"{store.store_name} 정보\n\n" + "\n\n".join(sections)
 
 
 
@@ -312,6 +310,37 @@ hashtags_lookup_tool = {
     }
 }
 
+# 여러 항목 한 번에 조회 툴
+profile_lookup_tool = {
+    "type": "function",
+    "function": {
+        "name": "get_store_profile",
+        "description": """
+        한 가게에 대해 여러 정보(메뉴, 주소, 영업시간, 전화번호, 편의시설, 음식 종류, 분위기)를 한 번에 조회하는 함수입니다.
+        한 질문에서 같은 가게의 정보를 두 가지 이상 물을 때는 개별 툴 대신 이 툴을 한 번 호출하세요.
+        예시:
+        - "정원레스토랑 메뉴랑 영업시간 알려줘"
+        - "서울부띠끄 주소하고 전화번호 뭐야?"
+        """,
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "store_name": {
+                    "type": "string",
+                    "description": "조회할 가게 이름"
+                },
+                "fields": {
+                    "type": "array",
+                    "items": {"type": "string", "enum": list(PROFILE_FIELDS)},
+                    "description": "조회할 항목 목록. 비우면 모든 항목을 반환합니다."
+                }
+            },
+            "required": ["store_name", "fields"],
+            "additionalProperties": False
+        }
+    }
+}
+
 # 4. 모든 tool schema를 리스트로 export
 
 tools = [
@@ -321,5 +350,6 @@ tools = [
     phone_lookup_tool,
     facilities_lookup_tool,
     categories_lookup_tool,
-    hashtags_lookup_tool
+    hashtags_lookup_tool,
+    profile_lookup_tool
 ]
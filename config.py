@@ -16,5 +16,94 @@ REVIEWS_CSV = os.path.join(DATA_DIR, "reviews.csv")
 REVIEW_FINAL_CSV = os.path.join(DATA_DIR, "reviews_final.csv")
 STORE_INFO_JSON = os.path.join(DATA_DIR, "store_info.json")
 
+# 챗봇이 필요한 가게만 읽어 가는 SQLite 가게 카탈로그 및 조회 레코드 LRU 크기
+STORE_CATALOG_DB = os.path.join(DATA_DIR, "store_catalog.db")
+STORE_CATALOG_CACHE_SIZE = 256
+
 # 벡터 DB 경로
 CHROMA_DB_DIR = os.path.join(BASE_DIR, "vectordb", "chroma_reviews")
+
+# 크롤링 체크포인트 DB 경로 및 재수집 주기(시간)
+CRAWL_CHECKPOINT_DB = os.path.join(DATA_DIR, "crawl_checkpoint.db")
+CRAWL_TTL_HOURS = 24
+
+# 가게 이름 → place_id 검색 결과 캐시 유효기간(일)
+PLACE_ID_CACHE_TTL_DAYS = 30
+
+# 임베딩 모델 및 인덱싱 설정
+EMBEDDING_MODEL_NAME = "BAAI/bge-m3"
+EMBED_WORKERS = max(1, (os.cpu_count() or 1) // 4)   # 임베딩 워커 프로세스 수
+EMBED_BATCH_SIZE = 32                                 # 워커당 배치 크기
+EMBED_MAX_SEQ_LENGTH = 512                            # 토큰 최대 길이 (리뷰는 1000자 이하)
+EMBED_BACKEND = "torch"                               # "torch" 또는 "onnx-int8"
+EMBED_ONNX_DIR = os.path.join(BASE_DIR, "vectordb", "onnx_bge_m3")
+
+# 임베딩 캐시 (모델 이름 + 텍스트 해시 → 벡터)
+EMBED_CACHE_DIR = os.path.join(BASE_DIR, "vectordb", "embedding_cache")
+EMBED_CACHE_MAX_DOCUMENTS = 100_000
+EMBED_CACHE_MAX_QUERIES = 20_000
+
+# 로컬 임베딩 서버 (여러 챗봇 워커가 모델 하나를 공유)
+USE_EMBED_SERVER = os.getenv("USE_EMBED_SERVER") == "1"
+EMBED_SERVER_SOCKET = os.path.join(BASE_DIR, "vectordb", "embed.sock")
+EMBED_SERVER_MAX_BATCH = 64
+EMBED_SERVER_MAX_WAIT_MS = 5
+
+# 벡터 인덱스 버전 파일 (embed_reviews.py가 인덱스를 갱신할 때마다 새로 기록)
+CHROMA_INDEX_VERSION_FILE = os.path.join(BASE_DIR, "vectordb", "index_version.txt")
+
+# Retriever 캐시 (질의 임베딩 / 검색 결과)
+RETRIEVER_CACHE_SIZE = 1024
+RETRIEVER_CACHE_TTL = 3600  # 초
+
+# 챗봇 세션별 대화 상태
+SESSION_MAX_COUNT = 1000      # 동시에 보관할 최대 세션 수 (넘으면 가장 오래 쓰지 않은 세션부터 제거)
+SESSION_IDLE_TTL = 1800       # 이 시간(초) 동안 요청이 없던 세션은 제거
+SESSION_MAX_MESSAGES = 30     # 세션당 보관할 최대 메시지 수 (system prompt 제외, 넘는 오래된 턴은 요약으로 접음)
+
+# 챗봇 프롬프트 토큰 예산
+CONTEXT_TOKEN_BUDGET = 6000              # 이 토큰 수를 넘으면 오래된 턴을 요약으로 접음
+CONTEXT_KEEP_TURNS = 3                   # 그대로 보내는 최근 턴 수 (리뷰 문맥은 현재 턴 것만 보냄)
+CONTEXT_SUMMARY_MODEL = "gpt-4o-mini"    # 오래된 턴 요약에 쓰는 모델
+
+# 첫 질문 답변 캐시 (질문 임베딩 유사도 기반)
+ANSWER_CACHE_PATH = os.path.join(DATA_DIR, "answer_cache.json")
+ANSWER_CACHE_SIZE = 512
+ANSWER_CACHE_TTL = 24 * 3600     # 초
+ANSWER_CACHE_THRESHOLD = 0.93    # 코사인 유사도가 이 이상이면 같은 질문으로 봄
+ANSWER_CACHE_FLUSH_DELAY = 30.0  # 변경 후 이 시간(초)이 지나면 백그라운드에서 한 번에 저장
+
+# OpenAI 호출 설정
+LLM_MODEL = "gpt-4o"
+LLM_TIMEOUT = 60.0              # 호출당 타임아웃(초)
+LLM_MAX_RETRIES = 3             # 429/5xx/타임아웃 재시도 횟수
+LLM_RETRY_BASE_DELAY = 0.5      # 재시도 대기 기본값(초), 시도마다 2배 + 지터
+LLM_MAX_CONCURRENCY = 16        # 프로세스당 동시에 진행할 최대 LLM 호출 수
+
+# Gradio 큐
+GRADIO_CONCURRENCY_LIMIT = 64   # 동시에 처리할 요청 수 (async 핸들러라 워커 스레드를 점유하지 않음)
+GRADIO_QUEUE_MAX_SIZE = 256     # 대기열이 이보다 길면 새 요청을 거절
+
+# 리뷰 어휘 색인 (문자 n-gram BM25, embed_reviews.py가 Chroma 인덱스와 함께 생성)
+LEXICAL_INDEX_DIR = os.path.join(BASE_DIR, "vectordb", "lexical_index")
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# 하이브리드 검색 (어휘 + 임베딩, Reciprocal Rank Fusion)
+HYBRID_CANDIDATES = 20          # 각 검색에서 가져올 후보 수
+HYBRID_RRF_K = 60               # RRF 상수: 점수 = Σ 1 / (HYBRID_RRF_K + 순위)
+HYBRID_DENSE_MAX_INFLIGHT = 8   # 진행 중인 임베딩 검색이 이 수 이상이면 어휘 검색만 사용
+STORE_EXACT_SEARCH_MAX = 2000   # 가게로 좁힌 후보가 이 수 이하면 Chroma 대신 후보 벡터와 직접 내적
+
+# 리뷰 검색 범위 지정: 이번 질문에 가게 이름이 없으면 최근 몇 개의 사용자 질문까지 거슬러 찾을지
+REVIEW_FILTER_LOOKBACK_TURNS = 2
+
+# 임베딩 검색 백엔드: "chroma" (기본), "numpy" (memory-mapped .npy 전수 검색), "hnsw" (hnswlib),
+#                    "int8" / "binary" (양자화 벡터로 1차 검색 후 float32 벡터로 재채점)
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "chroma")
+VECTOR_INDEX_DIR = os.path.join(BASE_DIR, "vectordb", "vector_index")
+HNSW_M = 16
+HNSW_EF_CONSTRUCTION = 200
+HNSW_EF_SEARCH = 64
+QUANT_RESCORE_FACTOR = 10       # 양자화 1차 검색에서 k × 이 값만큼 후보를 뽑아 float32로 재채점
+QUANT_MIN_RECALL = 0.95         # 색인 생성 시 측정한 recall@5가 이보다 낮으면 경고
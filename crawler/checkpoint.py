@@ -0,0 +1,194 @@
+# checkpoint.py
+# Description: 크롤링 도중 중단되어도 이어서 진행할 수 있도록 가게 상세 정보와 리뷰 페이지를
+#              수집 즉시 SQLite(DATA_DIR/crawl_checkpoint.db)에 기록하는 체크포인트 저장소입니다.
+#              - 가게는 place_id 기준으로 중복 제거되며, TTL보다 최근에 수집된 가게는 재실행 시 건너뜁니다.
+#              - 리뷰는 가게별 마지막 커서와 가장 최근 commentid를 기록해 이어받기/증분 갱신에 사용합니다.
+#              - PlaceIdCache는 같은 DB 파일에 가게 이름 → place_id 검색 결과를 유효기간과 함께 저장합니다.
+# Author: 통합버전
+# Date: 2025.04.29
+# Requirements: sqlite3, json
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # 상위 폴더 경로 추가
+
+import json
+import sqlite3
+import threading
+import time
+from config import CRAWL_CHECKPOINT_DB, CRAWL_TTL_HOURS, PLACE_ID_CACHE_TTL_DAYS
+
+def place_id_from_url(url):
+    """'https://place.map.kakao.com/12345' 형태의 상세 페이지 URL에서 place_id를 추출합니다."""
+    if not url:
+        return None
+    last = url.split('?')[0].rstrip('/').rsplit('/', 1)[-1]
+    return last if last.isdigit() else None
+
+class CrawlCheckpoint:
+    """
+    가게/리뷰 크롤링 진행 상황을 기록하는 SQLite 저장소.
+    워커 스레드에서 함께 쓸 수 있도록 연결 하나를 lock으로 보호합니다.
+    """
+
+    def __init__(self, db_path=CRAWL_CHECKPOINT_DB, ttl_hours=CRAWL_TTL_HOURS):
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self.ttl_seconds = ttl_hours * 3600
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS stores (
+                place_id TEXT PRIMARY KEY,
+                detail_url TEXT,
+                store_json TEXT NOT NULL,
+                menus_json TEXT NOT NULL,
+                scraped_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS reviews (
+                place_id TEXT NOT NULL,
+                commentid INTEGER NOT NULL,
+                store_name TEXT NOT NULL,
+                content TEXT NOT NULL,
+                point REAL,
+                PRIMARY KEY (place_id, commentid)
+            );
+            CREATE TABLE IF NOT EXISTS review_state (
+                place_id TEXT PRIMARY KEY,
+                store_name TEXT NOT NULL,
+                cursor INTEGER,
+                done INTEGER NOT NULL DEFAULT 0,
+                updated_at REAL NOT NULL
+            );
+        """)
+        self.conn.commit()
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+    def is_fresh(self, scraped_at):
+        return scraped_at is not None and time.time() - scraped_at < self.ttl_seconds
+
+    # ----------------------------
+    # 가게 상세 정보
+    # ----------------------------
+
+    def get_fresh_store(self, place_id):
+        """TTL 안에 수집된 가게라면 (store_data, menus)를, 아니면 None을 반환합니다."""
+        if not place_id:
+            return None
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT store_json, menus_json, scraped_at FROM stores WHERE place_id = ?", (place_id,)
+            ).fetchone()
+        if not row or not self.is_fresh(row[2]):
+            return None
+        store_data = json.loads(row[0])
+        store_data.setdefault('place_id', place_id)
+        return store_data, json.loads(row[1])
+
+    def save_store(self, place_id, detail_url, store_data, menus):
+        if not place_id:
+            return
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO stores VALUES (?, ?, ?, ?, ?)",
+                (place_id, detail_url, json.dumps(store_data, ensure_ascii=False),
+                 json.dumps(menus, ensure_ascii=False), time.time())
+            )
+            self.conn.commit()
+
+    # ----------------------------
+    # 리뷰
+    # ----------------------------
+
+    def get_review_state(self, place_id):
+        """(cursor, done, updated_at) 또는 None"""
+        with self.lock:
+            return self.conn.execute(
+                "SELECT cursor, done, updated_at FROM review_state WHERE place_id = ?", (place_id,)
+            ).fetchone()
+
+    def get_latest_commentid(self, place_id):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT MAX(commentid) FROM reviews WHERE place_id = ?", (place_id,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def count_reviews(self, place_id):
+        with self.lock:
+            return self.conn.execute(
+                "SELECT COUNT(*) FROM reviews WHERE place_id = ?", (place_id,)
+            ).fetchone()[0]
+
+    def save_review_page(self, place_id, store_name, comments, cursor, done):
+        """
+        리뷰 1페이지를 기록합니다. comments는 (commentid, content, point) 목록이며,
+        cursor는 다음에 요청할 commentid, done은 이 가게의 수집이 끝났는지 여부입니다.
+        """
+        with self.lock:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO reviews VALUES (?, ?, ?, ?, ?)",
+                [(place_id, commentid, store_name, content, point) for commentid, content, point in comments]
+            )
+            self.conn.execute(
+                "INSERT OR REPLACE INTO review_state VALUES (?, ?, ?, ?, ?)",
+                (place_id, store_name, cursor, int(done), time.time())
+            )
+            self.conn.commit()
+
+    def load_reviews(self, store_names):
+        """store_names에 해당하는 저장된 리뷰를 reviews.csv 행 형태로 반환합니다."""
+        if not store_names:
+            return []
+        placeholders = ','.join('?' * len(store_names))
+        with self.lock:
+            rows = self.conn.execute(
+                f"SELECT store_name, content, point FROM reviews WHERE store_name IN ({placeholders}) "
+                "ORDER BY store_name, commentid DESC",
+                list(store_names)
+            ).fetchall()
+        return [{'가게이름': name, '리뷰내용': content, '리뷰별점': point} for name, content, point in rows]
+
+class PlaceIdCache:
+    """
+    키워드 검색 API로 찾은 가게 이름 → place_id 매핑을 디스크에 캐시합니다.
+    stores.csv에 place_id가 없는 가게만 검색하므로, 캐시가 남아 있으면 검색 요청이 생략됩니다.
+    """
+
+    def __init__(self, db_path=CRAWL_CHECKPOINT_DB, ttl_days=PLACE_ID_CACHE_TTL_DAYS):
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self.ttl_seconds = ttl_days * 86400
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS place_id_cache (
+                store_name TEXT PRIMARY KEY,
+                place_id TEXT NOT NULL,
+                cached_at REAL NOT NULL
+            )
+        """)
+        self.conn.commit()
+
+    def get(self, store_name):
+        """만료되지 않은 place_id 또는 None"""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT place_id, cached_at FROM place_id_cache WHERE store_name = ?", (store_name,)
+            ).fetchone()
+        if not row or time.time() - row[1] >= self.ttl_seconds:
+            return None
+        return row[0]
+
+    def put(self, store_name, place_id):
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO place_id_cache VALUES (?, ?, ?)",
+                (store_name, str(place_id), time.time())
+            )
+            self.conn.commit()
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
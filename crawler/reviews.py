@@ -1,48 +1,144 @@
 # reviews.py
-# Description: 'stores.csv'에서 가게 이름 목록을 불러와, 각 가게 이름으로 카카오맵 API를 호출해 place_id를 찾고,
-#              해당 가게의 리뷰를 최대 50개까지 수집하여 'reviews.csv'로 저장하는 스크립트입니다.
+# Description: 'stores.csv'에서 가게 이름과 place_id 목록을 불러와, 해당 가게의 리뷰를 최대 50개까지 수집하여
+#              'reviews.csv'로 저장하는 스크립트입니다. stores.csv에 place_id가 없는 가게만 카카오맵 키워드
+#              검색 API로 place_id를 찾으며, 검색 결과는 디스크 캐시에 저장해 재사용합니다.
+#              --async 옵션을 주면 여러 가게의 리뷰를 asyncio + 커넥션 풀로 동시에 수집합니다.
+#              수집한 리뷰 페이지는 체크포인트 DB에 바로 기록되어, 중단 후 재실행하면 이어서 수집하고
+#              TTL이 지난 가게는 마지막 commentid 이후의 새 리뷰만 가져옵니다. (--no-checkpoint로 끔)
 # Author: 통합버전
 # Date: 2025.04.29
-# Requirements: requests, pandas
+# Requirements: requests, pandas, aiohttp
 
 
 import requests
 import pandas as pd
+import asyncio
 import time
 import sys
 import os
+from urllib.parse import urlparse
+from checkpoint import CrawlCheckpoint, PlaceIdCache
+
+COMMENT_URL = "https://place.map.kakao.com/m/commentlist/v/{}/{}?order=USEFUL&onlyPhotoComment=false"
+COMMENT_LATEST_URL = "https://place.map.kakao.com/m/commentlist/v/{}/{}?order=LATEST&onlyPhotoComment=false"
+KEYWORD_SEARCH_URL = "https://dapi.kakao.com/v2/local/search/keyword.json"
+KEYWORD_SEARCH_SIZE = 5  # 이름이 정확히 일치하는 가게를 고르기 위해 여러 건을 받아 비교
+MAX_REVIEWS = 50
+
+# 비동기 모드 기본값 (전체 동시 요청 수 / 호스트별 동시 연결 수 / 호스트별 초당 요청 수)
+ASYNC_CONCURRENCY = 16
+ASYNC_PER_HOST_LIMIT = 8
+ASYNC_PER_HOST_RPS = 10.0
+
+def pick_place_id(documents, store_name):
+    """검색 결과 중 이름이 정확히 일치하는 곳 → 음식점(FD6) → 첫 번째 결과 순으로 place_id를 고릅니다."""
+    target = store_name.replace(" ", "")
+    for doc in documents:
+        if doc.get("place_name", "").replace(" ", "") == target:
+            return doc["id"]
+    for doc in documents:
+        if doc.get("category_group_code") == "FD6":
+            return doc["id"]
+    return documents[0]["id"] if documents else None
 
 def search_place_id(store_name, rest_api_key):
     """가게 이름으로 place_id를 검색 (가장 일치율 높은 결과 1건)"""
     headers = {"Authorization": f"KakaoAK {rest_api_key}"}
-    url = "https://dapi.kakao.com/v2/local/search/keyword.json"
-    params = {"query": store_name, "size": 1}
+    params = {"query": store_name, "size": KEYWORD_SEARCH_SIZE}
 
-    response = requests.get(url, headers=headers, params=params, timeout=10)
+    response = requests.get(KEYWORD_SEARCH_URL, headers=headers, params=params, timeout=10)
     if response.status_code == 200:
-        documents = response.json().get("documents", [])
-        if documents:
-            return documents[0]["id"]
+        return pick_place_id(response.json().get("documents", []), store_name)
     return None
 
-def scrape_reviews_by_storelist(store_names, rest_api_key):
-    COMMENT_URL = "https://place.map.kakao.com/m/commentlist/v/{}/{}?order=USEFUL&onlyPhotoComment=false"
+def resolve_place_id(store_name, rest_api_key, place_ids=None, place_id_cache=None):
+    """stores.csv의 place_id → 디스크 캐시 → 키워드 검색 API 순으로 place_id를 찾습니다."""
+    place_id = (place_ids or {}).get(store_name)
+    if not place_id and place_id_cache:
+        place_id = place_id_cache.get(store_name)
+    if place_id:
+        return place_id
+
+    place_id = search_place_id(store_name, rest_api_key)
+    if place_id and place_id_cache:
+        place_id_cache.put(store_name, place_id)
+    return place_id
+
+def parse_comment_page(data, review_count, max_reviews=MAX_REVIEWS, since_commentid=None):
+    """
+    commentlist 응답 1페이지에서 리뷰를 추출합니다.
+    동기/비동기 크롤러가 같은 스키마를 쓰도록 공통으로 사용합니다.
+
+    Args:
+        review_count (int): 이 가게에서 지금까지 수집한 리뷰 수
+        since_commentid (int, optional): 증분 갱신 시 이 commentid 이하(이미 저장된 리뷰)를 만나면 중단
+    Returns:
+        (comments, next_comment_id): comments는 (commentid, 리뷰내용, 리뷰별점) 목록.
+            다음 페이지가 없거나 max_reviews에 도달하면 next_comment_id는 None
+    """
+    comment_datas = data['comment']
+    comment_list = comment_datas.get('list', [])
+
+    comments = []
+    for comment in comment_list:
+        if since_commentid is not None and comment['commentid'] <= since_commentid:
+            return comments, None
+
+        content = comment.get('contents', '').strip()
+        point = comment.get('point', None)
+
+        if content:
+            comments.append((comment['commentid'], content, point))
+            if review_count + len(comments) >= max_reviews:
+                return comments, None
+
+    if comment_datas.get('hasNext', False) and comment_list:
+        return comments, comment_list[-1]['commentid']
+    return comments, None
+
+def to_review_rows(store_name, comments):
+    """(commentid, 리뷰내용, 리뷰별점) 목록을 reviews.csv 행으로 변환"""
+    return [{'가게이름': store_name, '리뷰내용': content, '리뷰별점': point} for _, content, point in comments]
+
+def plan_review_crawl(checkpoint, place_id):
+    """
+    체크포인트를 보고 이 가게의 리뷰를 어떻게 수집할지 정합니다.
+
+    Returns:
+        (url_template, cursor, review_count, since_commentid) 또는 건너뛸 경우 None
+            - 처음 수집: 유용한순 목록을 처음부터
+            - 중단된 수집: 저장된 커서부터 이어서
+            - TTL이 지난 완료 가게: 최신순 목록에서 마지막 commentid보다 새 리뷰만
+    """
+    state = checkpoint.get_review_state(place_id) if checkpoint else None
+    if state is None:
+        return COMMENT_URL, 0, 0, None
+
+    cursor, done, updated_at = state
+    if not done:
+        return COMMENT_URL, cursor or 0, checkpoint.count_reviews(place_id), None
+    if checkpoint.is_fresh(updated_at):
+        return None
+    return COMMENT_LATEST_URL, 0, 0, checkpoint.get_latest_commentid(place_id)
+
+def scrape_reviews_by_storelist(store_names, rest_api_key, checkpoint=None, place_ids=None, place_id_cache=None):
     all_comment = []
 
     for idx, store_name in enumerate(store_names, 1):
-        place_id = search_place_id(store_name, rest_api_key)
+        place_id = resolve_place_id(store_name, rest_api_key, place_ids, place_id_cache)
         if not place_id:
             print(f"❌ {store_name}의 place_id를 찾을 수 없습니다.")
             continue
 
-        comment_id = 0
-        has_next = True
-        max_reviews = 50
-        review_count = 0
+        plan = plan_review_crawl(checkpoint, place_id)
+        if plan is None:
+            print(f"⏭️ {store_name} 최근에 수집됨, 스킵 ({idx}/{len(store_names)})")
+            continue
+        url_template, comment_id, review_count, since_commentid = plan
 
-        while has_next:
+        while comment_id is not None:
             try:
-                scrap_url = COMMENT_URL.format(place_id, comment_id)
+                scrap_url = url_template.format(place_id, comment_id)
                 response = requests.get(scrap_url, timeout=10)
                 data = response.json()
             except Exception as e:
@@ -53,33 +149,151 @@ def scrape_reviews_by_storelist(store_names, rest_api_key):
                 print(f"⚠️ {store_name} 리뷰 없음, 스킵")
                 break
 
-            comment_datas = data['comment']
-            comment_list = comment_datas.get('list', [])
-
-            for comment in comment_list:
-                content = comment.get('contents', '').strip()
-                point = comment.get('point', None)
-
-                if content:
-                    all_comment.append({
-                        '가게이름': store_name,
-                        '리뷰내용': content,
-                        '리뷰별점': point
-                    })
-                    review_count += 1
-                    if review_count >= max_reviews:
-                        has_next = False
-                        break
-
-            has_next = comment_datas.get('hasNext', False)
-            if has_next and comment_list:
-                comment_id = comment_list[-1]['commentid']
-            else:
-                has_next = False
+            comments, comment_id = parse_comment_page(data, review_count, since_commentid=since_commentid)
+            all_comment.extend(to_review_rows(store_name, comments))
+            review_count += len(comments)
+            if checkpoint:
+                checkpoint.save_review_page(place_id, store_name, comments, comment_id, comment_id is None)
 
         time.sleep(1)
         print(f"{store_name} ({idx}/{len(store_names)}) 완료! 1초 쉬어요 💤")
 
+    if checkpoint:
+        # 이전 실행에서 저장된 리뷰까지 포함해 반환
+        return pd.DataFrame(checkpoint.load_reviews(store_names))
+    return pd.DataFrame(all_comment)
+
+# ----------------------------
+# 비동기 크롤링 (asyncio + aiohttp)
+# ----------------------------
+
+class HostRateLimiter:
+    """호스트별 초당 요청 수를 제한하는 간단한 토큰 간격 리미터"""
+
+    def __init__(self, rps):
+        self.interval = 1.0 / rps if rps and rps > 0 else 0.0
+        self.next_slot = {}
+        self.lock = asyncio.Lock()
+
+    async def wait(self, host):
+        if not self.interval:
+            return
+        async with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot.get(host, now))
+            self.next_slot[host] = slot + self.interval
+        delay = slot - now
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+async def _fetch_json(session, url, semaphore, limiter, **kwargs):
+    await limiter.wait(urlparse(url).netloc)
+    async with semaphore:
+        async with session.get(url, **kwargs) as response:
+            if response.status != 200:
+                return None
+            return await response.json(content_type=None)
+
+async def _resolve_place_id_async(session, store_name, rest_api_key, semaphore, limiter,
+                                  place_ids=None, place_id_cache=None):
+    """resolve_place_id의 비동기 버전"""
+    place_id = (place_ids or {}).get(store_name)
+    if not place_id and place_id_cache:
+        place_id = place_id_cache.get(store_name)
+    if place_id:
+        return place_id
+
+    headers = {"Authorization": f"KakaoAK {rest_api_key}"}
+    params = {"query": store_name, "size": KEYWORD_SEARCH_SIZE}
+    data = await _fetch_json(session, KEYWORD_SEARCH_URL, semaphore, limiter, headers=headers, params=params)
+    place_id = pick_place_id((data or {}).get("documents", []), store_name)
+    if place_id and place_id_cache:
+        place_id_cache.put(store_name, place_id)
+    return place_id
+
+async def _scrape_store_async(session, store_name, rest_api_key, semaphore, limiter, checkpoint=None,
+                              place_ids=None, place_id_cache=None):
+    """가게 1곳의 리뷰 수집. 커서(commentid) 페이지는 순차로, 가게끼리는 병렬로 실행됩니다."""
+    try:
+        place_id = await _resolve_place_id_async(session, store_name, rest_api_key, semaphore, limiter,
+                                                 place_ids, place_id_cache)
+    except Exception as e:
+        print(f"⚠️ {store_name} place_id 검색 실패: {e}")
+        return []
+    if not place_id:
+        print(f"❌ {store_name}의 place_id를 찾을 수 없습니다.")
+        return []
+
+    plan = plan_review_crawl(checkpoint, place_id)
+    if plan is None:
+        print(f"⏭️ {store_name} 최근에 수집됨, 스킵")
+        return []
+    url_template, comment_id, review_count, since_commentid = plan
+
+    store_comment = []
+    while comment_id is not None:
+        try:
+            data = await _fetch_json(session, url_template.format(place_id, comment_id), semaphore, limiter)
+        except Exception as e:
+            print(f"⚠️ {store_name} 요청 실패: {e}")
+            break
+
+        if not data or 'comment' not in data:
+            print(f"⚠️ {store_name} 리뷰 없음, 스킵")
+            break
+
+        comments, comment_id = parse_comment_page(data, review_count, since_commentid=since_commentid)
+        store_comment.extend(to_review_rows(store_name, comments))
+        review_count += len(comments)
+        if checkpoint:
+            checkpoint.save_review_page(place_id, store_name, comments, comment_id, comment_id is None)
+
+    print(f"{store_name} 완료! ({len(store_comment)}건)")
+    return store_comment
+
+async def scrape_reviews_async(store_names, rest_api_key,
+                               concurrency=ASYNC_CONCURRENCY,
+                               per_host_limit=ASYNC_PER_HOST_LIMIT,
+                               per_host_rps=ASYNC_PER_HOST_RPS,
+                               checkpoint=None,
+                               place_ids=None,
+                               place_id_cache=None):
+    """
+    여러 가게의 리뷰를 동시에 수집합니다.
+
+    Args:
+        concurrency (int): 전체 동시 요청 수 상한
+        per_host_limit (int): 호스트별 keep-alive 커넥션 수 상한
+        per_host_rps (float): 호스트별 초당 요청 수 상한 (0이면 제한 없음)
+        checkpoint (CrawlCheckpoint, optional): 페이지 단위 기록 및 이어받기용 체크포인트
+        place_ids (dict, optional): stores.csv에서 읽은 가게 이름 → place_id
+        place_id_cache (PlaceIdCache, optional): 키워드 검색 결과 디스크 캐시
+    Returns:
+        pd.DataFrame: scrape_reviews_by_storelist와 동일한 스키마
+    """
+    import aiohttp
+
+    semaphore = asyncio.Semaphore(concurrency)
+    limiter = HostRateLimiter(per_host_rps)
+    connector = aiohttp.TCPConnector(limit=concurrency, limit_per_host=per_host_limit)
+    timeout = aiohttp.ClientTimeout(total=10)
+
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        tasks = [
+            _scrape_store_async(session, store_name, rest_api_key, semaphore, limiter, checkpoint,
+                                place_ids, place_id_cache)
+            for store_name in store_names
+        ]
+        # gather는 입력 순서대로 결과를 돌려주므로 가게 순서가 유지됩니다.
+        results = await asyncio.gather(*tasks)
+
+    all_comment = []
+    for store_comment in results:
+        all_comment.extend(store_comment)
+    print(f"✅ {len(store_names)}개 가게 리뷰 {len(all_comment)}건 비동기 수집 완료")
+
+    if checkpoint:
+        return pd.DataFrame(checkpoint.load_reviews(store_names))
     return pd.DataFrame(all_comment)
 
 def save_reviews_to_csv(final_df, filename):
@@ -104,11 +318,37 @@ def main():
         print("❌ stores.csv 파일이 존재하지 않습니다.")
         return
 
-    store_df = pd.read_csv(stores_csv_path)
+    store_df = pd.read_csv(stores_csv_path, dtype={"place_id": str})
     store_names = store_df["store_name"].dropna().unique().tolist()
 
-    print("📝 리뷰 크롤링 시작...")
-    final_df = scrape_reviews_by_storelist(store_names, REST_API_KEY)
+    # 가게 크롤러가 저장한 place_id가 있으면 키워드 검색 없이 바로 사용
+    place_ids = {}
+    if "place_id" in store_df.columns:
+        known = store_df.dropna(subset=["store_name", "place_id"])
+        place_ids = dict(zip(known["store_name"], known["place_id"]))
+    print(f"🔑 place_id 보유 {len(place_ids)}개 / 전체 {len(store_names)}개")
+    place_id_cache = PlaceIdCache()
+
+    checkpoint = None if "--no-checkpoint" in sys.argv else CrawlCheckpoint()
+
+    if "--async" in sys.argv:
+        # 예: python crawler/reviews.py 충정로역 --async --concurrency=32
+        concurrency = ASYNC_CONCURRENCY
+        for arg in sys.argv[2:]:
+            if arg.startswith("--concurrency="):
+                concurrency = int(arg.split("=", 1)[1])
+        print(f"📝 리뷰 비동기 크롤링 시작... (동시 요청 {concurrency}개)")
+        final_df = asyncio.run(scrape_reviews_async(store_names, REST_API_KEY, concurrency=concurrency,
+                                                    checkpoint=checkpoint, place_ids=place_ids,
+                                                    place_id_cache=place_id_cache))
+    else:
+        print("📝 리뷰 크롤링 시작...")
+        final_df = scrape_reviews_by_storelist(store_names, REST_API_KEY, checkpoint=checkpoint,
+                                               place_ids=place_ids, place_id_cache=place_id_cache)
+
+    place_id_cache.close()
+    if checkpoint:
+        checkpoint.close()
 
     save_reviews_to_csv(final_df, "data/reviews.csv")
 
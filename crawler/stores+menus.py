@@ -2,389 +2,771 @@
 # Description: 카카오맵 웹사이트에서 검색 키워드(예: 충정로역 맛집)를 기반으로 가게 정보를 크롤링합니다.
 #              - 장소 더보기 버튼과 페이지 넘김 로직을 통해 최대 200개까지 가게 정보를 수집하며,
 #              - 각 가게에 대해 기본 정보, 영업시간, 편의시설, 해시태그, 카테고리, 대표 이미지, 메뉴 정보를 포함합니다.
-#              - 크롤링된 결과는 'stores.csv'와 'menus.csv'로 저장됩니다.
+#              - --workers=N 옵션을 주면 검색 결과 목록에서는 상세 페이지 URL만 모으고,
+#                N개의 headless 브라우저 워커가 상세 페이지를 동시에 크롤링합니다.
+#                실패한 상세 페이지는 한 번 더 시도하고, 그래도 모자라면 미리 더 모아 둔 예비 URL로 채워
+#                순차 모드처럼 요청한 가게 수를 맞춥니다.
+#              - --network 옵션을 주면 이미지/폰트/미디어 요청을 차단하고, 상세 페이지가 받아오는
+#                장소 상세 JSON 응답을 가로채 파싱합니다. (실패 시 기존 DOM 크롤링으로 대체)
+#              - 수집한 가게는 체크포인트 DB에 바로 기록되어, 중단 후 재실행하면 이어서 진행하고
+#                TTL보다 최근에 수집된 가게는 건너뜁니다. 결과 페이지 간 중복 가게는 place_id로 제거합니다.
+#              - 크롤링된 결과는 'stores.csv'와 'menus.csv'로 저장됩니다. stores.csv에는 리뷰 크롤러가
+#                키워드 검색 없이 바로 쓸 수 있도록 카카오 place_id가 함께 저장됩니다.
 # Author: 통합버전
 # Date: 2025.04.29
 # Requirements: playwright, pandas
 
 
 import time
+import queue
+import threading
 import pandas as pd
 from playwright.sync_api import sync_playwright
 import sys
+from checkpoint import CrawlCheckpoint, place_id_from_url
 
-def main():
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=False)
-        context = browser.new_context()
-        page = context.new_page()
-        
-        # 1. 카카오맵 접속
-        page.goto('https://map.kakao.com/')
-        page.wait_for_selector('input#search\\.keyword\\.query')
-        
-        # 2. 검색어 입력
-        if len(sys.argv) < 2:
-            print("❌ 역 이름이 전달되지 않았습니다.")
-            return
+# '--workers'만 주고 개수를 생략한 경우 사용할 기본 워커 수
+DEFAULT_WORKERS = 4
 
-        keyword = sys.argv[1]
-        
-        # 2-1. 크롤링할 가게 수 입력 받기
-        if len(sys.argv) < 3:
-            print("❌ 크롤링할 가게 수가 전달되지 않았습니다.")
-            return
+# 워커 모드: 실패한 상세 페이지 재시도 횟수, 실패를 메우기 위해 요청 수보다 더 모아 둘 예비 URL 비율
+DETAIL_RETRIES = 1
+SPARE_URL_RATIO = 0.2
 
-        try:
-            input_store_count = int(sys.argv[2])
-            if input_store_count <= 0:
-                print("❌ 1개 이상의 양수를 입력해야 합니다.")
-                return
-            elif input_store_count > 200:
-                print("⚠️ 최대 35개까지만 크롤링할 수 있습니다. 200개로 제한합니다.")
-                max_store_id = 200
+# --network 모드에서 차단할 리소스 종류
+BLOCKED_RESOURCE_TYPES = {"image", "font", "media"}
+
+# 상세 페이지가 호출하는 장소 상세 JSON API 주소 패턴
+PLACE_JSON_URL_PATTERNS = (
+    "place.map.kakao.com/main/v/",
+    "place-api.map.kakao.com/places/panel3/",
+)
+
+def scrape_store_detail(new_page, store_id):
+    """
+    열려 있는 가게 상세 페이지에서 가게 정보와 메뉴 정보를 추출합니다.
+
+    Args:
+        new_page: 가게 상세 페이지가 열린 Playwright Page
+        store_id (int): 가게 고유 번호
+    Returns:
+        (dict, list): stores.csv 1행, menus.csv 행 목록
+    """
+    # 상세 페이지 로딩 대기
+    new_page.wait_for_selector('h3.tit_place', timeout=10000)
+
+    # 가게 이름
+    try:
+        store_name_raw = new_page.inner_text('h3.tit_place')
+        store_name = store_name_raw.replace("장소명", "").strip()
+        print(f"🏢 가게 이름: {store_name}")
+    except:
+        store_name = None
+        print("❌ 가게 이름 추출 실패")
+
+    # 가게 주소
+    try:
+        address = new_page.inner_text('div.row_detail span.txt_detail')
+        print(f"📍 주소: {address}")
+    except:
+        address = None
+        print("❌ 주소 추출 실패")
+
+    # 전화번호
+    try:
+        phone = new_page.inner_text('div.detail_info.info_suggest span.txt_detail')
+        print(f"☎️ 전화번호: {phone}")
+    except:
+        phone = None
+        print("❌ 전화번호 추출 실패")
+
+    # 영업시간
+    openhours = {}
+    try:
+        elements = new_page.query_selector_all('div#foldDetail2 div.line_fold')
+        for elem in elements:
+            day_span = elem.query_selector('span.tit_fold')
+            if not day_span:
+                continue
+
+            day = day_span.inner_text().strip()
+            open_info = {'영업시간': None, '라스트오더': None, '브레이크타임': None}
+
+            detail_fold = elem.query_selector('div.detail_fold')
+            if detail_fold:
+                details = detail_fold.query_selector_all('span.txt_detail')
+                for idx2, detail in enumerate(details):
+                    text = detail.inner_text().strip()
+                    if idx2 == 0:
+                        open_info['영업시간'] = text
+                    else:
+                        if '라스트오더' in text:
+                            open_info['라스트오더'] = text.replace('라스트오더', '').replace('~', '').strip()
+                        elif '브레이크타임' in text:
+                            open_info['브레이크타임'] = text.replace('브레이크타임', '').strip()
             else:
-                max_store_id = input_store_count
-        except ValueError:
-            print("❌ 유효한 숫자를 입력해주세요.")
-            return
+                open_info['영업시간'] = '정보 없음'
 
-        search_keyword = f"{keyword} 맛집"
-        page.fill('input#search\\.keyword\\.query', search_keyword)
-        page.keyboard.press('Enter')
-        page.wait_for_selector('ul#info\\.search\\.place\\.list')
-        print(f"✅ {search_keyword} 검색 완료")
-        
-        # 3. dimmedLayer 닫기 (선택 사항)
-        try:
-            page.wait_for_selector('div#dimmedLayer', timeout=3000)
-            page.click('div#dimmedLayer')
-            print("✅ dimmedLayer 클릭해서 닫음")
-        except:
-            print("✅ dimmedLayer 없음")
-        
-        # 데이터 저장용 리스트
-        stores_data = []
-        menus_data = []
-        store_id = 1                # 가게 고유 번호
-        more_button_clicked = False # 장소 더보기 버튼 클릭 여부
-        current_page = 1    # 현재 페이지 번호
-        crawled_stores_count = 0 # 크롤링 완료한 가게 수
-        
-        while crawled_stores_count < max_store_id:
-            print(f"\n--- 현재까지 {crawled_stores_count}개 가게 크롤링 완료 (현재 페이지: {current_page}) ---")
-            
-            # 현재 페이지의 모든 가게 목록 가져오기
-            page.wait_for_selector('ul#info\\.search\\.place\\.list li')
-            store_items = page.query_selector_all('ul#info\\.search\\.place\\.list li')
-            print(f"✅ 현재 페이지에 {len(store_items)}개의 가게 발견")
-            
-            # 현재 페이지의 각 가게 크롤링
-            for i, store_item in enumerate(store_items):
-                if crawled_stores_count >= max_store_id:
-                    break
-                    
-                store_index_on_page = i + 1
-                print(f"\n--- {crawled_stores_count + 1}번째 가게 (현재 페이지 순번 {store_index_on_page}) 크롤링 시작 ---")
-                
-                new_page = None
+            openhours[day] = open_info
+        print(f"🕒 영업시간 정보 추출 완료")
+    except:
+        openhours = {}
+        print("❌ 영업시간 정보 추출 실패")
+
+    # 부가정보, 해시태그, 카테고리
+    facilities, hashtags, categories, main_image_url = [], [], [], None
+
+    try:
+        # 정보 탭 클릭
+        info_tab = new_page.query_selector('a.link_tab[role="tab"]:has-text("정보")')
+        if info_tab:
+            info_tab.click()
+            new_page.wait_for_selector('div.default_info.type_descinfo', timeout=3000)
+            print("✅ 정보 탭 클릭 완료")
+    except:
+        print("❌ 정보 탭 클릭 실패")
+
+    # 시설정보
+    try:
+        unit_defaults = new_page.query_selector_all('div.unit_default')
+        for unit in unit_defaults:
+            title = unit.query_selector('span.ico_mapdesc.ico_facilities')
+            if title:
+                detail_area = unit.query_selector('div.row_detail.aligntype_gap')
+                if detail_area:
+                    badges = detail_area.query_selector_all('span.badge_label')
+                    facilities = [badge.inner_text().strip() for badge in badges]
+                break
+        print(f"🏢 시설정보: {facilities}")
+    except:
+        print("❌ 시설정보 추출 실패")
+
+    # 해시태그
+    try:
+        for unit in unit_defaults:
+            title = unit.query_selector('span.ico_mapdesc.ico_hashtag')
+            if title:
+                detail_area = unit.query_selector('div.row_detail')
+                if detail_area:
+                    tags = detail_area.query_selector_all('a.txt_detail')
+                    hashtags = [tag.inner_text().strip() for tag in tags]
+                break
+        print(f"# 해시태그: {hashtags}")
+    except:
+        print("❌ 해시태그 추출 실패")
+
+    # 카테고리
+    try:
+        category_span = new_page.query_selector('span.info_cate')
+        if category_span:
+            screen_out_span = category_span.query_selector('span.screen_out')
+            screen_out_text = screen_out_span.inner_text().strip() if screen_out_span else ''
+            full_text = category_span.inner_text().strip()
+            category_text = full_text.replace(screen_out_text, '').strip()
+            if category_text:
+                categories = [cat.strip() for cat in category_text.split(',')]
+        print(f"🏷️ 카테고리: {categories}")
+    except:
+        print("❌ 카테고리 추출 실패")
+
+    # 대표 사진
+    try:
+        photo_tab = new_page.query_selector('a[role="tab"]:has-text("사진")')
+        if photo_tab:
+            photo_tab.click()
+            new_page.wait_for_selector('div.view_photolist ul.list_photo li', timeout=3000)
+            print("✅ 사진 탭 클릭 완료")
+
+        first_photo = new_page.query_selector('div.view_photolist ul.list_photo li a img')
+        if first_photo:
+            src = first_photo.get_attribute('src')
+            if src:
+                main_image_url = src
+                print(f"🖼️ 대표 사진 URL 추출 완료")
+    except:
+        print("❌ 대표 사진 추출 실패")
+
+    # 메뉴
+    menus = []
+    store_menu_data = []
+    try:
+        menu_tab = new_page.query_selector('a[role="tab"]:has-text("메뉴")')
+        if menu_tab:
+            menu_tab.click()
+            new_page.wait_for_selector('ul.list_goods > li', timeout=3000)
+            print("✅ 메뉴 탭 클릭 완료")
+
+        menu_items = new_page.query_selector_all('ul.list_goods > li')
+        for item in menu_items:
+            img_tag = item.query_selector('a.link_thumb img')
+            image_url = img_tag.get_attribute('src') if img_tag else None
+
+            title_tag = item.query_selector('strong.tit_item')
+            title = title_tag.inner_text().strip() if title_tag else None
+
+            price_tag = item.query_selector('p.desc_item')
+            price = price_tag.inner_text().strip() if price_tag else None
+
+            desc_tag = item.query_selector('p.desc_item2')
+            description = desc_tag.inner_text().strip() if desc_tag else None
+
+            menus.append({
+                'store_id': store_id,
+                'menu_name': title,
+                'price': price,
+                'description': description,
+                'image_url': image_url
+            })
+
+            # 두 번째 코드의 형식에 맞게 데이터도 추가
+            store_menu_data.append({
+                '가게이름': store_name,
+                '메뉴명': title,
+                '가격': price
+            })
+
+        print(f"🍽️ {len(store_menu_data)}개 메뉴 정보 추출 완료")
+    except:
+        print("❌ 메뉴 추출 실패")
+
+    store_data = {
+        'store_id': store_id,
+        'place_id': place_id_from_url(new_page.url),
+        'store_name': store_name,
+        'address': address,
+        'phone': phone,
+        'openhours': openhours,
+        'facilities': facilities,
+        'hashtags': hashtags,
+        'categories': categories,
+        'main_image_url': main_image_url
+    }
+    return store_data, menus
+
+# ----------------------------
+# 네트워크 응답 기반 추출 (--network)
+# ----------------------------
+
+def block_heavy_resources(context):
+    """이미지, 폰트, 미디어 요청을 차단해 대역폭과 로딩 시간을 줄입니다."""
+    def handle_route(route):
+        if route.request.resource_type in BLOCKED_RESOURCE_TYPES:
+            route.abort()
+        else:
+            route.continue_()
+
+    context.route("**/*", handle_route)
+
+def is_place_json_response(response):
+    return response.status == 200 and any(pattern in response.url for pattern in PLACE_JSON_URL_PATTERNS)
+
+def parse_openhours_payload(open_hour):
+    """openHour.periodList를 DOM 크롤링과 같은 {요일: {'영업시간', '라스트오더', '브레이크타임'}} 형태로 변환"""
+    openhours = {}
+    for period in open_hour.get('periodList', []) or []:
+        for time_info in period.get('timeList', []) or []:
+            day = (time_info.get('dayOfWeek') or '').strip()
+            if not day:
+                continue
+            open_info = openhours.setdefault(day, {'영업시간': None, '라스트오더': None, '브레이크타임': None})
+            time_name = time_info.get('timeName', '')
+            time_se = (time_info.get('timeSE') or '').strip()
+            if '브레이크' in time_name:
+                open_info['브레이크타임'] = time_se
+            elif '라스트' in time_name:
+                open_info['라스트오더'] = time_se.replace('~', '').strip()
+            else:
+                open_info['영업시간'] = time_se
+    return openhours
+
+def parse_place_payload(payload, store_id):
+    """
+    장소 상세 JSON 응답에서 scrape_store_detail과 같은 형식의 가게/메뉴 정보를 추출합니다.
+
+    Returns:
+        (dict, list) 또는 가게 이름을 찾지 못하면 None
+    """
+    basic = payload.get('basicInfo') or {}
+    store_name = basic.get('placenamefull')
+    if not store_name:
+        return None
+
+    address_info = basic.get('address') or {}
+    region = address_info.get('region') or {}
+    new_addr = address_info.get('newaddr') or {}
+    address = ' '.join(filter(None, [
+        region.get('newaddrfullname') or region.get('fullname'),
+        new_addr.get('newaddrfull') or address_info.get('addrbunho'),
+        address_info.get('addrdetail'),
+    ])) or None
+
+    # 시설정보는 'Y'로 표시된 항목만 사용
+    facility_names = {
+        'wifi': '와이파이', 'pet': '반려동물 동반', 'parking': '주차',
+        'fordisabled': '장애인 편의시설', 'nursery': '유아시설', 'smokingroom': '흡연실',
+    }
+    facility_info = basic.get('facilityInfo') or {}
+    facilities = [name for key, name in facility_names.items() if facility_info.get(key) == 'Y']
+
+    category = basic.get('category') or {}
+    categories = [cat.strip() for cat in (category.get('catename') or '').split(',') if cat.strip()]
+
+    hashtags = [tag.lstrip('#').strip() for tag in (basic.get('metaKeywordList') or basic.get('tags') or [])]
+
+    store_data = {
+        'store_id': store_id,
+        'place_id': str(basic['cid']) if basic.get('cid') else None,
+        'store_name': store_name,
+        'address': address,
+        'phone': basic.get('phonenum'),
+        'openhours': parse_openhours_payload(basic.get('openHour') or {}),
+        'facilities': facilities,
+        'hashtags': hashtags,
+        'categories': categories,
+        'main_image_url': basic.get('mainphotourl')
+    }
+
+    menus = [
+        {
+            'store_id': store_id,
+            'menu_name': menu.get('menu'),
+            'price': menu.get('price'),
+            'description': menu.get('desc'),
+            'image_url': menu.get('img')
+        }
+        for menu in ((payload.get('menuInfo') or {}).get('menuList') or [])
+    ]
+    return store_data, menus
+
+def scrape_store_from_network(page, url, store_id):
+    """
+    상세 페이지를 열면서 장소 상세 JSON 응답을 기다렸다가 파싱합니다.
+    고정 대기 없이 응답 이벤트로 기다리며, 응답을 못 받거나 형식이 다르면 DOM 크롤링으로 대체합니다.
+    """
+    try:
+        with page.expect_response(is_place_json_response, timeout=10000) as response_info:
+            page.goto(url)
+        result = parse_place_payload(response_info.value.json(), store_id)
+        if result:
+            result[0]['place_id'] = result[0]['place_id'] or place_id_from_url(url)
+            print(f"📦 {result[0]['store_name']} 상세 JSON 추출 완료")
+            return result
+        print("⚠️ 상세 JSON 형식이 달라 DOM 크롤링으로 대체")
+    except Exception as e:
+        print(f"⚠️ 상세 JSON 응답 수신 실패, DOM 크롤링으로 대체: {e}")
+        if page.url != url:
+            page.goto(url)
+
+    return scrape_store_detail(page, store_id)
+
+class ResultPager:
+    """검색 결과 목록의 페이지 넘김 상태('장소 더보기' 클릭 여부, 현재 페이지 번호)를 관리합니다."""
+
+    def __init__(self, page):
+        self.page = page
+        self.more_button_clicked = False  # 장소 더보기 버튼 클릭 여부
+        self.current_page = 1             # 현재 페이지 번호
+
+    def next(self):
+        """다음 결과 페이지로 이동합니다. 더 이상 이동할 수 없으면 False를 반환합니다."""
+        # 3페이지까지는 첫번째 로직, 그 이후는 두번째 로직 사용
+        if self.current_page < 3:
+            # 첫번째 로직
+            if not self.more_button_clicked:
                 try:
-                    # 상세보기 링크 클릭
-                    more_view_button = store_item.query_selector('a.moreview')
-                    if more_view_button:
-                        with context.expect_page() as new_page_info:
-                            more_view_button.click()
-                        new_page = new_page_info.value
-                        print("✅ 상세보기 페이지 열림")
-                        
-                        # 상세 페이지 로딩 대기
-                        new_page.wait_for_selector('h3.tit_place', timeout=10000)
-                        
-                        # 가게 이름
-                        try:
-                            store_name_raw = new_page.inner_text('h3.tit_place')
-                            store_name = store_name_raw.replace("장소명", "").strip()
-                            print(f"🏢 가게 이름: {store_name}")
-                        except:
-                            store_name = None
-                            print("❌ 가게 이름 추출 실패")
-                            
-                        # 가게 주소
-                        try:
-                            address = new_page.inner_text('div.row_detail span.txt_detail')
-                            print(f"📍 주소: {address}")
-                        except:
-                            address = None
-                            print("❌ 주소 추출 실패")
-                            
-                        # 전화번호
-                        try:
-                            phone = new_page.inner_text('div.detail_info.info_suggest span.txt_detail')
-                            print(f"☎️ 전화번호: {phone}")
-                        except:
-                            phone = None
-                            print("❌ 전화번호 추출 실패")
-                            
-                        # 영업시간
-                        openhours = {}
-                        try:
-                            elements = new_page.query_selector_all('div#foldDetail2 div.line_fold')
-                            for elem in elements:
-                                day_span = elem.query_selector('span.tit_fold')
-                                if not day_span:
-                                    continue
-                                    
-                                day = day_span.inner_text().strip()
-                                open_info = {'영업시간': None, '라스트오더': None, '브레이크타임': None}
-                                
-                                detail_fold = elem.query_selector('div.detail_fold')
-                                if detail_fold:
-                                    details = detail_fold.query_selector_all('span.txt_detail')
-                                    for idx2, detail in enumerate(details):
-                                        text = detail.inner_text().strip()
-                                        if idx2 == 0:
-                                            open_info['영업시간'] = text
-                                        else:
-                                            if '라스트오더' in text:
-                                                open_info['라스트오더'] = text.replace('라스트오더', '').replace('~', '').strip()
-                                            elif '브레이크타임' in text:
-                                                open_info['브레이크타임'] = text.replace('브레이크타임', '').strip()
-                                else:
-                                    open_info['영업시간'] = '정보 없음'
-                                    
-                                openhours[day] = open_info
-                            print(f"🕒 영업시간 정보 추출 완료")
-                        except:
-                            openhours = {}
-                            print("❌ 영업시간 정보 추출 실패")
-                            
-                        # 부가정보, 해시태그, 카테고리
-                        facilities, hashtags, categories, main_image_url = [], [], [], None
-                        
-                        try:
-                            # 정보 탭 클릭
-                            info_tab = new_page.query_selector('a.link_tab[role="tab"]:has-text("정보")')
-                            if info_tab:
-                                info_tab.click()
-                                new_page.wait_for_selector('div.default_info.type_descinfo', timeout=3000)
-                                print("✅ 정보 탭 클릭 완료")
-                        except:
-                            print("❌ 정보 탭 클릭 실패")
-                            
-                        # 시설정보
-                        try:
-                            unit_defaults = new_page.query_selector_all('div.unit_default')
-                            for unit in unit_defaults:
-                                title = unit.query_selector('span.ico_mapdesc.ico_facilities')
-                                if title:
-                                    detail_area = unit.query_selector('div.row_detail.aligntype_gap')
-                                    if detail_area:
-                                        badges = detail_area.query_selector_all('span.badge_label')
-                                        facilities = [badge.inner_text().strip() for badge in badges]
-                                    break
-                            print(f"🏢 시설정보: {facilities}")
-                        except:
-                            print("❌ 시설정보 추출 실패")
-                            
-                        # 해시태그
-                        try:
-                            for unit in unit_defaults:
-                                title = unit.query_selector('span.ico_mapdesc.ico_hashtag')
-                                if title:
-                                    detail_area = unit.query_selector('div.row_detail')
-                                    if detail_area:
-                                        tags = detail_area.query_selector_all('a.txt_detail')
-                                        hashtags = [tag.inner_text().strip() for tag in tags]
-                                    break
-                            print(f"# 해시태그: {hashtags}")
-                        except:
-                            print("❌ 해시태그 추출 실패")
-                            
-                        # 카테고리
-                        try:
-                            category_span = new_page.query_selector('span.info_cate')
-                            if category_span:
-                                screen_out_span = category_span.query_selector('span.screen_out')
-                                screen_out_text = screen_out_span.inner_text().strip() if screen_out_span else ''
-                                full_text = category_span.inner_text().strip()
-                                category_text = full_text.replace(screen_out_text, '').strip()
-                                if category_text:
-                                    categories = [cat.strip() for cat in category_text.split(',')]
-                            print(f"🏷️ 카테고리: {categories}")
-                        except:
-                            print("❌ 카테고리 추출 실패")
-                            
-                        # 대표 사진
-                        try:
-                            photo_tab = new_page.query_selector('a[role="tab"]:has-text("사진")')
-                            if photo_tab:
-                                photo_tab.click()
-                                new_page.wait_for_timeout(2000)
-                                print("✅ 사진 탭 클릭 완료")
-                                
-                            first_photo = new_page.query_selector('div.view_photolist ul.list_photo li a img')
-                            if first_photo:
-                                src = first_photo.get_attribute('src')
-                                if src:
-                                    main_image_url = src
-                                    print(f"🖼️ 대표 사진 URL 추출 완료")
-                        except:
-                            print("❌ 대표 사진 추출 실패")
-                            
-                        # 메뉴
-                        store_menu_data = []
-                        try:
-                            menu_tab = new_page.query_selector('a[role="tab"]:has-text("메뉴")')
-                            if menu_tab:
-                                menu_tab.click()
-                                new_page.wait_for_timeout(2000)
-                                print("✅ 메뉴 탭 클릭 완료")
-                                
-                            menu_items = new_page.query_selector_all('ul.list_goods > li')
-                            for item in menu_items:
-                                img_tag = item.query_selector('a.link_thumb img')
-                                image_url = img_tag.get_attribute('src') if img_tag else None
-                                
-                                title_tag = item.query_selector('strong.tit_item')
-                                title = title_tag.inner_text().strip() if title_tag else None
-                                
-                                price_tag = item.query_selector('p.desc_item')
-                                price = price_tag.inner_text().strip() if price_tag else None
-                                
-                                desc_tag = item.query_selector('p.desc_item2')
-                                description = desc_tag.inner_text().strip() if desc_tag else None
-                                
-                                menus_data.append({
-                                    'store_id': store_id,
-                                    'menu_name': title,
-                                    'price': price,
-                                    'description': description,
-                                    'image_url': image_url
-                                })
-                                
-                                # 두 번째 코드의 형식에 맞게 데이터도 추가
-                                store_menu_data.append({
-                                    '가게이름': store_name,
-                                    '메뉴명': title,
-                                    '가격': price
-                                })
-                                
-                            print(f"🍽️ {len(store_menu_data)}개 메뉴 정보 추출 완료")
-                        except:
-                            print("❌ 메뉴 추출 실패")
-                            
-                        # 가게 데이터 저장
-                        stores_data.append({
-                            'store_id': store_id,
-                            'store_name': store_name,
-                            'address': address,
-                            'phone': phone,
-                            'openhours': openhours,
-                            'facilities': facilities,
-                            'hashtags': hashtags,
-                            'categories': categories,
-                            'main_image_url': main_image_url
-                        })
-                        
-                        store_id += 1
-                        crawled_stores_count += 1
-                        
-                        # 새 페이지 닫기
-                        new_page.close()
-                        print(f"✅ {crawled_stores_count}번째 가게 크롤링 완료")
-                        
-                    else:
-                        print("⚠️ 상세보기 버튼을 찾을 수 없습니다.")
-                        
+                    more_button_selector = '#info\\.search\\.place\\.more'
+                    self.page.wait_for_selector(more_button_selector, timeout=5000)
+                    self.page.click(more_button_selector)
+                    print("➡️ '장소 더보기' 버튼 클릭")
+                    self.page.wait_for_selector('ul#info\\.search\\.place\\.list', timeout=10000)
+                    time.sleep(2)
+                    self.more_button_clicked = True
+                    self.current_page = 2
                 except Exception as e:
-                    print(f"❌ 가게 크롤링 실패: {e}")
-                    if new_page and not new_page.is_closed():
-                        new_page.close()
-                
-                # 잠시 대기
-                time.sleep(1)
-            
-            # 모든 가게를 크롤링했으면 종료
-            if crawled_stores_count >= max_store_id:
-                break
-                
-            # 페이징 처리
-            # 3페이지까지는 첫번째 로직, 그 이후는 두번째 로직 사용
-            if current_page < 3:
-                # 첫번째 로직
-                if not more_button_clicked:
-                    try:
-                        more_button_selector = '#info\\.search\\.place\\.more'
-                        page.wait_for_selector(more_button_selector, timeout=5000)
-                        page.click(more_button_selector)
-                        print("➡️ '장소 더보기' 버튼 클릭")
-                        page.wait_for_selector('ul#info\\.search\\.place\\.list', timeout=10000)
-                        time.sleep(2)
-                        more_button_clicked = True
-                        current_page = 2
-                    except Exception as e:
-                        print(f"⚠️ '장소 더보기' 버튼 없음 또는 클릭 실패: {e}")
-                        break
-                else:
-                    current_page += 1
-                    try:
-                        next_page_selector = f'#info\\.search\\.page\\.no{current_page}'
-                        page.wait_for_selector(next_page_selector, timeout=5000)
-                        page.click(next_page_selector)
-                        print(f"➡️ 페이지 {current_page} 클릭 (첫번째 로직)")
-                        page.wait_for_selector('ul#info\\.search\\.place\\.list', timeout=10000)
-                        time.sleep(2)
-                    except Exception as e:
-                        print(f"⚠️ {current_page} 페이지 버튼 없음 또는 클릭 실패: {e}")
-                        break
+                    print(f"⚠️ '장소 더보기' 버튼 없음 또는 클릭 실패: {e}")
+                    return False
             else:
-                current_page += 1
+                self.current_page += 1
                 try:
-                    next_page_selector = f'#info\\.search\\.page\\.no{current_page}'
-                    next_button = page.locator(next_page_selector)
-                    if next_button.is_visible():
-                        next_button.click()
-                        print(f"➡️ 페이지 {current_page} 클릭 성공")
-                        page.wait_for_selector('ul#info\\.search\\.place\\.list', timeout=10000)
-                        time.sleep(2)
-                    else:
-                        raise Exception("다음 페이지 버튼이 숨겨져 있음")
+                    next_page_selector = f'#info\\.search\\.page\\.no{self.current_page}'
+                    self.page.wait_for_selector(next_page_selector, timeout=5000)
+                    self.page.click(next_page_selector)
+                    print(f"➡️ 페이지 {self.current_page} 클릭 (첫번째 로직)")
+                    self.page.wait_for_selector('ul#info\\.search\\.place\\.list', timeout=10000)
+                    time.sleep(2)
                 except Exception as e:
-                    print(f"⚠️ 페이지 {current_page} 버튼 실패: {e}")
-                    # '다음' 버튼 시도
-                    try:
-                        next_btn_selector = '#info\\.search\\.page\\.next'
-                        page.click(next_btn_selector)
-                        print("➡️ '다음' 버튼 클릭")
-                        page.wait_for_selector('ul#info\\.search\\.place\\.list', timeout=10000)
-                        time.sleep(2)
-                        current_page = 1  # 다음 버튼 누른 후 페이지 번호 초기화
-                    except Exception as e2:
-                        print(f"❌ '다음' 버튼도 실패: {e2}")
-                        break
-
-        
-        # 크롤링 완료 - 데이터 저장
-        print("\n--- 크롤링 완료 ---")
-        print(f"총 {crawled_stores_count}개 가게 크롤링 성공")
-        
-        # 저장 파일명
-        stores_csv = "data/stores.csv"
-        menus_csv = "data/menus.csv"
-        
-        # 저장
+                    print(f"⚠️ {self.current_page} 페이지 버튼 없음 또는 클릭 실패: {e}")
+                    return False
+        else:
+            self.current_page += 1
+            try:
+                next_page_selector = f'#info\\.search\\.page\\.no{self.current_page}'
+                next_button = self.page.locator(next_page_selector)
+                if next_button.is_visible():
+                    next_button.click()
+                    print(f"➡️ 페이지 {self.current_page} 클릭 성공")
+                    self.page.wait_for_selector('ul#info\\.search\\.place\\.list', timeout=10000)
+                    time.sleep(2)
+                else:
+                    raise Exception("다음 페이지 버튼이 숨겨져 있음")
+            except Exception as e:
+                print(f"⚠️ 페이지 {self.current_page} 버튼 실패: {e}")
+                # '다음' 버튼 시도
+                try:
+                    next_btn_selector = '#info\\.search\\.page\\.next'
+                    self.page.click(next_btn_selector)
+                    print("➡️ '다음' 버튼 클릭")
+                    self.page.wait_for_selector('ul#info\\.search\\.place\\.list', timeout=10000)
+                    time.sleep(2)
+                    self.current_page = 1  # 다음 버튼 누른 후 페이지 번호 초기화
+                except Exception as e2:
+                    print(f"❌ '다음' 버튼도 실패: {e2}")
+                    return False
+        return True
+
+def open_search(page, keyword):
+    """카카오맵에 접속해 '{keyword} 맛집'을 검색합니다."""
+    # 1. 카카오맵 접속
+    page.goto('https://map.kakao.com/')
+    page.wait_for_selector('input#search\\.keyword\\.query')
+
+    # 2. 검색어 입력
+    search_keyword = f"{keyword} 맛집"
+    page.fill('input#search\\.keyword\\.query', search_keyword)
+    page.keyboard.press('Enter')
+    page.wait_for_selector('ul#info\\.search\\.place\\.list')
+    print(f"✅ {search_keyword} 검색 완료")
+
+    # 3. dimmedLayer 닫기 (선택 사항)
+    try:
+        page.wait_for_selector('div#dimmedLayer', timeout=3000)
+        page.click('div#dimmedLayer')
+        print("✅ dimmedLayer 클릭해서 닫음")
+    except:
+        print("✅ dimmedLayer 없음")
+
+def walk_result_list(page, max_store_id, handle_item):
+    """
+    검색 결과 목록을 페이지 단위로 순회하며 각 가게 항목을 handle_item에 넘깁니다.
+
+    Args:
+        page: 검색 결과가 열린 Playwright Page
+        max_store_id (int): 처리할 최대 가게 수
+        handle_item (callable): store_item을 받아 성공 여부(bool)를 반환하는 함수
+    Returns:
+        int: 성공적으로 처리한 가게 수
+    """
+    pager = ResultPager(page)
+    crawled_stores_count = 0 # 크롤링 완료한 가게 수
+
+    while crawled_stores_count < max_store_id:
+        print(f"\n--- 현재까지 {crawled_stores_count}개 가게 크롤링 완료 (현재 페이지: {pager.current_page}) ---")
+
+        # 현재 페이지의 모든 가게 목록 가져오기
+        page.wait_for_selector('ul#info\\.search\\.place\\.list li')
+        store_items = page.query_selector_all('ul#info\\.search\\.place\\.list li')
+        print(f"✅ 현재 페이지에 {len(store_items)}개의 가게 발견")
+
+        # 현재 페이지의 각 가게 처리
+        for i, store_item in enumerate(store_items):
+            if crawled_stores_count >= max_store_id:
+                break
+
+            print(f"\n--- {crawled_stores_count + 1}번째 가게 (현재 페이지 순번 {i + 1}) 처리 시작 ---")
+            if handle_item(store_item):
+                crawled_stores_count += 1
+
+        # 모든 가게를 크롤링했으면 종료
+        if crawled_stores_count >= max_store_id:
+            break
+
+        # 페이징 처리
+        if not pager.next():
+            break
+
+    return crawled_stores_count
+
+def assign_store_id(store_data, menus, store_id):
+    """체크포인트에서 꺼낸 결과 등에 이번 실행 기준의 store_id를 다시 매깁니다."""
+    store_data['store_id'] = store_id
+    for menu in menus:
+        menu['store_id'] = store_id
+    return store_data, menus
+
+def crawl_sequential(context, page, max_store_id, checkpoint=None):
+    """기존 방식: 검색 결과 목록에서 상세보기를 하나씩 열어 순서대로 크롤링합니다."""
+    stores_data = []
+    menus_data = []
+    seen_place_ids = set()
+
+    def handle_item(store_item):
+        store_id = len(stores_data) + 1  # 가게 고유 번호
+        new_page = None
         try:
-            pd.DataFrame(stores_data).to_csv(stores_csv, encoding='utf-8-sig', index=False)
-            print(f"💾 가게 정보를 '{stores_csv}'로 저장했습니다.")
-            
-            pd.DataFrame(menus_data).to_csv(menus_csv, encoding='utf-8-sig', index=False)
-            print(f"💾 메뉴 정보를 '{menus_csv}'로 저장했습니다.")
+            # 상세보기 링크 클릭
+            more_view_button = store_item.query_selector('a.moreview')
+            if not more_view_button:
+                print("⚠️ 상세보기 버튼을 찾을 수 없습니다.")
+                return False
+
+            detail_url = more_view_button.get_attribute('href')
+            place_id = place_id_from_url(detail_url)
+            if place_id and place_id in seen_place_ids:
+                print(f"⏭️ 이미 수집한 가게입니다 (place_id={place_id})")
+                return False
+            seen_place_ids.add(place_id)
+
+            cached = checkpoint.get_fresh_store(place_id) if checkpoint else None
+            if cached:
+                store_data, menus = assign_store_id(*cached, store_id)
+                stores_data.append(store_data)
+                menus_data.extend(menus)
+                print(f"⏭️ {store_data['store_name']} 최근에 수집됨, 체크포인트 사용")
+                return True
+
+            with context.expect_page() as new_page_info:
+                more_view_button.click()
+            new_page = new_page_info.value
+            print("✅ 상세보기 페이지 열림")
+
+            store_data, menus = scrape_store_detail(new_page, store_id)
+            stores_data.append(store_data)
+            menus_data.extend(menus)
+            if checkpoint:
+                checkpoint.save_store(place_id, detail_url, store_data, menus)
+
+            # 새 페이지 닫기
+            new_page.close()
+            print(f"✅ {store_id}번째 가게 크롤링 완료")
+            return True
+
         except Exception as e:
-            print(f"❌ CSV 파일 저장 실패: {e}")
-        
-        # 브라우저 닫기
+            print(f"❌ 가게 크롤링 실패: {e}")
+            if new_page and not new_page.is_closed():
+                new_page.close()
+            return False
+
+        finally:
+            # 잠시 대기 (체크포인트에서 꺼낸 경우는 요청이 없었으므로 생략)
+            if new_page is not None:
+                time.sleep(1)
+
+    walk_result_list(page, max_store_id, handle_item)
+    return stores_data, menus_data
+
+def collect_detail_urls(page, max_store_id):
+    """
+    워커 풀 방식: 검색 결과 목록에서 상세 페이지 URL만 순서대로 모읍니다.
+    상세 페이지 크롤링 실패를 메울 수 있도록 max_store_id보다 SPARE_URL_RATIO만큼 더 모읍니다. (목록이 허락하는 만큼)
+    """
+    max_urls = max_store_id + max(1, int(max_store_id * SPARE_URL_RATIO))
+    detail_urls = []
+    seen_place_ids = set()
+
+    def handle_item(store_item):
+        more_view_button = store_item.query_selector('a.moreview')
+        href = more_view_button.get_attribute('href') if more_view_button else None
+        if not href:
+            print("⚠️ 상세보기 링크를 찾을 수 없습니다.")
+            return False
+
+        # 결과 페이지 사이에 반복되는 가게는 place_id로 중복 제거
+        place_id = place_id_from_url(href)
+        if place_id and place_id in seen_place_ids:
+            print(f"⏭️ 이미 수집한 가게입니다 (place_id={place_id})")
+            return False
+        seen_place_ids.add(place_id)
+        detail_urls.append(href)
+        return True
+
+    walk_result_list(page, max_urls, handle_item)
+    print(f"✅ 상세 페이지 URL {len(detail_urls)}개 수집 완료 (예비 포함)")
+    return detail_urls
+
+def _detail_worker(worker_no, jobs, results, network=False, checkpoint=None):
+    """
+    작업 큐에서 (순번, URL)을 꺼내 상세 페이지를 크롤링하는 워커.
+    Playwright sync API는 스레드 간 공유가 불가능하므로 워커마다 자체 브라우저를 띄웁니다.
+    """
+    with sync_playwright() as p:
+        browser = p.chromium.launch(headless=True)
+        context = browser.new_context()
+        if network:
+            block_heavy_resources(context)
+        page = context.new_page()
+
+        while True:
+            try:
+                idx, url = jobs.get_nowait()
+            except queue.Empty:
+                break
+
+            try:
+                if network:
+                    results[idx] = scrape_store_from_network(page, url, idx + 1)
+                else:
+                    page.goto(url)
+                    results[idx] = scrape_store_detail(page, idx + 1)
+                if checkpoint:
+                    checkpoint.save_store(place_id_from_url(url), url, *results[idx])
+                print(f"✅ [worker {worker_no}] {idx + 1}번째 가게 크롤링 완료")
+            except Exception as e:
+                print(f"❌ [worker {worker_no}] {idx + 1}번째 가게 크롤링 실패: {e}")
+
         browser.close()
 
+def _run_workers(job_list, workers, results, network=False, checkpoint=None):
+    """(순번, URL) 목록을 최대 workers개의 워커 스레드로 크롤링해 results[순번]에 채웁니다."""
+    jobs = queue.Queue()
+    for job in job_list:
+        jobs.put(job)
+
+    threads = [
+        threading.Thread(target=_detail_worker, args=(worker_no, jobs, results, network, checkpoint))
+        for worker_no in range(1, min(workers, jobs.qsize()) + 1)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+def crawl_parallel(detail_urls, workers, network=False, checkpoint=None, max_stores=None):
+    """
+    상세 페이지 URL 목록을 N개의 headless 워커가 동시에 크롤링합니다.
+    앞에서부터 max_stores개를 크롤링하고, 실패한 URL은 DETAIL_RETRIES번 다시 시도한 뒤
+    그래도 모자라면 뒤쪽의 예비 URL을 모자란 수만큼 이어서 크롤링합니다. (순차 모드가 목록을 더 내려가는 것과 같음)
+    결과는 URL 순서대로 모아 store_id를 다시 매기므로 stores.csv/menus.csv 순서가 유지됩니다.
+    체크포인트에 TTL 안으로 저장된 가게는 작업 큐에 넣지 않습니다.
+    """
+    max_stores = len(detail_urls) if max_stores is None else min(max_stores, len(detail_urls))
+    results = [None] * len(detail_urls)
+    attempts = [0] * len(detail_urls)
+    next_idx = 0  # 아직 시도하지 않은 첫 URL 순번
+    cached_count = 0
+
+    while True:
+        succeeded = sum(result is not None for result in results)
+        # 다시 시도할 실패 URL + 모자란 만큼의 새 URL
+        job_list = [(idx, detail_urls[idx]) for idx in range(next_idx)
+                    if results[idx] is None and attempts[idx] <= DETAIL_RETRIES]
+        missing = max_stores - succeeded - len(job_list)
+        while missing > 0 and next_idx < len(detail_urls):
+            url = detail_urls[next_idx]
+            cached = checkpoint.get_fresh_store(place_id_from_url(url)) if checkpoint else None
+            if cached:
+                results[next_idx] = cached
+                cached_count += 1
+            else:
+                job_list.append((next_idx, url))
+            missing -= 1
+            next_idx += 1
+        if not job_list:
+            break
+
+        retried = sum(attempts[idx] > 0 for idx, _ in job_list)
+        print(f"🚀 상세 페이지 {len(job_list)}개 크롤링" + (f" (재시도 {retried}개)" if retried else ""))
+        for idx, _ in job_list:
+            attempts[idx] += 1
+        _run_workers(job_list, workers, results, network, checkpoint)
+
+    if checkpoint:
+        print(f"⏭️ 체크포인트 사용 {cached_count}개, 새로 크롤링 {sum(attempts)}회")
+
+    stores_data = []
+    menus_data = []
+    for result in results:
+        if result is None:
+            continue  # 재시도까지 실패한 가게는 건너뜀 (예비 URL로 채움)
+        if len(stores_data) >= max_stores:
+            break
+        store_data, menus = assign_store_id(*result, len(stores_data) + 1)
+        stores_data.append(store_data)
+        menus_data.extend(menus)
+
+    if len(stores_data) < max_stores:
+        print(f"⚠️ 예비 URL까지 사용했지만 {max_stores}개 중 {len(stores_data)}개만 크롤링했습니다.")
+    return stores_data, menus_data
+
+def save_results(stores_data, menus_data):
+    # 저장 파일명
+    stores_csv = "data/stores.csv"
+    menus_csv = "data/menus.csv"
+
+    # 저장
+    try:
+        pd.DataFrame(stores_data).to_csv(stores_csv, encoding='utf-8-sig', index=False)
+        print(f"💾 가게 정보를 '{stores_csv}'로 저장했습니다.")
+
+        pd.DataFrame(menus_data).to_csv(menus_csv, encoding='utf-8-sig', index=False)
+        print(f"💾 메뉴 정보를 '{menus_csv}'로 저장했습니다.")
+    except Exception as e:
+        print(f"❌ CSV 파일 저장 실패: {e}")
+
+def parse_workers(argv):
+    """'--workers=N' 또는 '--workers' 옵션에서 워커 수를 읽습니다. 옵션이 없으면 0(순차 모드)."""
+    for arg in argv:
+        if arg == '--workers':
+            return DEFAULT_WORKERS
+        if arg.startswith('--workers='):
+            return max(1, int(arg.split('=', 1)[1]))
+    return 0
+
+def main():
+    # 검색어 입력
+    if len(sys.argv) < 2:
+        print("❌ 역 이름이 전달되지 않았습니다.")
+        return
+
+    keyword = sys.argv[1]
+
+    # 크롤링할 가게 수 입력 받기
+    if len(sys.argv) < 3:
+        print("❌ 크롤링할 가게 수가 전달되지 않았습니다.")
+        return
+
+    try:
+        input_store_count = int(sys.argv[2])
+        if input_store_count <= 0:
+            print("❌ 1개 이상의 양수를 입력해야 합니다.")
+            return
+        elif input_store_count > 200:
+            print("⚠️ 최대 35개까지만 크롤링할 수 있습니다. 200개로 제한합니다.")
+            max_store_id = 200
+        else:
+            max_store_id = input_store_count
+    except ValueError:
+        print("❌ 유효한 숫자를 입력해주세요.")
+        return
+
+    workers = parse_workers(sys.argv[3:])
+    network = '--network' in sys.argv[3:]
+    checkpoint = None if '--no-checkpoint' in sys.argv[3:] else CrawlCheckpoint()
+    if network and not workers:
+        workers = 1  # 네트워크 모드는 URL 수집 후 워커로 크롤링
+
+    with sync_playwright() as p:
+        browser = p.chromium.launch(headless=workers > 0)
+        context = browser.new_context()
+        page = context.new_page()
+
+        open_search(page, keyword)
+
+        if workers:
+            detail_urls = collect_detail_urls(page, max_store_id)
+            browser.close()
+            print(f"🚀 워커 {workers}개로 상세 페이지 크롤링 시작" + (" (네트워크 모드)" if network else ""))
+            stores_data, menus_data = crawl_parallel(detail_urls, workers, network, checkpoint, max_store_id)
+        else:
+            stores_data, menus_data = crawl_sequential(context, page, max_store_id, checkpoint)
+            # 브라우저 닫기
+            browser.close()
+
+    # 크롤링 완료 - 데이터 저장
+    print("\n--- 크롤링 완료 ---")
+    print(f"총 {len(stores_data)}개 가게 크롤링 성공")
+    save_results(stores_data, menus_data)
+    if checkpoint:
+        checkpoint.close()
+
 if __name__ == "__main__":
     main()
 
@@ -1,8 +1,8 @@
 # 파일: preprocessing/reviews_to_clean.py
-# Description: 리뷰 CSV 파일을 불러와 텍스트 정제, 짧거나 긴 리뷰 제거, 감성 레이블링, 결측 제거 등 전처리를 수행하는 리뷰 정제 파이프라인
+# Description: 리뷰 CSV 파일을 불러와 텍스트 정제, 짧거나 긴 리뷰 제거, 중복/유사 리뷰 제거, 감성 레이블링, 결측 제거 등 전처리를 수행하는 리뷰 정제 파이프라인
 # Author: 통합버전
 # Date: 2025.04.29
-# Requirements: pandas
+# Requirements: pandas, numpy
 
 import sys
 import os
@@ -11,8 +11,11 @@ sys.path.append(os.path.dirname(os.path.dirname(__file__)))  # 상위 폴더 경
 # reviews_to_clean.py ( 리뷰 전처리 파이프라인 모듈화 )
 from config import REVIEWS_CSV, REVIEW_FINAL_CSV 
 
+import re
+import zlib
+from collections import defaultdict
+import numpy as np
 import pandas as pd
-# import re : 우린 정규식처리 안 해도 될 거 같 
 
 def load_data(filepath):
     """
@@ -63,6 +66,138 @@ def remove_long_reviews(df, max_length=1000):
     df = df[df['리뷰내용'].str.len() <= max_length]
     return df
 
+MINHASH_PRIME = (1 << 61) - 1  # MinHash 해시 함수 h(x) = (a*x + b) mod p 의 p
+
+def normalize_for_dedup(text):
+    """
+    중복 판정용 정규화: 소문자화, 공백/문장부호 제거, 3번 이상 반복된 글자는 2번으로 줄임.
+    ("맛있어요!!!", "맛있어요~~", "맛 있어요" → "맛있어요")
+
+    Args:
+        text (str): 리뷰 내용
+    Returns:
+        str: 정규화된 문자열
+    """
+    text = re.sub(r"[^0-9a-z가-힣ㄱ-ㅎㅏ-ㅣ]", "", str(text).lower())
+    return re.sub(r"(.)\1{2,}", r"\1\1", text)
+
+def shingle_hashes(text, n=3):
+    """
+    문자 n-gram(shingle)의 32비트 해시 배열.
+
+    Args:
+        text (str): 정규화된 리뷰 내용
+        n (int, optional): shingle 길이 (기본값 3)
+    Returns:
+        np.ndarray: 중복 없는 shingle 해시 (uint64)
+    """
+    grams = {text[i:i + n] for i in range(len(text) - n + 1)} or {text}
+    return np.array([zlib.crc32(gram.encode("utf-8")) for gram in grams], dtype=np.uint64)
+
+def minhash_signatures(texts, num_perm=64, seed=42):
+    """
+    각 텍스트의 MinHash 시그니처를 계산하는 함수. 두 시그니처가 같은 위치의 비율이 Jaccard 유사도의 추정값입니다.
+
+    Args:
+        texts (list): 정규화된 리뷰 내용 목록
+        num_perm (int, optional): 해시 함수 수 (기본값 64)
+        seed (int, optional): 해시 함수 계수 난수 시드
+    Returns:
+        np.ndarray: (len(texts), num_perm) 크기의 시그니처 행렬
+    """
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, 1 << 32, size=num_perm, dtype=np.uint64)[:, None]
+    b = rng.integers(0, 1 << 32, size=num_perm, dtype=np.uint64)[:, None]
+    signatures = np.empty((len(texts), num_perm), dtype=np.uint64)
+    for i, text in enumerate(texts):
+        # a, x < 2^32 이므로 a*x + b는 uint64 범위 안에서 계산됩니다.
+        signatures[i] = ((a * shingle_hashes(text)[None, :] + b) % MINHASH_PRIME).min(axis=1)
+    return signatures
+
+def find_near_duplicates(signatures, groups, threshold, bands=16):
+    """
+    LSH(밴드별 버킷)로 후보 쌍을 찾고, 추정 Jaccard 유사도가 threshold 이상인 쌍을 같은 묶음으로 합쳐
+    묶음마다 첫 리뷰만 남기고 나머지 행 번호를 반환하는 함수.
+
+    Args:
+        signatures (np.ndarray): MinHash 시그니처 행렬
+        groups (list): 행마다의 그룹 키. 같은 그룹 안에서만 비교합니다. (가게별 비교는 가게 이름, 전체 비교는 같은 값)
+        threshold (float): 중복으로 볼 최소 유사도
+        bands (int, optional): LSH 밴드 수 (기본값 16)
+    Returns:
+        set: 제거할 행 번호 집합
+    """
+    n, num_perm = signatures.shape
+    rows_per_band = num_perm // bands
+    parent = list(range(n))
+
+    def find(x):
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    checked = set()
+    for band in range(bands):
+        buckets = defaultdict(list)
+        band_slice = signatures[:, band * rows_per_band:(band + 1) * rows_per_band]
+        for i in range(n):
+            buckets[(groups[i], band_slice[i].tobytes())].append(i)
+        for members in buckets.values():
+            for j in members[1:]:
+                i = members[0]
+                if (i, j) in checked or find(i) == find(j):
+                    continue
+                checked.add((i, j))
+                if np.mean(signatures[i] == signatures[j]) >= threshold:
+                    parent[max(find(i), find(j))] = min(find(i), find(j))
+
+    return {i for i in range(n) if find(i) != i}
+
+def remove_near_duplicates(df, store_threshold=0.8, global_threshold=0.9, global_min_length=20, num_perm=64, bands=16):
+    """
+    복사/붙여넣기 리뷰, "맛있어요" 변형, 비슷한 이름의 가게에 중복 수집된 리뷰를 제거하는 함수.
+    1) 같은 가게 안에서 정규화 후 완전히 같은 리뷰 제거
+    2) 같은 가게 안에서 MinHash 유사도가 store_threshold 이상인 리뷰 제거
+    3) 가게와 상관없이 유사도가 global_threshold 이상인 리뷰 제거
+       ("맛있어요"처럼 짧은 흔한 문장은 가게가 달라도 겹치므로 global_min_length자 이상인 리뷰만 비교)
+    각 중복 묶음에서는 가장 먼저 나온 리뷰를 남깁니다.
+
+    Args:
+        df (pd.DataFrame): 원본 데이터프레임
+        store_threshold (float, optional): 가게별 중복 판정 유사도 (기본값 0.8)
+        global_threshold (float, optional): 전체 중복 판정 유사도 (기본값 0.9)
+        global_min_length (int, optional): 전체 비교에 포함할 최소 정규화 길이 (기본값 20)
+        num_perm (int, optional): MinHash 해시 함수 수 (기본값 64)
+        bands (int, optional): LSH 밴드 수 (기본값 16)
+    Returns:
+        pd.DataFrame: 중복/유사 리뷰가 제거된 데이터프레임
+    """
+    before = len(df)
+    normalized = df['리뷰내용'].map(normalize_for_dedup)
+
+    # 1) 가게별 완전 중복
+    exact_dup = pd.DataFrame({'store': df['가게이름'], 'text': normalized}).duplicated()
+    df, normalized = df[~exact_dup.values], normalized[~exact_dup.values]
+    exact_removed = before - len(df)
+
+    # 2) 가게별 유사 중복
+    texts = normalized.tolist()
+    signatures = minhash_signatures(texts, num_perm=num_perm)
+    store_dup = find_near_duplicates(signatures, df['가게이름'].tolist(), store_threshold, bands=bands)
+
+    # 3) 전체 유사 중복 (충분히 긴 리뷰만)
+    keep = [i for i in range(len(texts)) if i not in store_dup]
+    long_rows = [i for i in keep if len(texts[i]) >= global_min_length]
+    global_dup = {long_rows[i] for i in find_near_duplicates(
+        signatures[long_rows], [0] * len(long_rows), global_threshold, bands=bands)} if long_rows else set()
+
+    removed = store_dup | global_dup
+    df = df.iloc[[i for i in range(len(texts)) if i not in removed]]
+    print(f"[INFO] 중복 리뷰 제거: 완전 중복 {exact_removed}개 / 가게별 유사 {len(store_dup)}개 / "
+          f"전체 유사 {len(global_dup)}개 → {before}개 중 {before - len(df)}개 제거")
+    return df
+
 def classify_sentiment(score):
     """
     별점을 기반으로 sentiment를 분류하는 함수.
@@ -116,6 +251,7 @@ def preprocess_reviews(filepath):
     df = clean_text(df)
     df = remove_short_reviews(df)
     df = remove_long_reviews(df)
+    df = remove_near_duplicates(df)
     df = add_sentiment_column(df)
     df = drop_missing_values(df)
     print("[INFO] reviews 전처리 완료")
@@ -1,8 +1,11 @@
 # 파일: preprocessing/stores_menus_to_json.py
 # Description: 크롤링한 가게 정보(stores.csv)와 메뉴 정보(menus.csv)를 통합하여 store_info.json 파일로 변환하는 전처리 스크립트
+#              CSV 셀에 문자열로 저장된 리스트/딕셔너리(facilities, categories, hashtags, openhours)는
+#              여기서 한 번 파싱해 실제 JSON 배열/객체로 저장합니다.
+#              같은 내용을 챗봇이 필요한 가게만 읽어 갈 수 있도록 SQLite 카탈로그(store_catalog.db)로도 저장합니다.
 # Author: 통합버전
 # Date: 2025.04.29
-# Requirements: pandas, json
+# Requirements: pandas, json, sqlite3
 
 import sys
 import os
@@ -10,8 +13,27 @@ sys.path.append(os.path.dirname(os.path.dirname(__file__)))  # 상위 폴더 경
 
 
 import json
+import sqlite3
+from ast import literal_eval
 import pandas as pd
-from config import STORES_CSV, MENUS_CSV, STORE_INFO_JSON
+from config import STORES_CSV, MENUS_CSV, STORE_INFO_JSON, STORE_CATALOG_DB
+from chatbot.store_resolver import normalize
+
+def parse_cell(value, expected_type):
+    """
+    "['주차', '포장']" 같은 CSV 셀 문자열을 실제 리스트/딕셔너리로 변환합니다.
+    비어 있거나 형식이 맞지 않으면 빈 리스트/딕셔너리를 반환합니다.
+    """
+    if isinstance(value, expected_type):
+        return value
+    if not isinstance(value, str) or not value.strip():
+        return expected_type()
+    try:
+        parsed = literal_eval(value)
+    except (ValueError, SyntaxError):
+        print(f"[WARN] 파싱 실패, 빈 값으로 대체: {value[:50]}")
+        return expected_type()
+    return parsed if isinstance(parsed, expected_type) else expected_type()
 
 def load_and_prepare_store_info(store_path: str, menu_path: str) -> list:
     """CSV 경로를 받아 store_info_json 형태로 변환"""
@@ -24,14 +46,14 @@ def load_and_prepare_store_info(store_path: str, menu_path: str) -> list:
     result = []
     for store_id, group in grouped:
         store_info = {
-            "store_id": store_id,
+            "store_id": int(store_id),
             "store_name": group["store_name"].iloc[0],
             "address": group["address"].iloc[0],
-            "phone": group["phone"].iloc[0],
-            "openhours": group["openhours"].iloc[0],
-            "categories": group["categories"].iloc[0],
-            "facilities": group["facilities"].iloc[0],
-            "hashtags": group["hashtags"].iloc[0],
+            "phone": str(group["phone"].iloc[0]),
+            "openhours": parse_cell(group["openhours"].iloc[0], dict),
+            "categories": parse_cell(group["categories"].iloc[0], list),
+            "facilities": parse_cell(group["facilities"].iloc[0], list),
+            "hashtags": parse_cell(group["hashtags"].iloc[0], list),
             "main_image_url": group["main_image_url"].iloc[0],
             "menus": []
         }
@@ -49,6 +71,68 @@ def load_and_prepare_store_info(store_path: str, menu_path: str) -> list:
     print("[INFO] store_info_json 생성 완료")
     return result
 
+def write_store_catalog(store_info_json: list, db_path: str):
+    """
+    store_info_json을 SQLite 카탈로그로 저장합니다.
+    stores는 store_id(기본키)와 정규화 이름(name_norm) 인덱스로, menus는 store_id 인덱스로 조회합니다.
+    리스트/딕셔너리 필드는 JSON 문자열로 저장하며, 임시 파일에 쓴 뒤 교체해 읽는 쪽이 반쯤 쓰인 DB를 보지 않게 합니다.
+    """
+    tmp_path = db_path + ".tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    conn = sqlite3.connect(tmp_path)
+    conn.executescript("""
+        CREATE TABLE stores (
+            store_id INTEGER PRIMARY KEY,
+            store_name TEXT NOT NULL,
+            name_norm TEXT NOT NULL,
+            address TEXT,
+            phone TEXT,
+            openhours TEXT,
+            categories TEXT,
+            facilities TEXT,
+            hashtags TEXT,
+            main_image_url TEXT
+        );
+        CREATE TABLE menus (
+            store_id INTEGER NOT NULL,
+            position INTEGER NOT NULL,
+            menu_name TEXT,
+            price TEXT,
+            description TEXT,
+            image_url TEXT
+        );
+    """)
+
+    def dumps(value):
+        return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+    with conn:
+        conn.executemany(
+            "INSERT INTO stores VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [(
+                store["store_id"], str(store["store_name"]), normalize(str(store["store_name"])),
+                str(store["address"]), store["phone"], dumps(store["openhours"]),
+                dumps(store["categories"]), dumps(store["facilities"]), dumps(store["hashtags"]),
+                str(store["main_image_url"]),
+            ) for store in store_info_json],
+        )
+        conn.executemany(
+            "INSERT INTO menus VALUES (?, ?, ?, ?, ?, ?)",
+            [(
+                store["store_id"], position, str(menu["menu_name"]), str(menu["price"]),
+                str(menu["description"]), str(menu["image_url"]),
+            ) for store in store_info_json for position, menu in enumerate(store["menus"])],
+        )
+    conn.execute("CREATE INDEX idx_stores_name_norm ON stores(name_norm)")
+    conn.execute("CREATE INDEX idx_menus_store_id ON menus(store_id, position)")
+    conn.commit()
+    conn.execute("VACUUM")
+    conn.close()
+    os.replace(tmp_path, db_path)
+    print(f"[INFO] 가게 카탈로그 저장 완료: {db_path}")
+
 
 if __name__ == "__main__":
     store_info_json = load_and_prepare_store_info(STORES_CSV, MENUS_CSV)
@@ -57,3 +141,5 @@ if __name__ == "__main__":
         json.dump(store_info_json, f, ensure_ascii=False, indent=2)
 
     print(f"[INFO] store_info.json 저장 완료: {STORE_INFO_JSON}")
+
+    write_store_catalog(store_info_json, STORE_CATALOG_DB)
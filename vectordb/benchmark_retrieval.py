@@ -0,0 +1,134 @@
+# 파일: vectordb/benchmark_retrieval.py
+# Description: 임베딩 검색 백엔드(chroma / numpy / hnsw / int8 / binary)의 질의 지연 시간과 메모리(RSS)를 비교하는 벤치마크
+#              - 리뷰 문장 일부를 질의로 뽑아 한 번만 임베딩해 두고, 백엔드마다 별도 프로세스에서
+#                로드 전후 RSS 증가량과 질의당 지연 시간(p50/p95)을 잽니다.
+#              - 각 결과의 chroma 결과와의 top-k 일치율(overlap@k)과, numpy 전수 검색 대비 recall@k를 함께 출력합니다.
+#              - --smoke: 측정 대신 get_retriever(backend=...)로 실제 서빙 경로를 열어 백엔드마다 문서가 나오는지만 확인합니다.
+#              실행: python vectordb/benchmark_retrieval.py [--queries=N] [--k=K] [--smoke]
+# Author: 통합버전
+# Date: 2025.04.29
+# Requirements: numpy, langchain, chromadb, (선택) hnswlib
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # 상위 폴더 경로 추가
+
+import time
+import random
+import multiprocessing as mp
+import numpy as np
+from config import CHROMA_DB_DIR, VECTOR_INDEX_DIR
+
+def current_rss_mb() -> float:
+    """현재 RSS(MB). /proc이 없는 환경에서는 최대 RSS로 대신합니다."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+    except OSError:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def open_backend(backend):
+    """질의 임베딩 모델 없이 검색만 하도록 백엔드를 엽니다. (질의 벡터는 미리 계산해 넘김)"""
+    if backend == "chroma":
+        from langchain.vectorstores import Chroma
+        return Chroma(persist_directory=CHROMA_DB_DIR)
+    from vectordb.vector_index import VectorIndex
+    return VectorIndex(embeddings=None, backend=backend)
+
+def run_backend(backend, query_vectors, k, result_queue):
+    rss_before = current_rss_mb()
+    started = time.perf_counter()
+    store = open_backend(backend)
+    load_ms = (time.perf_counter() - started) * 1000
+
+    store.similarity_search_by_vector(query_vectors[0], k=k)  # 첫 호출(지연 로드) 제외
+    latencies, results = [], []
+    for vector in query_vectors:
+        started = time.perf_counter()
+        docs = store.similarity_search_by_vector(vector, k=k)
+        latencies.append((time.perf_counter() - started) * 1000)
+        results.append([doc.page_content for doc in docs])
+
+    result_queue.put({
+        "backend": backend,
+        "load_ms": load_ms,
+        "rss_mb": current_rss_mb() - rss_before,
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+        "results": results,
+    })
+
+def sample_queries(n):
+    """벡터 색인에 저장된 리뷰 중 n개를 무작위로 골라 질의로 씁니다. (짧게 잘라 실제 질문 길이에 맞춤)"""
+    import json
+    with open(os.path.join(VECTOR_INDEX_DIR, "meta.json"), "r", encoding="utf-8") as f:
+        documents = json.load(f)["documents"]
+    random.seed(0)
+    return [content[:40] for content, _ in random.sample(documents, min(n, len(documents)))]
+
+def check_serving_path(backends, query, k):
+    """
+    챗봇과 같은 경로(get_retriever → as_retriever → CachedRetriever)로 백엔드를 열어 검색 결과가 나오는지 확인합니다.
+    벤치마크는 similarity_search_by_vector를 직접 부르므로 이 경로의 오류를 잡지 못합니다.
+    질의 임베딩 모델은 한 번만 로드해 모든 백엔드가 공유합니다.
+    """
+    from vectordb.load_retriever import get_retriever, get_query_embeddings
+
+    query_embeddings = get_query_embeddings()
+    failed = []
+    for backend in backends:
+        try:
+            retriever = get_retriever(hybrid=False, backend=backend, query_embeddings=query_embeddings)
+            docs = retriever.get_relevant_documents(query, k=k)
+        except Exception as e:
+            docs, error = [], e
+        else:
+            error = None if docs else "검색 결과 없음"
+        if error:
+            failed.append(backend)
+            print(f"[WARN] {backend} 서빙 경로 실패: {error}")
+        else:
+            print(f"[INFO] {backend} 서빙 경로 확인: 문서 {len(docs)}개")
+    return failed
+
+def main():
+    args = dict(arg.lstrip("-").split("=", 1) for arg in sys.argv[1:] if "=" in arg)
+    n_queries, k = int(args.get("queries", 200)), int(args.get("k", 5))
+
+    from vectordb.vector_index import VectorIndex
+    from vectordb.load_retriever import get_query_embeddings
+
+    if "--smoke" in sys.argv:
+        backends = [b for b in ("numpy", "hnsw", "int8", "binary") if VectorIndex.exists(b)]
+        sys.exit(1 if check_serving_path(backends, sample_queries(1)[0], k) else 0)
+
+    print("[STEP] 질의 임베딩 중...")
+    queries = sample_queries(n_queries)
+    query_vectors = get_query_embeddings().embed_documents(queries)
+
+    backends = ["chroma"] + [b for b in ("numpy", "hnsw", "int8", "binary") if VectorIndex.exists(b)]
+    ctx = mp.get_context("spawn")  # 백엔드마다 새 프로세스에서 측정해 RSS가 섞이지 않게 함
+    reports = {}
+    for backend in backends:
+        print(f"[STEP] {backend} 측정 중...")
+        result_queue = ctx.Queue()
+        process = ctx.Process(target=run_backend, args=(backend, query_vectors, k, result_queue))
+        process.start()
+        reports[backend] = result_queue.get()
+        process.join()
+
+    def agreement(results, reference):
+        return np.mean([len(set(a) & set(b)) / max(len(b), 1) for a, b in zip(results, reference)])
+
+    baseline = reports["chroma"]["results"]
+    exact = reports["numpy"]["results"] if "numpy" in reports else None
+    print(f"\n질의 {len(queries)}개, k={k}")
+    print(f"{'backend':<8} {'load(ms)':>9} {'RSS(MB)':>8} {'p50(ms)':>8} {'p95(ms)':>8} {'overlap@k':>10} {'recall@k':>9}")
+    for backend, r in reports.items():
+        overlap = agreement(r["results"], baseline)
+        recall = f"{agreement(r['results'], exact):>9.3f}" if exact is not None else f"{'-':>9}"
+        print(f"{backend:<8} {r['load_ms']:>9.0f} {r['rss_mb']:>8.1f} {r['p50_ms']:>8.2f} {r['p95_ms']:>8.2f} {overlap:>10.3f} {recall}")
+
+if __name__ == "__main__":
+    main()
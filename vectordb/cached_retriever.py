@@ -0,0 +1,131 @@
+# 파일: vectordb/cached_retriever.py
+# Description: get_retriever가 만든 Retriever 앞에 두는 캐시 래퍼
+#              - 정규화된 질문 → 질의 임베딩, (질문, k, filter) → 검색 결과 문서를 크기 제한 LRU + TTL로 메모이즈합니다.
+#              - embed_reviews.py가 인덱스를 갱신하면 기록하는 버전 파일(CHROMA_INDEX_VERSION_FILE)이 바뀌면 캐시를 비웁니다.
+#              - hit/miss 횟수를 stats()로 제공합니다.
+# Author: 통합버전
+# Date: 2025.04.29
+# Requirements: langchain
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))  # 상위 폴더 경로 추가
+
+import json
+import time
+import threading
+from collections import OrderedDict
+from config import CHROMA_INDEX_VERSION_FILE, RETRIEVER_CACHE_SIZE, RETRIEVER_CACHE_TTL
+from vectordb.embedding_cache import normalize_text
+
+def normalize_query(query: str) -> str:
+    return normalize_text(query).lower()
+
+def read_index_version(path=CHROMA_INDEX_VERSION_FILE):
+    """인덱스 버전 파일의 내용. 파일이 없으면 None"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        return None
+
+def to_chroma_where(filter):
+    """{"store_name": ..., "sentiment": ...} 같은 단순 일치 조건을 Chroma where 형식으로 바꿉니다. (조건이 둘 이상이면 $and)"""
+    if not filter or len(filter) == 1 or any(key.startswith("$") for key in filter):
+        return filter or None
+    return {"$and": [{key: value} for key, value in filter.items()]}
+
+class LRUCache:
+    """스레드 안전한 크기 제한 LRU 캐시. ttl(초)이 지난 항목은 조회 시 만료 처리됩니다."""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.data = OrderedDict()  # key → (저장 시각, 값)
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self.lock:
+            item = self.data.get(key)
+            if item is None or time.monotonic() - item[0] > self.ttl:
+                if item is not None:
+                    del self.data[key]
+                self.misses += 1
+                return None
+            self.data.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def put(self, key, value):
+        with self.lock:
+            self.data[key] = (time.monotonic(), value)
+            self.data.move_to_end(key)
+            while len(self.data) > self.maxsize:
+                self.data.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.data.clear()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "size": len(self.data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+class CachedRetriever:
+    """
+    VectorStoreRetriever를 감싸 질의 임베딩과 검색 결과를 캐시합니다.
+    get_relevant_documents(query)는 기존 Retriever와 같은 방식으로 쓸 수 있고,
+    k와 filter(Chroma where 조건)를 호출마다 바꿔 줄 수도 있습니다.
+    """
+
+    def __init__(self, retriever, maxsize=RETRIEVER_CACHE_SIZE, ttl=RETRIEVER_CACHE_TTL):
+        self.retriever = retriever
+        self.vectorstore = retriever.vectorstore
+        self.search_kwargs = dict(retriever.search_kwargs)
+        self.embedding_cache = LRUCache(maxsize, ttl)
+        self.result_cache = LRUCache(maxsize, ttl)
+        self.index_version = read_index_version()
+
+    def _check_index_version(self):
+        """인덱스가 다시 만들어졌으면 두 캐시를 모두 비웁니다."""
+        version = read_index_version()
+        if version != self.index_version:
+            self.embedding_cache.clear()
+            self.result_cache.clear()
+            self.index_version = version
+            print("[INFO] 벡터 인덱스가 갱신되어 Retriever 캐시를 비웠습니다.")
+
+    def embed_query(self, query: str):
+        key = normalize_query(query)
+        embedding = self.embedding_cache.get(key)
+        if embedding is None:
+            embedding = self.vectorstore.embeddings.embed_query(normalize_text(query))
+            self.embedding_cache.put(key, embedding)
+        return embedding
+
+    def get_relevant_documents(self, query: str, k=None, filter=None):
+        self._check_index_version()
+        k = k or self.search_kwargs.get("k", 4)
+        filter = filter if filter is not None else self.search_kwargs.get("filter")
+        key = (normalize_query(query), k, json.dumps(filter, sort_keys=True, ensure_ascii=False))
+
+        docs = self.result_cache.get(key)
+        if docs is None:
+            docs = self.vectorstore.similarity_search_by_vector(self.embed_query(query), k=k, filter=to_chroma_where(filter))
+            self.result_cache.put(key, docs)
+        return list(docs)
+
+    invoke = get_relevant_documents
+
+    def stats(self):
+        return {
+            "embedding": self.embedding_cache.stats(),
+            "result": self.result_cache.stats(),
+        }
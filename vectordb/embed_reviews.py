@@ -1,5 +1,14 @@
 # 파일: vectordb/embed_reviews.py
 # Description: 전처리된 리뷰 데이터를 불러와 HuggingFace 임베딩 모델을 사용해 임베딩한 후 ChromaDB에 저장하는 스크립트
+#              - 문서마다 내용 해시 기반의 고정 id를 부여해, 기존 컬렉션과 비교 후 새로 생기거나 바뀐 리뷰만 임베딩(upsert)하고
+#                CSV에서 사라진 리뷰는 삭제합니다.
+#              - 임베딩은 embedding_engine.BatchedEmbeddings(길이 버킷 배치 + 멀티프로세스)로 수행하며,
+#                앞에 영구 임베딩 캐시를 두어 이전에 임베딩한 텍스트는 모델을 다시 호출하지 않습니다.
+#              - 같은 문서로 문자 n-gram BM25 어휘 색인(lexical_index)도 만들어 하이브리드 검색에 씁니다.
+#              - Chroma에 저장된 벡터로 Chroma 대체 백엔드용 벡터 색인(vector_index: float32/int8/binary .npy, HNSW)도 만듭니다.
+#                벡터 색인을 처음부터 만들었거나 --recall 옵션을 주면, 챗봇이 질의 임베딩 캐시에 쌓은 실제 사용자 질문으로
+#                양자화 백엔드의 recall을 측정합니다. (모델 호출 없음)
+#              실행: python vectordb/embed_reviews.py [--recall]
 # Author: 통합버전
 # Date: 2025.04.29
 # Requirements: pandas, langchain, chromadb, huggingface_hub
@@ -9,11 +18,20 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))  # 상위 폴더 경로 추가
 
 import os
+import json
+import time
+import hashlib
 import pandas as pd
 from langchain.schema import Document
-from langchain.embeddings import HuggingFaceEmbeddings
 from langchain.vectorstores import Chroma
-from config import REVIEW_FINAL_CSV, CHROMA_DB_DIR  # 경로 설정 불러오기
+from config import (  # 경로 설정 불러오기
+    REVIEW_FINAL_CSV, CHROMA_DB_DIR, EMBEDDING_MODEL_NAME, EMBED_BACKEND, EMBED_CACHE_MAX_DOCUMENTS, EMBED_CACHE_MAX_QUERIES,
+    CHROMA_INDEX_VERSION_FILE,
+)
+from vectordb.embedding_engine import BatchedEmbeddings
+from vectordb.embedding_cache import EmbeddingCache, CachedEmbeddings
+from vectordb.lexical_index import LexicalIndex
+from vectordb.vector_index import VectorIndex, build_vector_index, report_quantized_recall
 
 def load_reviews(csv_path: str) -> pd.DataFrame:
     if not os.path.exists(csv_path):
@@ -38,11 +56,84 @@ def create_documents(df: pd.DataFrame) -> list[Document]:
         docs.append(doc)
     return docs
 
-def embed_and_save(documents: list[Document], save_dir: str):
-    embedding_model = HuggingFaceEmbeddings(model_name="BAAI/bge-m3")
-    db = Chroma.from_documents(documents, embedding=embedding_model, persist_directory=save_dir)
+def document_id(doc: Document) -> str:
+    """page_content와 metadata로 만든 내용 해시. 내용이 같으면 실행마다 같은 id가 나옵니다."""
+    payload = json.dumps([doc.page_content, doc.metadata], ensure_ascii=False, sort_keys=True)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+def write_index_version():
+    """인덱스가 바뀌었음을 서빙 프로세스(Retriever 캐시 등)에 알리기 위해 버전 파일을 갱신합니다."""
+    with open(CHROMA_INDEX_VERSION_FILE, "w", encoding="utf-8") as f:
+        f.write(str(time.time_ns()))
+
+def load_recall_queries(n: int = 200):
+    """
+    양자화 recall 측정용 질의 벡터. 서빙 중인 챗봇이 질의 임베딩 캐시(queries)에 쌓은 실제 사용자 질문에서 뽑습니다.
+    색인된 리뷰 문장이 아니므로 질의가 자기 자신을 찾는 일이 없고, 이미 임베딩되어 있어 모델을 부르지 않습니다.
+    """
+    cache = EmbeddingCache("queries", model_name=EMBEDDING_MODEL_NAME, max_entries=EMBED_CACHE_MAX_QUERIES, readonly=True)
+    return cache.sample(n)
+
+def embed_and_save(documents: list[Document], save_dir: str, batch_size: int = 1000, check_recall: bool = False):
+    """
+    기존 컬렉션과 id를 비교해 바뀐 부분만 반영합니다.
+    - 새로 생기거나 내용이 바뀐 리뷰: 임베딩 후 추가
+    - CSV에서 사라진 리뷰(또는 id 없이 저장된 예전 문서): 삭제
+    벡터 색인을 처음 만들었거나 check_recall이면 양자화 백엔드의 recall을 측정합니다.
+    """
+    engine = BatchedEmbeddings()
+    # 백엔드(torch / onnx-int8)마다 벡터가 조금씩 다르므로 캐시 키에 포함
+    cache = EmbeddingCache("documents", model_name=f"{EMBEDDING_MODEL_NAME}:{EMBED_BACKEND}",
+                           max_entries=EMBED_CACHE_MAX_DOCUMENTS)
+    embedding_model = CachedEmbeddings(engine, cache)
+    db = Chroma(persist_directory=save_dir, embedding_function=embedding_model)
+
+    # 같은 리뷰가 CSV에 여러 번 있으면 하나만 남김
+    docs_by_id = {}
+    for doc in documents:
+        docs_by_id.setdefault(document_id(doc), doc)
+
+    existing_ids = set(db.get(include=[])["ids"])
+    new_ids = [doc_id for doc_id in docs_by_id if doc_id not in existing_ids]
+    stale_ids = list(existing_ids - docs_by_id.keys())
+
+    for start in range(0, len(stale_ids), batch_size):
+        db.delete(ids=stale_ids[start:start + batch_size])
+
+    for start in range(0, len(new_ids), batch_size):
+        batch_ids = new_ids[start:start + batch_size]
+        db.add_documents([docs_by_id[doc_id] for doc_id in batch_ids], ids=batch_ids)
+
     db.persist()
-    print(f"[INFO] ChromaDB에 {len(documents)}개 문서를 저장했습니다 → {save_dir}")
+
+    # 어휘 색인은 전체 문서로 매번 다시 만듭니다. (임베딩이 없어 빠름)
+    ids = sorted(docs_by_id)
+    if new_ids or stale_ids or not LexicalIndex.exists():
+        LexicalIndex.build(ids, [docs_by_id[doc_id] for doc_id in ids]).save()
+
+    # 벡터 색인은 다시 임베딩하지 않고 Chroma에 저장된 벡터를 꺼내 만듭니다.
+    rebuild = not VectorIndex.exists()
+    if ids and (new_ids or stale_ids or rebuild):
+        vectors_by_id = {}
+        for start in range(0, len(ids), batch_size):
+            result = db.get(ids=ids[start:start + batch_size], include=["embeddings"])
+            vectors_by_id.update(zip(result["ids"], result["embeddings"]))
+        build_vector_index(ids, [docs_by_id[doc_id] for doc_id in ids], [vectors_by_id[doc_id] for doc_id in ids])
+
+    if ids and (rebuild or check_recall):
+        query_vectors = load_recall_queries()
+        if len(query_vectors):
+            report_quantized_recall(query_vectors=query_vectors)
+        else:
+            print("[INFO] 저장된 사용자 질문이 없어 양자화 recall 측정을 건너뜁니다. 챗봇 사용 후 --recall로 다시 실행하세요.")
+
+    if new_ids or stale_ids:
+        write_index_version()
+    engine.report()
+    engine.close()
+    print(f"[INFO] 임베딩 캐시: {cache.stats()}")
+    print(f"[INFO] ChromaDB 갱신 완료 → {save_dir} "
+          f"(전체 {len(docs_by_id)}개 / 추가 {len(new_ids)}개 / 삭제 {len(stale_ids)}개 / 유지 {len(docs_by_id) - len(new_ids)}개)")
 
 def main():
     print("[STEP] 전처리된 리뷰 데이터 불러오는 중...")
@@ -52,7 +143,7 @@ def main():
     documents = create_documents(df)
 
     print("[STEP] 리뷰 임베딩 및 ChromaDB 저장 중...")
-    embed_and_save(documents, CHROMA_DB_DIR)
+    embed_and_save(documents, CHROMA_DB_DIR, check_recall="--recall" in sys.argv)
 
 if __name__ == "__main__":
     main()
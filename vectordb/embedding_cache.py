@@ -0,0 +1,278 @@
+# 파일: vectordb/embedding_cache.py
+# Description: (모델 이름, 정규화된 텍스트 해시)를 키로 임베딩 벡터를 디스크에 저장하는 영구 캐시
+#              - 벡터는 memory-mapped float32 배열(vectors.f32)에, 키 → 행 번호는 인덱스 파일(index.json)에 저장합니다.
+#              - 최대 항목 수를 넘으면 가장 오래 사용하지 않은 항목부터 제거합니다.
+#              - 인덱스에 기록된 모델 이름이나 차원이 다르면 캐시 전체를 무효화합니다.
+#              인덱싱(embed_reviews.py)과 서빙(load_retriever.py)이 같은 구현을 쓰되 namespace(documents / queries)별로
+#              디렉토리를 나누고, 한 디렉토리에는 lock을 잡은 프로세스 하나만 쓰고 나머지는 읽기 전용으로 엽니다.
+#              각 행에는 키 해시(keys.u64)를 함께 기록해, 다른 프로세스가 덮어쓴 행은 읽을 때 miss로 처리합니다.
+#              캐시를 새로 만들 때는 임시 파일을 만든 뒤 교체해, 기존 파일을 mmap 중인 읽기 전용 프로세스가 잘린 파일을 읽지 않게 하고,
+#              읽기 전용 프로세스는 index.json이 바뀌면(최대 RELOAD_CHECK_INTERVAL초마다 확인) 인덱스를 다시 읽고 파일을 다시 mmap합니다.
+# Author: 통합버전
+# Date: 2025.04.29
+# Requirements: numpy, langchain
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))  # 상위 폴더 경로 추가
+
+import json
+import time
+import fcntl
+import atexit
+import hashlib
+import threading
+import unicodedata
+import numpy as np
+from langchain.embeddings.base import Embeddings
+from config import EMBED_CACHE_DIR, EMBEDDING_MODEL_NAME
+
+RELOAD_CHECK_INTERVAL = 1.0  # 읽기 전용 프로세스가 index.json 변경을 확인하는 최소 간격(초)
+
+def normalize_text(text: str) -> str:
+    """유니코드 정규화(NFC) + 공백 정리. 표기만 다른 같은 문장이 같은 키를 갖도록 합니다."""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+def text_key(text: str) -> str:
+    return hashlib.sha1(normalize_text(text).encode("utf-8")).hexdigest()
+
+def key_fingerprint(key: str) -> int:
+    """keys.u64에 기록할 키 해시 앞 64비트"""
+    return int(key[:16], 16)
+
+class EmbeddingCache:
+    """
+    memmap 벡터 배열 + JSON 인덱스로 이루어진 크기 제한 LRU 임베딩 캐시.
+
+    Args:
+        namespace (str): EMBED_CACHE_DIR 아래 하위 디렉토리 이름
+        model_name (str): 임베딩 모델 이름. 바뀌면 캐시가 초기화됩니다.
+        max_entries (int): 저장할 최대 벡터 수
+        readonly (bool): True면 쓰기 lock을 잡지 않고 읽기 전용으로 엽니다. (다른 프로세스의 캐시를 읽기만 할 때)
+    """
+
+    def __init__(self, namespace, model_name=EMBEDDING_MODEL_NAME, max_entries=100_000, readonly=False):
+        self.dir = os.path.join(EMBED_CACHE_DIR, namespace)
+        self.index_path = os.path.join(self.dir, "index.json")
+        self.vectors_path = os.path.join(self.dir, "vectors.f32")
+        self.keys_path = os.path.join(self.dir, "keys.u64")
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.dirty = False
+
+        self.dim = None
+        self.vectors = None
+        self.row_keys = None
+        self.entries = {}      # key → [행 번호, 마지막 사용 시각]
+        self.free_rows = []
+        self.index_mtime = None
+        self.next_reload_check = 0.0
+        self.hits = 0
+        self.misses = 0
+
+        # 쓰기 lock을 못 잡으면 (다른 프로세스가 쓰는 중) 읽기 전용으로 동작
+        os.makedirs(self.dir, exist_ok=True)
+        self.lock_file = None
+        self.readonly = True
+        if not readonly:
+            self.lock_file = open(os.path.join(self.dir, "write.lock"), "w")
+            try:
+                fcntl.flock(self.lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                self.readonly = False
+            except OSError:
+                pass
+        self._load()
+
+    # ----------------------------
+    # 저장/로드
+    # ----------------------------
+
+    def _load(self):
+        try:
+            self.index_mtime = os.stat(self.index_path).st_mtime_ns
+        except FileNotFoundError:
+            return
+        with open(self.index_path, "r", encoding="utf-8") as f:
+            index = json.load(f)
+
+        if (index.get("model_name") != self.model_name
+                or index.get("max_entries") != self.max_entries
+                or not os.path.exists(self.vectors_path)
+                or not os.path.exists(self.keys_path)):
+            print(f"[INFO] 임베딩 캐시 무효화 (모델/설정 변경): {self.dir}")
+            return
+
+        mode = "r" if self.readonly else "r+"
+        try:
+            vectors = np.memmap(self.vectors_path, dtype=np.float32, mode=mode, shape=(self.max_entries, index["dim"]))
+            row_keys = np.memmap(self.keys_path, dtype=np.uint64, mode=mode, shape=(self.max_entries,))
+        except ValueError:  # 파일 크기가 인덱스와 맞지 않음 (다른 프로세스가 교체하는 중)
+            print(f"[WARN] 임베딩 캐시 파일 크기가 맞지 않아 무시합니다: {self.dir}")
+            return
+        self.dim = index["dim"]
+        self.entries = index["entries"]
+        self.vectors = vectors
+        self.row_keys = row_keys
+        used = {row for row, _ in self.entries.values()}
+        self.free_rows = [row for row in range(self.max_entries - 1, -1, -1) if row not in used]
+
+    def _maybe_reload(self):
+        """(읽기 전용, lock 안에서 호출) 쓰는 프로세스가 index.json을 갱신했으면 인덱스를 다시 읽고 다시 mmap합니다."""
+        now = time.monotonic()
+        if not self.readonly or now < self.next_reload_check:
+            return
+        self.next_reload_check = now + RELOAD_CHECK_INTERVAL
+        try:
+            mtime = os.stat(self.index_path).st_mtime_ns
+        except FileNotFoundError:
+            return
+        if mtime != self.index_mtime:
+            self._load()
+
+    def _create(self, dim):
+        """
+        빈 배열 파일을 임시 이름으로 만든 뒤 교체합니다.
+        기존 파일을 mmap 중인 읽기 전용 프로세스는 이전 파일(inode)을 계속 보므로 잘린 파일을 읽지 않습니다.
+        """
+        for path, dtype, shape in ((self.vectors_path, np.float32, (self.max_entries, dim)),
+                                   (self.keys_path, np.uint64, (self.max_entries,))):
+            tmp_path = path + ".tmp"
+            np.memmap(tmp_path, dtype=dtype, mode="w+", shape=shape).flush()
+            os.replace(tmp_path, path)
+
+        self.dim = dim
+        self.entries = {}
+        self.free_rows = list(range(self.max_entries - 1, -1, -1))
+        self.vectors = np.memmap(self.vectors_path, dtype=np.float32, mode="r+", shape=(self.max_entries, dim))
+        self.row_keys = np.memmap(self.keys_path, dtype=np.uint64, mode="r+", shape=(self.max_entries,))
+        self.dirty = True
+
+    def flush(self):
+        """벡터 배열과 인덱스를 디스크에 기록합니다. 인덱스는 임시 파일에 쓴 뒤 교체합니다."""
+        with self.lock:
+            if self.readonly or not self.dirty or self.vectors is None:
+                return
+            self.vectors.flush()
+            self.row_keys.flush()
+            tmp_path = self.index_path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({
+                    "model_name": self.model_name,
+                    "dim": self.dim,
+                    "max_entries": self.max_entries,
+                    "entries": self.entries,
+                }, f)
+            os.replace(tmp_path, self.index_path)
+            self.dirty = False
+
+    # ----------------------------
+    # 조회/저장
+    # ----------------------------
+
+    def get_many(self, texts):
+        """각 텍스트의 캐시된 벡터(np.ndarray) 또는 None 목록"""
+        now = time.time()
+        results = []
+        with self.lock:
+            self._maybe_reload()
+            for text in texts:
+                key = text_key(text)
+                entry = self.entries.get(key)
+                if entry is None or self.row_keys is None or self.row_keys[entry[0]] != key_fingerprint(key):
+                    self.misses += 1
+                    results.append(None)
+                    continue
+                self.hits += 1
+                entry[1] = now
+                results.append(np.array(self.vectors[entry[0]]))
+        return results
+
+    def put_many(self, texts, vectors):
+        if self.readonly:
+            return
+        now = time.time()
+        with self.lock:
+            for text, vector in zip(texts, vectors):
+                vector = np.asarray(vector, dtype=np.float32)
+                if self.vectors is None:
+                    self._create(vector.shape[0])
+                key = text_key(text)
+                entry = self.entries.get(key)
+                if entry is None:
+                    if not self.free_rows:
+                        self._evict()
+                    entry = [self.free_rows.pop(), now]
+                    self.entries[key] = entry
+                entry[1] = now
+                self.vectors[entry[0]] = vector
+                self.row_keys[entry[0]] = key_fingerprint(key)
+            self.dirty = True
+
+    def sample(self, n, seed=0) -> np.ndarray:
+        """저장된 벡터 중 최대 n개를 무작위로 (키 해시가 맞는 행만). 예: 챗봇이 쌓은 실제 질문 임베딩"""
+        with self.lock:
+            self._maybe_reload()
+            if self.row_keys is None:
+                return np.zeros((0, 0), dtype=np.float32)
+            rows = [row for key, (row, _) in self.entries.items() if self.row_keys[row] == key_fingerprint(key)]
+            if not rows:
+                return np.zeros((0, self.dim), dtype=np.float32)
+            rng = np.random.default_rng(seed)
+            rows = sorted(rng.choice(rows, size=min(n, len(rows)), replace=False).tolist())
+            return np.array(self.vectors[rows])
+
+    def _evict(self, fraction=0.1):
+        """가장 오래 사용하지 않은 항목을 max_entries의 10%만큼 제거합니다. (lock 안에서 호출)"""
+        count = max(1, int(self.max_entries * fraction))
+        oldest = sorted(self.entries.items(), key=lambda item: item[1][1])[:count]
+        for key, (row, _) in oldest:
+            del self.entries[key]
+            self.free_rows.append(row)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "readonly": self.readonly,
+            "entries": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+class CachedEmbeddings(Embeddings):
+    """
+    다른 Embeddings 앞에 EmbeddingCache를 두는 래퍼.
+    캐시에 없는 텍스트만 실제 모델로 임베딩하고 결과를 캐시에 저장합니다.
+    """
+
+    def __init__(self, base: Embeddings, cache: EmbeddingCache, flush_every: int = 50):
+        self.base = base
+        self.cache = cache
+        self.flush_every = flush_every
+        self.pending = 0
+        atexit.register(cache.flush)
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        cached = self.cache.get_many(texts)
+        missing = [i for i, vector in enumerate(cached) if vector is None]
+        if missing:
+            new_vectors = self.base.embed_documents([texts[i] for i in missing])
+            self.cache.put_many([texts[i] for i in missing], new_vectors)
+            for i, vector in zip(missing, new_vectors):
+                cached[i] = vector
+            self.cache.flush()
+        return [list(map(float, vector)) for vector in cached]
+
+    def embed_query(self, text: str) -> list[float]:
+        cached = self.cache.get_many([text])[0]
+        if cached is not None:
+            return cached.tolist()
+
+        vector = self.base.embed_query(text)
+        self.cache.put_many([text], [vector])
+        self.pending += 1
+        if self.pending >= self.flush_every:
+            self.cache.flush()
+            self.pending = 0
+        return vector
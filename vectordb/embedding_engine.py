@@ -0,0 +1,148 @@
+# 파일: vectordb/embedding_engine.py
+# Description: GPU 없는 다코어 인덱싱 서버에서 리뷰를 빠르게 임베딩하기 위한 배치 임베딩 엔진
+#              - 문서를 길이순으로 정렬해 비슷한 길이끼리 배치를 만들어 패딩 낭비를 줄이고,
+#              - 배치를 여러 워커 프로세스에 나눠 임베딩한 뒤 원래 순서로 되돌립니다.
+#              - 선택적으로 bge-m3를 int8 동적 양자화 ONNX 백엔드로 실행합니다.
+#              - 처리량(docs/sec)과 최대 메모리(peak RSS)를 출력합니다.
+#              LangChain Embeddings 인터페이스를 구현하므로 Chroma에 그대로 넘길 수 있습니다.
+# Author: 통합버전
+# Date: 2025.04.29
+# Requirements: sentence-transformers, langchain, (선택) optimum[onnxruntime]
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))  # 상위 폴더 경로 추가
+
+import time
+import resource
+import multiprocessing as mp
+from langchain.embeddings.base import Embeddings
+from config import (
+    EMBEDDING_MODEL_NAME, EMBED_WORKERS, EMBED_BATCH_SIZE,
+    EMBED_MAX_SEQ_LENGTH, EMBED_BACKEND, EMBED_ONNX_DIR,
+)
+
+# ----------------------------
+# 1. 모델 로드
+# ----------------------------
+
+def load_sentence_model(model_name=EMBEDDING_MODEL_NAME, backend=EMBED_BACKEND, max_seq_length=EMBED_MAX_SEQ_LENGTH):
+    """
+    SentenceTransformer 모델을 로드합니다.
+    backend가 "onnx-int8"이면 EMBED_ONNX_DIR에 양자화된 ONNX 모델을 한 번 만들어 두고 재사용합니다.
+    """
+    from sentence_transformers import SentenceTransformer
+
+    if backend == "onnx-int8":
+        quantized_file = "onnx/model_qint8_avx512_vnni.onnx"
+        if not os.path.exists(os.path.join(EMBED_ONNX_DIR, quantized_file)):
+            from sentence_transformers import export_dynamic_quantized_onnx_model
+            print(f"[INFO] int8 ONNX 모델 생성 중 → {EMBED_ONNX_DIR}")
+            model = SentenceTransformer(model_name, backend="onnx")
+            model.save_pretrained(EMBED_ONNX_DIR)
+            export_dynamic_quantized_onnx_model(model, "avx512_vnni", EMBED_ONNX_DIR)
+        model = SentenceTransformer(EMBED_ONNX_DIR, backend="onnx", model_kwargs={"file_name": quantized_file})
+    else:
+        model = SentenceTransformer(model_name)
+
+    model.max_seq_length = max_seq_length
+    return model
+
+# ----------------------------
+# 2. 워커 프로세스
+# ----------------------------
+
+_worker_model = None
+
+def _init_worker(model_name, backend, max_seq_length, threads_per_worker):
+    """워커마다 모델을 한 번만 로드하고, 코어를 워커 수만큼 나눠 씁니다."""
+    global _worker_model
+    import torch
+    torch.set_num_threads(threads_per_worker)
+    _worker_model = load_sentence_model(model_name, backend, max_seq_length)
+
+def _encode_batch(job):
+    """(배치 순번, 텍스트 목록) → (배치 순번, 벡터 목록, 워커 peak RSS(KB))"""
+    batch_no, texts = job
+    vectors = _worker_model.encode(texts, batch_size=len(texts), normalize_embeddings=True)
+    return batch_no, vectors.tolist(), resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+# ----------------------------
+# 3. 배치 임베딩 엔진
+# ----------------------------
+
+def make_length_buckets(texts, batch_size):
+    """텍스트를 길이순으로 정렬한 뒤 batch_size씩 잘라 [(원래 인덱스 목록), ...]을 만듭니다."""
+    order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+    return [order[start:start + batch_size] for start in range(0, len(order), batch_size)]
+
+class BatchedEmbeddings(Embeddings):
+    """
+    길이 버킷 배치 + 멀티프로세스 워커 풀로 문서를 임베딩하는 LangChain Embeddings 구현.
+    워커 풀은 처음 embed_documents를 호출할 때 만들어지고 close()까지 재사용됩니다.
+    """
+
+    def __init__(self, model_name=EMBEDDING_MODEL_NAME, workers=EMBED_WORKERS, batch_size=EMBED_BATCH_SIZE,
+                 max_seq_length=EMBED_MAX_SEQ_LENGTH, backend=EMBED_BACKEND):
+        self.model_name = model_name
+        self.workers = workers
+        self.batch_size = batch_size
+        self.max_seq_length = max_seq_length
+        self.backend = backend
+        self.pool = None
+        self.query_model = None
+        self.total_docs = 0
+        self.total_seconds = 0.0
+        self.peak_worker_rss_kb = 0
+
+    def _get_pool(self):
+        if self.pool is None:
+            threads_per_worker = max(1, (os.cpu_count() or 1) // self.workers)
+            ctx = mp.get_context("spawn")  # torch/토크나이저 스레드와 fork가 충돌하지 않도록 spawn 사용
+            self.pool = ctx.Pool(
+                self.workers,
+                initializer=_init_worker,
+                initargs=(self.model_name, self.backend, self.max_seq_length, threads_per_worker),
+            )
+        return self.pool
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        if not texts:
+            return []
+
+        start = time.perf_counter()
+        buckets = make_length_buckets(texts, self.batch_size)
+        jobs = [(batch_no, [texts[i] for i in bucket]) for batch_no, bucket in enumerate(buckets)]
+
+        vectors = [None] * len(texts)
+        for batch_no, batch_vectors, worker_rss_kb in self._get_pool().imap_unordered(_encode_batch, jobs):
+            for i, vector in zip(buckets[batch_no], batch_vectors):
+                vectors[i] = vector
+            self.peak_worker_rss_kb = max(self.peak_worker_rss_kb, worker_rss_kb)
+
+        elapsed = time.perf_counter() - start
+        self.total_docs += len(texts)
+        self.total_seconds += elapsed
+        print(f"[INFO] {len(texts)}개 임베딩 완료: {len(texts) / elapsed:.1f} docs/sec "
+              f"(워커 {self.workers}개, 배치 {self.batch_size}, 백엔드 {self.backend})")
+        return vectors
+
+    def embed_query(self, text: str) -> list[float]:
+        # 단건 질의는 워커 풀을 거치지 않고 메인 프로세스 모델로 처리
+        if self.query_model is None:
+            self.query_model = load_sentence_model(self.model_name, self.backend, self.max_seq_length)
+        return self.query_model.encode(text, normalize_embeddings=True).tolist()
+
+    def report(self):
+        """누적 처리량과 최대 메모리 사용량을 출력합니다."""
+        main_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        worker_rss_mb = self.peak_worker_rss_kb / 1024
+        throughput = self.total_docs / self.total_seconds if self.total_seconds else 0.0
+        print(f"[INFO] 임베딩 통계: 총 {self.total_docs}개, {throughput:.1f} docs/sec, "
+              f"peak RSS 메인 {main_rss_mb:.0f}MB / 워커당 {worker_rss_mb:.0f}MB")
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
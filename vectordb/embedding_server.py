@@ -0,0 +1,183 @@
+# 파일: vectordb/embedding_server.py
+# Description: bge-m3 모델 하나를 메모리에 올려두고 여러 Gradio 워커 프로세스에 질의 임베딩을 제공하는 로컬 임베딩 서버
+#              - Unix 소켓(EMBED_SERVER_SOCKET)으로 줄 단위 JSON 요청 {"texts": [...]}을 받아 {"vectors": [...]}로 응답합니다.
+#              - 몇 ms(EMBED_SERVER_MAX_WAIT_MS) 안에 들어온 요청들을 한 배치로 묶어 모델을 한 번만 호출합니다.
+#              - EmbeddingServiceClient는 이 서버를 쓰는 LangChain Embeddings 구현으로, get_retriever에서 사용합니다.
+#              실행: python vectordb/embedding_server.py  (챗봇은 USE_EMBED_SERVER=1 환경변수로 서버 사용)
+# Author: 통합버전
+# Date: 2025.04.29
+# Requirements: sentence-transformers, langchain
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # 상위 폴더 경로 추가
+
+import json
+import time
+import socket
+import asyncio
+import threading
+from langchain.embeddings.base import Embeddings
+from config import EMBED_SERVER_SOCKET, EMBED_SERVER_MAX_BATCH, EMBED_SERVER_MAX_WAIT_MS
+
+# ----------------------------
+# 1. 서버: 동적 마이크로 배칭
+# ----------------------------
+
+class MicroBatcher:
+    """
+    요청 텍스트를 큐에 모았다가, 첫 요청 이후 max_wait_ms 동안 또는 max_batch개가 찰 때까지 기다려
+    한 번에 임베딩합니다. 모델 호출은 별도 스레드에서 실행해 이벤트 루프를 막지 않습니다.
+    """
+
+    def __init__(self, model, max_batch=EMBED_SERVER_MAX_BATCH, max_wait_ms=EMBED_SERVER_MAX_WAIT_MS):
+        self.model = model
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.queue = asyncio.Queue()
+        self.batches = 0
+        self.texts = 0
+
+    async def embed(self, texts):
+        loop = asyncio.get_running_loop()
+        futures = []
+        for text in texts:
+            future = loop.create_future()
+            await self.queue.put((text, future))
+            futures.append(future)
+        return await asyncio.gather(*futures)
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            texts = [text for text, _ in batch]
+            try:
+                vectors = await loop.run_in_executor(
+                    None, lambda: self.model.encode(texts, batch_size=len(texts), normalize_embeddings=True)
+                )
+                for (_, future), vector in zip(batch, vectors):
+                    if not future.done():  # 클라이언트 연결이 끊겨 취소된 요청은 건너뜀
+                        future.set_result(vector.tolist())
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+            self.batches += 1
+            self.texts += len(texts)
+            if self.batches % 100 == 0:
+                print(f"[INFO] 배치 {self.batches}회, 평균 배치 크기 {self.texts / self.batches:.1f}")
+
+async def serve(socket_path=EMBED_SERVER_SOCKET):
+    from vectordb.embedding_engine import load_sentence_model
+
+    # 이전 서버가 비정상 종료하며 남긴 소켓 파일은 모델 로드 전에 지워, 그동안 클라이언트가 준비된 것으로 착각하지 않게 함
+    if os.path.exists(socket_path):
+        os.remove(socket_path)
+
+    print("[STEP] 임베딩 모델 로드 중...")
+    model = load_sentence_model(backend="torch")
+    batcher = MicroBatcher(model)
+
+    async def handle_client(reader, writer):
+        # 연결 하나로 여러 요청을 순서대로 처리 (클라이언트는 연결을 재사용)
+        try:
+            while line := await reader.readline():
+                try:
+                    request = json.loads(line)
+                    response = {"vectors": await batcher.embed(request["texts"])}
+                except Exception as e:
+                    response = {"error": str(e)}
+                writer.write(json.dumps(response).encode("utf-8") + b"\n")
+                await writer.drain()
+        finally:
+            writer.close()
+
+    if os.path.exists(socket_path):
+        os.remove(socket_path)
+    server = await asyncio.start_unix_server(handle_client, path=socket_path, limit=2 ** 24)
+    print(f"[INFO] 임베딩 서버 시작 → {socket_path}")
+    async with server:
+        await asyncio.gather(server.serve_forever(), batcher.run())
+
+# ----------------------------
+# 2. 클라이언트: LangChain Embeddings 어댑터
+# ----------------------------
+
+class EmbeddingServiceClient(Embeddings):
+    """
+    로컬 임베딩 서버를 호출하는 Embeddings 구현.
+    스레드마다 소켓 연결 하나를 유지하며, 연결이 끊기면 한 번 재연결 후 재시도합니다.
+    """
+
+    def __init__(self, socket_path=EMBED_SERVER_SOCKET, timeout=30.0):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self.local = threading.local()
+
+    def _connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(self.socket_path)
+        self.local.sock = sock
+        self.local.reader = sock.makefile("rb")
+        return sock
+
+    def _request(self, texts):
+        payload = json.dumps({"texts": texts}).encode("utf-8") + b"\n"
+        for attempt in range(2):
+            try:
+                sock = getattr(self.local, "sock", None) or self._connect()
+                sock.sendall(payload)
+                line = self.local.reader.readline()
+                if not line:
+                    raise ConnectionError("임베딩 서버 연결이 끊어졌습니다.")
+                break
+            except OSError:
+                if getattr(self.local, "sock", None):
+                    self.local.sock.close()
+                self.local.sock = None
+                if attempt == 1:
+                    raise
+
+        response = json.loads(line)
+        if "error" in response:
+            raise RuntimeError(f"임베딩 서버 오류: {response['error']}")
+        return response["vectors"]
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return self._request(texts) if texts else []
+
+    def embed_query(self, text: str) -> list[float]:
+        return self._request([text])[0]
+
+def wait_for_server(socket_path=EMBED_SERVER_SOCKET, timeout=120.0):
+    """
+    서버가 연결을 받을 때까지 기다립니다. (모델 로드에 수십 초가 걸림)
+    소켓 파일만 있고 연결이 거부되면 (죽은 서버가 남긴 파일) 아직 준비되지 않은 것으로 봅니다.
+    """
+    deadline = time.time() + timeout
+    while True:
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                sock.settimeout(1.0)
+                sock.connect(socket_path)
+                return
+        except OSError:
+            if time.time() > deadline:
+                raise TimeoutError(f"임베딩 서버가 {timeout:.0f}초 안에 시작되지 않았습니다: {socket_path}")
+            time.sleep(0.5)
+
+if __name__ == "__main__":
+    asyncio.run(serve())
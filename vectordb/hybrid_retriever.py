@@ -0,0 +1,167 @@
+# 파일: vectordb/hybrid_retriever.py
+# Description: 어휘 검색(문자 n-gram BM25)과 임베딩 검색(CachedRetriever)을 동시에 실행해 Reciprocal Rank Fusion으로 합치는 Retriever
+#              - "평양냉면", "XX식당 웨이팅"처럼 정확한 메뉴/가게 이름이 들어간 질의는 어휘 검색이 바로 찾아냅니다.
+#              - 두 검색은 스레드 풀에서 병렬로 실행되고, 진행 중인 임베딩 검색이 HYBRID_DENSE_MAX_INFLIGHT개 이상이면
+#                (부하 상황) 임베딩 검색을 건너뛰고 어휘 검색 결과만 씁니다. dense=False로 직접 끌 수도 있습니다.
+#              - 검색별 지연 시간을 stats()로 제공합니다.
+#              - filter(store_name, sentiment)가 있으면 가게 → 문서 색인으로 후보 문서를 먼저 고르고,
+#                후보가 STORE_EXACT_SEARCH_MAX개 이하면 그 문서들의 벡터와 직접 내적해 정확히 검색합니다.
+# Author: 통합버전
+# Date: 2025.04.29
+# Requirements: numpy, langchain
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))  # 상위 폴더 경로 추가
+
+import time
+import threading
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from config import HYBRID_CANDIDATES, HYBRID_RRF_K, HYBRID_DENSE_MAX_INFLIGHT, STORE_EXACT_SEARCH_MAX
+from vectordb.lexical_index import LexicalIndex
+from vectordb.cached_retriever import read_index_version
+
+def reciprocal_rank_fusion(rankings, k: int, rrf_k: int = HYBRID_RRF_K) -> list:
+    """여러 순위 목록(Document 리스트)을 RRF 점수로 합쳐 상위 k개 Document를 반환합니다. 같은 리뷰는 page_content로 판별합니다."""
+    scores, docs = {}, {}
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking, 1):
+            key = doc.page_content
+            scores[key] = scores.get(key, 0.0) + 1.0 / (rrf_k + rank)
+            docs.setdefault(key, doc)
+    ranked = sorted(scores, key=scores.get, reverse=True)
+    return [docs[key] for key in ranked[:k]]
+
+class LegTimer:
+    """검색 하나(lexical / dense)의 호출 수와 누적 지연 시간"""
+
+    def __init__(self):
+        self.calls = 0
+        self.total_ms = 0.0
+        self.last_ms = 0.0
+
+    def add(self, elapsed_ms):
+        self.calls += 1
+        self.total_ms += elapsed_ms
+        self.last_ms = elapsed_ms
+
+    def stats(self):
+        return {"calls": self.calls, "avg_ms": self.total_ms / self.calls if self.calls else 0.0, "last_ms": self.last_ms}
+
+class HybridRetriever:
+    """
+    CachedRetriever(임베딩 검색)와 LexicalIndex(어휘 검색)를 합친 Retriever.
+    get_relevant_documents / invoke / embed_query는 CachedRetriever와 같은 방식으로 쓸 수 있습니다.
+    """
+
+    def __init__(self, dense_retriever, lexical_index: LexicalIndex, candidates=HYBRID_CANDIDATES,
+                 dense_max_inflight=HYBRID_DENSE_MAX_INFLIGHT):
+        self.dense = dense_retriever
+        self.lexical = lexical_index
+        self.search_kwargs = dense_retriever.search_kwargs
+        self.candidates = candidates
+        self.dense_max_inflight = dense_max_inflight
+        self.executor = ThreadPoolExecutor(max_workers=max(2, dense_max_inflight), thread_name_prefix="retrieval")
+        self.lock = threading.Lock()
+        self.dense_inflight = 0
+        self.dense_skipped = 0
+        self.timers = {"lexical": LegTimer(), "dense": LegTimer()}
+        self.index_version = read_index_version()
+        self._row_vectors = lru_cache(maxsize=128)(self._load_row_vectors)
+
+    def _check_index_version(self):
+        """embed_reviews.py가 인덱스를 다시 만들었으면 어휘 색인도 다시 읽습니다."""
+        version = read_index_version()
+        if version != self.index_version:
+            self.lexical = LexicalIndex.load()
+            self._row_vectors.cache_clear()
+            self.index_version = version
+            print("[INFO] 벡터 인덱스가 갱신되어 어휘 색인을 다시 불러왔습니다.")
+
+    def _timed(self, leg, func, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            elapsed = (time.perf_counter() - started) * 1000
+            with self.lock:
+                self.timers[leg].add(elapsed)
+                if leg == "dense":
+                    self.dense_inflight -= 1
+
+    def _lexical_search(self, query, rows=None):
+        return [doc for doc, _ in self.lexical.search(query, self.candidates, rows)]
+
+    def _load_row_vectors(self, rows: tuple):
+        """어휘 색인 문서 순번들의 임베딩 벡터 행렬 (벡터 저장소에서 id로 조회, 최근 가게 것은 캐시)"""
+        ids = [self.lexical.ids[i] for i in rows]
+        vectorstore = self.dense.vectorstore
+        if hasattr(vectorstore, "get_vectors"):  # vector_index 백엔드는 mmap 행렬에서 바로 읽음
+            return vectorstore.get_vectors(ids)
+        result = vectorstore._collection.get(ids=ids, include=["embeddings"])
+        by_id = dict(zip(result["ids"], result["embeddings"]))
+        return np.asarray([by_id[doc_id] for doc_id in ids], dtype=np.float32)
+
+    def _exact_dense_search(self, query, rows: list):
+        """후보 문서가 적을 때: 질의 벡터와 후보 벡터를 직접 내적해 상위 문서를 고릅니다."""
+        vectors = self._row_vectors(tuple(rows))
+        scores = vectors @ np.asarray(self.embed_query(query), dtype=np.float32)
+        order = np.argsort(-scores)[:self.candidates]
+        return [self.lexical.documents[rows[i]] for i in order]
+
+    def _start_dense(self) -> bool:
+        """임베딩 검색 슬롯을 하나 잡습니다. 진행 중인 검색이 너무 많으면 False"""
+        with self.lock:
+            if self.dense_inflight >= self.dense_max_inflight:
+                self.dense_skipped += 1
+                return False
+            self.dense_inflight += 1
+            return True
+
+    def get_relevant_documents(self, query: str, k=None, filter=None, dense=True):
+        self._check_index_version()
+        k = k or self.search_kwargs.get("k", 4)
+
+        # 가게/감성 조건이 있으면 가게 → 문서 색인으로 후보를 먼저 좁힘
+        rows = self.lexical.filter_rows(filter) if filter else None
+        if rows is not None and not rows:
+            return []
+
+        lexical_future = self.executor.submit(self._timed, "lexical", self._lexical_search, query, rows)
+        dense_future = None
+        if dense and self._start_dense():
+            if rows is not None and len(rows) <= STORE_EXACT_SEARCH_MAX:
+                dense_future = self.executor.submit(self._timed, "dense", self._exact_dense_search, query, rows)
+            else:
+                dense_future = self.executor.submit(
+                    self._timed, "dense", self.dense.get_relevant_documents, query, k=self.candidates, filter=filter
+                )
+
+        rankings = [lexical_future.result()]
+        if dense_future is not None:
+            rankings.append(dense_future.result())
+
+        lexical_ms = self.timers["lexical"].last_ms
+        dense_ms = f"{self.timers['dense'].last_ms:.0f}ms" if dense_future is not None else "생략"
+        print(f"[INFO] 검색 지연: lexical {lexical_ms:.0f}ms / dense {dense_ms}")
+        return reciprocal_rank_fusion(rankings, k)
+
+    invoke = get_relevant_documents
+
+    def embed_query(self, query: str):
+        return self.dense.embed_query(query)
+
+    def resolve_store(self, text: str):
+        """질문에 언급된 가게 이름 (리뷰 메타데이터 표기). 없으면 None"""
+        return self.lexical.resolve_store(text)
+
+    def stats(self):
+        with self.lock:
+            return {
+                "lexical": self.timers["lexical"].stats(),
+                "dense": self.timers["dense"].stats(),
+                "dense_skipped": self.dense_skipped,
+                "cache": self.dense.stats(),
+            }
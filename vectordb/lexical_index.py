@@ -0,0 +1,171 @@
+# 파일: vectordb/lexical_index.py
+# Description: 리뷰 문서에 대한 문자 n-gram BM25 어휘 색인
+#              - 한국어는 띄어쓰기/조사가 불규칙해 단어 단위 대신 어절 안의 문자 2-gram, 3-gram을 색인 단위로 씁니다.
+#                ("평양냉면집" → 평양, 양냉, 냉면, 면집, 평양냉, ...)
+#              - 색인 시점에 각 (용어, 문서) 쌍의 BM25 가중치를 미리 계산해 두어, 검색은 질의 용어의 posting 가중치 합만 구합니다.
+#              - posting 배열은 LEXICAL_INDEX_DIR/postings.npz, 문서 내용/메타데이터는 docs.json으로 저장합니다.
+#              - 가게 이름 → 문서 순번 색인도 함께 저장해, 가게로 범위를 좁힌 검색(filter)과 질문 속 가게 이름 인식에 씁니다.
+# Author: 통합버전
+# Date: 2025.04.29
+# Requirements: numpy, langchain
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))  # 상위 폴더 경로 추가
+
+import json
+import math
+from collections import Counter, defaultdict
+import numpy as np
+from langchain.schema import Document
+from config import LEXICAL_INDEX_DIR, BM25_K1, BM25_B
+from vectordb.embedding_cache import normalize_text
+
+NGRAM_SIZES = (2, 3)
+
+def normalize_store_name(name: str) -> str:
+    return str(name).replace(" ", "").lower().strip()
+
+def char_ngrams(text: str) -> list:
+    """어절마다 문자 2/3-gram을 만듭니다. 한 글자 어절은 그대로 한 용어로 씁니다."""
+    grams = []
+    for token in normalize_text(text).lower().split():
+        if len(token) < min(NGRAM_SIZES):
+            grams.append(token)
+            continue
+        for n in NGRAM_SIZES:
+            grams.extend(token[i:i + n] for i in range(len(token) - n + 1))
+    return grams
+
+class LexicalIndex:
+    """
+    Args:
+        ids (list): 문서 id 목록 (Chroma와 같은 id)
+        documents (list): Document 목록
+        terms (dict): 용어 → 행 번호
+        offsets, doc_idx, weights (np.ndarray): CSR 형식 posting (행 t의 posting은 offsets[t]:offsets[t+1])
+        stores (dict): 가게 이름 → 문서 순번 목록
+    """
+
+    def __init__(self, ids, documents, terms, offsets, doc_idx, weights, stores):
+        self.ids = ids
+        self.documents = documents
+        self.terms = terms
+        self.offsets = offsets
+        self.doc_idx = doc_idx
+        self.weights = weights
+        self.stores = stores
+        self.store_names = {normalize_store_name(name): name for name in stores if len(normalize_store_name(name)) >= 2}
+        self.max_name_length = max(map(len, self.store_names), default=0)
+
+    # ----------------------------
+    # 생성/저장/로드
+    # ----------------------------
+
+    @classmethod
+    def build(cls, ids: list, documents: list, k1=BM25_K1, b=BM25_B):
+        term_freqs = [Counter(char_ngrams(doc.page_content)) for doc in documents]
+        doc_lens = np.array([sum(tf.values()) for tf in term_freqs], dtype=np.float32)
+        avg_len = float(doc_lens.mean()) if len(doc_lens) else 0.0
+
+        postings = defaultdict(list)  # 용어 → [(문서 순번, tf)]
+        for idx, tf in enumerate(term_freqs):
+            for term, count in tf.items():
+                postings[term].append((idx, count))
+
+        stores = defaultdict(list)
+        for idx, doc in enumerate(documents):
+            stores[doc.metadata.get("store_name", "")].append(idx)
+
+        n_docs = len(documents)
+        terms, offsets, doc_idx, weights = {}, [0], [], []
+        for row, (term, plist) in enumerate(postings.items()):
+            terms[term] = row
+            idf = math.log(1 + (n_docs - len(plist) + 0.5) / (len(plist) + 0.5))
+            for idx, count in plist:
+                norm = k1 * (1 - b + b * doc_lens[idx] / avg_len)
+                doc_idx.append(idx)
+                weights.append(idf * count * (k1 + 1) / (count + norm))
+            offsets.append(len(doc_idx))
+
+        return cls(ids, documents, terms,
+                   np.array(offsets, dtype=np.int64), np.array(doc_idx, dtype=np.int32),
+                   np.array(weights, dtype=np.float32), dict(stores))
+
+    def save(self, index_dir=LEXICAL_INDEX_DIR):
+        os.makedirs(index_dir, exist_ok=True)
+        np.savez(os.path.join(index_dir, "postings.npz"),
+                 offsets=self.offsets, doc_idx=self.doc_idx, weights=self.weights)
+        with open(os.path.join(index_dir, "docs.json"), "w", encoding="utf-8") as f:
+            json.dump({
+                "ids": self.ids,
+                "terms": list(self.terms),  # 행 번호 순서
+                "stores": self.stores,
+                "documents": [[doc.page_content, doc.metadata] for doc in self.documents],
+            }, f, ensure_ascii=False)
+        print(f"[INFO] 어휘 색인 저장 완료 → {index_dir} (문서 {len(self.ids)}개 / 용어 {len(self.terms)}개)")
+
+    @classmethod
+    def load(cls, index_dir=LEXICAL_INDEX_DIR):
+        with open(os.path.join(index_dir, "docs.json"), "r", encoding="utf-8") as f:
+            data = json.load(f)
+        arrays = np.load(os.path.join(index_dir, "postings.npz"))
+        return cls(
+            data["ids"],
+            [Document(page_content=content, metadata=metadata) for content, metadata in data["documents"]],
+            {term: row for row, term in enumerate(data["terms"])},
+            arrays["offsets"], arrays["doc_idx"], arrays["weights"], data["stores"],
+        )
+
+    @staticmethod
+    def exists(index_dir=LEXICAL_INDEX_DIR) -> bool:
+        return os.path.exists(os.path.join(index_dir, "docs.json"))
+
+    # ----------------------------
+    # 검색
+    # ----------------------------
+
+    def scores(self, query: str) -> np.ndarray:
+        """모든 문서의 BM25 점수"""
+        scores = np.zeros(len(self.ids), dtype=np.float32)
+        for term, count in Counter(char_ngrams(query)).items():
+            row = self.terms.get(term)
+            if row is None:
+                continue
+            start, end = self.offsets[row], self.offsets[row + 1]
+            # 한 용어의 posting 안에서 문서 번호는 겹치지 않으므로 바로 더해도 됩니다.
+            scores[self.doc_idx[start:end]] += self.weights[start:end] * count
+        return scores
+
+    def filter_rows(self, filter: dict) -> list:
+        """메타데이터가 filter({"store_name": ..., "sentiment": ...})와 모두 같은 문서 순번. store_name은 색인으로 바로 찾습니다."""
+        rows = self.stores.get(filter["store_name"], []) if "store_name" in filter else range(len(self.documents))
+        others = {key: value for key, value in filter.items() if key != "store_name"}
+        return [i for i in rows if all(self.documents[i].metadata.get(key) == value for key, value in others.items())]
+
+    def search(self, query: str, k: int, rows: list = None) -> list:
+        """
+        점수 상위 k개 (Document, 점수). 질의 용어가 하나도 없는 문서는 제외합니다.
+        rows를 주면 그 문서들 안에서만 순위를 매깁니다.
+        """
+        scores = self.scores(query)
+        candidates = np.arange(len(scores)) if rows is None else np.asarray(rows, dtype=np.int64)
+        if not len(candidates):
+            return []
+        k = min(k, len(candidates))
+        top = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+        top = top[np.argsort(-scores[top])]
+        return [(self.documents[i], float(scores[i])) for i in top if scores[i] > 0]
+
+    def resolve_store(self, text: str):
+        """질문에 들어 있는 가장 긴 가게 이름(리뷰 메타데이터의 원래 표기). 없으면 None"""
+        query = normalize_store_name(text or "")
+        best = None
+        for start in range(len(query)):
+            for end in range(min(len(query), start + self.max_name_length), start + 1, -1):
+                name = self.store_names.get(query[start:end])
+                if name is not None:
+                    if best is None or len(normalize_store_name(name)) > len(normalize_store_name(best)):
+                        best = name
+                    break
+        return best
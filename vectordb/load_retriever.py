@@ -1,5 +1,10 @@
 # 파일: vectordb/load_retriever.py
 # Description: ChromaDB에 저장된 벡터 데이터를 불러와 검색 가능한 Retriever 객체를 생성하는 스크립트
+#              반환되는 Retriever는 질의 임베딩/검색 결과를 캐시하는 CachedRetriever로 감싸져 있습니다.
+#              어휘 색인(lexical_index)이 있으면 어휘 + 임베딩 검색을 RRF로 합치는 HybridRetriever를 반환합니다.
+#              VECTOR_BACKEND가 numpy/hnsw/int8/binary면 Chroma 대신 vector_index(mmap 벡터 행렬 / HNSW / 양자화 + 재채점)로
+#              임베딩 검색을 합니다.
+#              USE_EMBED_SERVER=1이면 모델을 직접 로드하지 않고 로컬 임베딩 서버(embedding_server.py)로 질의를 임베딩합니다.
 # Author: 통합버전
 # Date: 2025.04.29
 # Requirements: langchain, chromadb, huggingface_hub
@@ -10,17 +15,58 @@ sys.path.append(os.path.dirname(os.path.dirname(__file__)))  # 상위 폴더 경
 
 from langchain.vectorstores import Chroma
 from langchain.embeddings import HuggingFaceEmbeddings
-from config import CHROMA_DB_DIR
+from config import CHROMA_DB_DIR, EMBEDDING_MODEL_NAME, EMBED_CACHE_MAX_QUERIES, USE_EMBED_SERVER, VECTOR_BACKEND
+from vectordb.embedding_cache import EmbeddingCache, CachedEmbeddings
+from vectordb.cached_retriever import CachedRetriever
+from vectordb.lexical_index import LexicalIndex
+from vectordb.hybrid_retriever import HybridRetriever
+from vectordb.vector_index import VectorIndex
 
-def get_retriever():
-    embedding_model = HuggingFaceEmbeddings(model_name="BAAI/bge-m3")
-    db = Chroma(
+def get_query_embeddings():
+    """질의 임베딩 모델: 임베딩 서버를 쓰면 서버 클라이언트, 아니면 프로세스 안에 모델을 직접 로드"""
+    if USE_EMBED_SERVER:
+        from vectordb.embedding_server import EmbeddingServiceClient, wait_for_server
+        wait_for_server()
+        print("임베딩 서버를 사용합니다.")
+        return EmbeddingServiceClient()
+
+    # 인덱싱(embedding_engine)과 같은 모델 + 정규화 설정이어야 벡터가 호환됩니다.
+    return HuggingFaceEmbeddings(
+        model_name=EMBEDDING_MODEL_NAME,
+        encode_kwargs={"normalize_embeddings": True}
+    )
+
+def load_vectorstore(embedding_model, backend=VECTOR_BACKEND):
+    """임베딩 검색 백엔드를 엽니다. vector_index 파일이 없으면 Chroma로 돌아갑니다."""
+    if backend != "chroma":
+        if VectorIndex.exists(backend):
+            print(f"벡터 검색 백엔드: {backend}")
+            return VectorIndex(embedding_model, backend=backend)
+        print(f"[WARN] {backend} 벡터 색인이 없어 Chroma를 사용합니다. embed_reviews.py를 다시 실행하세요.")
+    return Chroma(
         persist_directory=CHROMA_DB_DIR,
         embedding_function=embedding_model
     )
+
+def get_retriever(cached=True, hybrid=True, backend=VECTOR_BACKEND, query_embeddings=None):
+    """query_embeddings를 주면 질의 임베딩 모델을 새로 로드하지 않고 그대로 씁니다. (여러 Retriever가 모델 하나를 공유할 때)"""
+    embedding_model = query_embeddings or get_query_embeddings()
+    # 같은 질문은 디스크 캐시에서 바로 벡터를 꺼내 모델 호출을 생략
+    query_cache = EmbeddingCache("queries", model_name=EMBEDDING_MODEL_NAME, max_entries=EMBED_CACHE_MAX_QUERIES)
+    embedding_model = CachedEmbeddings(embedding_model, query_cache)
+    db = load_vectorstore(embedding_model, backend)
     retriever = db.as_retriever(
         search_type="similarity",
         search_kwargs={"k": 5}
     )
     print("Retriever가 성공적으로 로드되었습니다.")
+    if not cached:
+        return retriever
+
+    retriever = CachedRetriever(retriever)
+    if hybrid:
+        if LexicalIndex.exists():
+            print("어휘 색인을 함께 사용합니다. (하이브리드 검색)")
+            return HybridRetriever(retriever, LexicalIndex.load())
+        print("[WARN] 어휘 색인이 없어 임베딩 검색만 사용합니다. embed_reviews.py를 다시 실행하세요.")
     return retriever
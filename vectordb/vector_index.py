@@ -0,0 +1,266 @@
+# 파일: vectordb/vector_index.py
+# Description: Chroma 대신 프로세스 안에서 바로 검색하는 임베딩 검색 백엔드
+#              - numpy: 정규화된 float32 벡터 행렬을 vectors.npy로 저장하고 np.load(mmap_mode="r")로 엽니다.
+#                여러 Gradio 워커 프로세스가 같은 파일을 mmap하므로 벡터 페이지는 OS 페이지 캐시에서 공유됩니다.
+#                질의마다 행렬-벡터 곱 한 번으로 전수 검색합니다. (역마다 수천 개 규모에서는 HNSW보다 단순하고 정확)
+#              - hnsw: hnswlib 그래프 색인(hnsw.bin). 색인은 프로세스마다 메모리에 올라가지만 수십만 개 이상에서 빠릅니다.
+#              - int8 / binary: 차원별 스케일 int8 양자화(vectors_int8.npy, 4배 작음) 또는 부호 비트 양자화(vectors_binary.npy, 32배 작음)
+#                벡터로 1차 검색한 뒤, 상위 후보만 디스크의 float32 벡터(vectors.npy)로 다시 점수를 매깁니다.
+#                report_quantized_recall로 색인에 없는 질의(챗봇이 쌓은 실제 질문 임베딩)에 대한 전수 검색 대비 recall@5를 측정합니다.
+#              - 문서 id/내용/메타데이터는 벡터 행 순서와 같은 순서로 meta.json에 저장합니다.
+#              embed_reviews.py가 Chroma 갱신 후 만들고, load_retriever.get_retriever가 VECTOR_BACKEND 설정에 따라 불러옵니다.
+# Author: 통합버전
+# Date: 2025.04.29
+# Requirements: numpy, langchain, (선택) hnswlib
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))  # 상위 폴더 경로 추가
+
+import json
+from collections import defaultdict
+import numpy as np
+from langchain.schema import Document
+from config import (
+    VECTOR_INDEX_DIR, HNSW_M, HNSW_EF_CONSTRUCTION, HNSW_EF_SEARCH, QUANT_RESCORE_FACTOR, QUANT_MIN_RECALL,
+)
+
+VECTOR_BACKENDS = ("numpy", "hnsw", "int8", "binary")
+QUANTIZED_FILES = {"int8": ["vectors_int8.npy", "int8_scales.npy"], "binary": ["vectors_binary.npy"]}
+SEARCH_CHUNK_ROWS = 8192  # 양자화 벡터를 float로 바꿔 계산할 때 한 번에 처리할 행 수 (임시 메모리 제한)
+
+# 바이트 값 → 켜진 비트 수
+POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+# ----------------------------
+# 1. 생성
+# ----------------------------
+
+def normalize_rows(vectors) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+def quantize_int8(vectors: np.ndarray):
+    """차원별 최대 절댓값을 127로 맞추는 대칭 int8 양자화. (codes, 차원별 scale) 반환"""
+    scales = np.maximum(np.abs(vectors).max(axis=0), 1e-12) / 127
+    codes = np.clip(np.rint(vectors / scales), -127, 127).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+def quantize_binary(vectors: np.ndarray) -> np.ndarray:
+    """각 차원의 부호만 1비트로 저장 (1024차원 → 128바이트)"""
+    return np.packbits(vectors > 0, axis=1)
+
+def _save_npy(index_dir, name, array):
+    tmp_path = os.path.join(index_dir, f"{name}.tmp.npy")
+    np.save(tmp_path, array)
+    os.replace(tmp_path, os.path.join(index_dir, f"{name}.npy"))
+
+def build_vector_index(ids: list, documents: list, vectors, index_dir=VECTOR_INDEX_DIR):
+    """
+    벡터 행렬과 메타데이터를 저장합니다. hnswlib가 설치되어 있으면 HNSW 색인도 함께 만듭니다.
+    파일은 임시 이름으로 쓴 뒤 교체해, 서빙 중인 프로세스가 반쯤 쓰인 파일을 읽지 않게 합니다.
+    """
+    os.makedirs(index_dir, exist_ok=True)
+    vectors = normalize_rows(vectors)
+
+    _save_npy(index_dir, "vectors", vectors)
+    codes, scales = quantize_int8(vectors)
+    _save_npy(index_dir, "vectors_int8", codes)
+    _save_npy(index_dir, "int8_scales", scales)
+    _save_npy(index_dir, "vectors_binary", quantize_binary(vectors))
+
+    tmp_path = os.path.join(index_dir, "meta.json.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({
+            "ids": ids,
+            "documents": [[doc.page_content, doc.metadata] for doc in documents],
+        }, f, ensure_ascii=False)
+    os.replace(tmp_path, os.path.join(index_dir, "meta.json"))
+
+    try:
+        import hnswlib
+    except ImportError:
+        print("[INFO] hnswlib가 없어 HNSW 색인은 만들지 않습니다. (numpy 백엔드만 사용 가능)")
+    else:
+        index = hnswlib.Index(space="ip", dim=vectors.shape[1])
+        index.init_index(max_elements=max(1, len(vectors)), M=HNSW_M, ef_construction=HNSW_EF_CONSTRUCTION)
+        if len(vectors):
+            index.add_items(vectors, np.arange(len(vectors)))
+        tmp_path = os.path.join(index_dir, "hnsw.tmp.bin")
+        index.save_index(tmp_path)
+        os.replace(tmp_path, os.path.join(index_dir, "hnsw.bin"))
+
+    size_mb = vectors.nbytes / 1024 / 1024
+    print(f"[INFO] 벡터 색인 저장 완료 → {index_dir} ({len(ids)}개 × {vectors.shape[1]}차원, "
+          f"float32 {size_mb:.1f}MB / int8 {codes.nbytes / 1024 / 1024:.1f}MB / "
+          f"binary {len(vectors) * ((vectors.shape[1] + 7) // 8) / 1024 / 1024:.2f}MB)")
+
+def report_quantized_recall(index_dir=VECTOR_INDEX_DIR, query_vectors=None, n_queries=200, k=5):
+    """
+    int8/binary 검색의 recall@k(전수 float32 검색 대비)를 측정합니다.
+    query_vectors(색인에 없는 실제 질의 임베딩)를 쓰는 것이 원칙이고, 없으면 저장된 벡터 일부를 질의로 쓰되
+    자기 자신은 항상 1등이라 recall이 부풀려지므로 정답과 후보 양쪽에서 질의 자신의 행을 뺍니다.
+    """
+    exact = VectorIndex(None, backend="numpy", index_dir=index_dir)
+    if not len(exact.ids):
+        return {}
+    if query_vectors is not None and len(query_vectors):
+        queries = normalize_rows(query_vectors)
+        own_rows = [None] * len(queries)
+        source = "사용자 질문"
+    else:
+        rng = np.random.default_rng(0)
+        own_rows = rng.choice(len(exact.ids), size=min(n_queries, len(exact.ids)), replace=False).tolist()
+        queries = np.asarray(exact.vectors[own_rows], dtype=np.float32)
+        source = "저장 벡터 질의, 자기 자신 제외"
+
+    def top_rows(index, query, own_row):
+        return [row for row in index.search_rows(query, k + 1) if row != own_row][:k]
+
+    truth = [set(top_rows(exact, q, own)) for q, own in zip(queries, own_rows)]
+    recalls = {}
+    for backend in QUANTIZED_FILES:
+        index = VectorIndex(None, backend=backend, index_dir=index_dir)
+        hits = sum(len(truth_rows & set(top_rows(index, q, own))) for q, own, truth_rows in zip(queries, own_rows, truth))
+        recalls[backend] = hits / sum(len(t) for t in truth)
+        warning = "" if recalls[backend] >= QUANT_MIN_RECALL else f"  ⚠ 기준 {QUANT_MIN_RECALL} 미만"
+        print(f"[INFO] {backend} recall@{k}: {recalls[backend]:.3f} ({source} {len(queries)}개){warning}")
+    return recalls
+
+# ----------------------------
+# 2. 검색
+# ----------------------------
+
+def flatten_where(where) -> dict:
+    """Chroma where 조건({"store_name": ...} 또는 {"$and": [...]})을 단순 일치 조건 dict로 펼칩니다."""
+    if not where:
+        return {}
+    if "$and" in where:
+        flat = {}
+        for clause in where["$and"]:
+            flat.update(flatten_where(clause))
+        return flat
+    return {key: value for key, value in where.items() if not isinstance(value, dict)}
+
+class VectorIndex:
+    """
+    Chroma 대신 CachedRetriever에 넘길 수 있는 vectorstore.
+    embeddings 속성, similarity_search_by_vector(vector, k, filter), get_vectors(ids)를 제공합니다.
+
+    Args:
+        embeddings: 질의 임베딩 모델 (LangChain Embeddings)
+        backend (str): "numpy" 또는 "hnsw"
+    """
+
+    def __init__(self, embeddings, backend="numpy", index_dir=VECTOR_INDEX_DIR):
+        if backend not in VECTOR_BACKENDS:
+            raise ValueError(f"지원하지 않는 벡터 백엔드입니다: {backend}")
+        self.embeddings = embeddings
+        self.backend = backend
+
+        # 읽기 전용 mmap: 실제로 읽은 페이지만 메모리에 올라가고, 여러 프로세스가 페이지를 공유합니다.
+        self.vectors = np.load(os.path.join(index_dir, "vectors.npy"), mmap_mode="r")
+        with open(os.path.join(index_dir, "meta.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        self.ids = meta["ids"]
+        self.documents = [Document(page_content=content, metadata=metadata) for content, metadata in meta["documents"]]
+        self.row_of = {doc_id: row for row, doc_id in enumerate(self.ids)}
+        self.stores = defaultdict(list)
+        for row, doc in enumerate(self.documents):
+            self.stores[doc.metadata.get("store_name")].append(row)
+
+        self.codes = None
+        if backend == "int8":
+            self.codes = np.load(os.path.join(index_dir, "vectors_int8.npy"), mmap_mode="r")
+            self.scales = np.load(os.path.join(index_dir, "int8_scales.npy"))
+        elif backend == "binary":
+            self.codes = np.load(os.path.join(index_dir, "vectors_binary.npy"), mmap_mode="r")
+
+        self.hnsw = None
+        if backend == "hnsw":
+            import hnswlib
+            self.hnsw = hnswlib.Index(space="ip", dim=self.vectors.shape[1])
+            self.hnsw.load_index(os.path.join(index_dir, "hnsw.bin"), max_elements=len(self.ids))
+            self.hnsw.set_ef(HNSW_EF_SEARCH)
+
+    @staticmethod
+    def exists(backend="numpy", index_dir=VECTOR_INDEX_DIR) -> bool:
+        required = ["vectors.npy", "meta.json"] + (["hnsw.bin"] if backend == "hnsw" else [])
+        required += QUANTIZED_FILES.get(backend, [])
+        return all(os.path.exists(os.path.join(index_dir, name)) for name in required)
+
+    def as_retriever(self, search_type=None, search_kwargs=None, **kwargs):
+        """Chroma.as_retriever와 같은 방식으로 부를 수 있게 search_type 등은 받고 무시합니다. (항상 유사도 검색)"""
+        return VectorIndexRetriever(self, search_kwargs or {})
+
+    def _filter_rows(self, where):
+        conditions = flatten_where(where)
+        if not conditions:
+            return None
+        rows = self.stores.get(conditions["store_name"], []) if "store_name" in conditions else range(len(self.ids))
+        others = {key: value for key, value in conditions.items() if key != "store_name"}
+        return [row for row in rows if all(self.documents[row].metadata.get(key) == value for key, value in others.items())]
+
+    def _top_rows(self, scores, k):
+        k = min(k, len(scores))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        return top[np.argsort(-scores[top])]
+
+    def _quantized_scores(self, query: np.ndarray) -> np.ndarray:
+        """양자화 벡터로 계산한 근사 점수. int8은 근사 내적, binary는 일치하는 부호 비트 수"""
+        scores = np.empty(len(self.codes), dtype=np.float32)
+        if self.backend == "int8":
+            scaled_query = query * self.scales
+            for start in range(0, len(self.codes), SEARCH_CHUNK_ROWS):
+                chunk = self.codes[start:start + SEARCH_CHUNK_ROWS]
+                scores[start:start + len(chunk)] = chunk.astype(np.float32) @ scaled_query
+        else:
+            query_bits = np.packbits(query > 0)
+            for start in range(0, len(self.codes), SEARCH_CHUNK_ROWS):
+                chunk = self.codes[start:start + SEARCH_CHUNK_ROWS]
+                scores[start:start + len(chunk)] = -POPCOUNT[np.bitwise_xor(chunk, query_bits)].sum(axis=1, dtype=np.int32)
+        return scores
+
+    def _quantized_search(self, query: np.ndarray, k: int) -> list:
+        """1차: 양자화 점수로 k × QUANT_RESCORE_FACTOR개 후보 → 2차: 후보의 float32 벡터로 재채점"""
+        candidates = np.sort(self._top_rows(self._quantized_scores(query), k * QUANT_RESCORE_FACTOR))
+        exact_scores = self.vectors[candidates] @ query  # 후보 행만 디스크(mmap)에서 읽음
+        return candidates[self._top_rows(exact_scores, k)].tolist()
+
+    def search_rows(self, vector, k: int, where=None) -> list:
+        """질의 벡터와 내적(코사인)이 큰 순서로 상위 k개 행 번호"""
+        query = np.asarray(vector, dtype=np.float32)
+        rows = self._filter_rows(where)
+
+        if rows is not None:  # 조건이 있으면 후보 행만 정확히 계산
+            if not rows:
+                return []
+            rows = np.asarray(rows, dtype=np.int64)
+            return rows[self._top_rows(self.vectors[rows] @ query, k)].tolist()
+
+        if self.hnsw is not None:
+            labels, _ = self.hnsw.knn_query(query, k=min(k, len(self.ids)))
+            return labels[0].tolist()
+        if self.codes is not None:
+            return self._quantized_search(query, k)
+        return self._top_rows(self.vectors @ query, k).tolist()
+
+    def similarity_search_by_vector(self, embedding, k: int = 4, filter=None, **kwargs):
+        return [self.documents[row] for row in self.search_rows(embedding, k, filter)]
+
+    def get_vectors(self, ids: list) -> np.ndarray:
+        return np.asarray(self.vectors[[self.row_of[doc_id] for doc_id in ids]], dtype=np.float32)
+
+class VectorIndexRetriever:
+    """CachedRetriever가 기대하는 vectorstore / search_kwargs 속성을 가진 최소 Retriever"""
+
+    def __init__(self, vectorstore: VectorIndex, search_kwargs: dict):
+        self.vectorstore = vectorstore
+        self.search_kwargs = search_kwargs
+
+    def get_relevant_documents(self, query: str):
+        vector = self.vectorstore.embeddings.embed_query(query)
+        return self.vectorstore.similarity_search_by_vector(vector, **self.search_kwargs)